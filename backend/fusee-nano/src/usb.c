@@ -12,6 +12,7 @@
 #include <linux/usbdevice_fs.h>
 #include <asm/byteorder.h>
 #include <sys/ioctl.h>
+#include <poll.h>
 #include <unistd.h>
 
 #include "usb.h"
@@ -79,26 +80,22 @@ static int find_sysfs_dir(char *path, size_t pathlen, int vid, int pid)
 	return found;
 }
 
-int get_device(int vid, int pid)
+static int open_sysfs_device(const char *sysfs_dir)
 {
-	char sysfs_dir[PATH_MAX];
-	char tmp_path[PATH_MAX];
+	char tmp_path[PATH_MAX + 16];
 	int busnum, devnum;
 	
-	if (find_sysfs_dir(sysfs_dir, sizeof(sysfs_dir), vid, pid) < 0) {
-		errno = ENXIO; // is this a suitable errno?
+	snprintf(tmp_path, sizeof(tmp_path), "%s/busnum", sysfs_dir);
+	if (scanf_path(tmp_path, "%d", &busnum) != 1) {
+		errno = ENXIO;
 		return -1;
 	}
 	
-	strncpy(tmp_path, sysfs_dir, sizeof(tmp_path));
-	strncat(tmp_path, "/busnum", sizeof(tmp_path)-1);
-	if (scanf_path(tmp_path, "%d", &busnum) != 1)
-		return -1;
-	
-	strncpy(tmp_path, sysfs_dir, sizeof(tmp_path));
-	strncat(tmp_path, "/devnum", sizeof(tmp_path)-1);
-	if (scanf_path(tmp_path, "%d", &devnum) != 1)
+	snprintf(tmp_path, sizeof(tmp_path), "%s/devnum", sysfs_dir);
+	if (scanf_path(tmp_path, "%d", &devnum) != 1) {
+		errno = ENXIO;
 		return -1;
+	}
 	
 	snprintf(tmp_path,
 		sizeof(tmp_path),
@@ -109,6 +106,75 @@ int get_device(int vid, int pid)
 	return open(tmp_path, O_RDWR);
 }
 
+int get_device(int vid, int pid)
+{
+	char sysfs_dir[PATH_MAX];
+	
+	if (find_sysfs_dir(sysfs_dir, sizeof(sysfs_dir), vid, pid) < 0) {
+		errno = ENXIO; // is this a suitable errno?
+		return -1;
+	}
+	
+	return open_sysfs_device(sysfs_dir);
+}
+
+int get_device_at_port(const char *port, int vid, int pid)
+{
+	char sysfs_dir[PATH_MAX];
+	char tmp_path[PATH_MAX + 16];
+	int tmp;
+	
+	/* port is a sysfs device name such as "1-2.3", never a path */
+	if (strchr(port, '/') != NULL || port[0] == '.') {
+		errno = EINVAL;
+		return -1;
+	}
+	
+	snprintf(sysfs_dir, sizeof(sysfs_dir), SYSFS_DEVICE_PATH "/%s", port);
+	
+	snprintf(tmp_path, sizeof(tmp_path), "%s/idVendor", sysfs_dir);
+	if (scanf_path(tmp_path, "%x", &tmp) != 1 || tmp != vid) {
+		errno = ENXIO;
+		return -1;
+	}
+	
+	snprintf(tmp_path, sizeof(tmp_path), "%s/idProduct", sysfs_dir);
+	if (scanf_path(tmp_path, "%x", &tmp) != 1 || tmp != pid) {
+		errno = ENXIO;
+		return -1;
+	}
+	
+	return open_sysfs_device(sysfs_dir);
+}
+
+int get_device_at_address(int busnum, int devnum, int vid, int pid)
+{
+	char path[PATH_MAX];
+	struct usb_device_descriptor desc;
+	int fd;
+	
+	if (busnum <= 0 || devnum <= 0) {
+		errno = EINVAL;
+		return -1;
+	}
+	
+	snprintf(path, sizeof(path), USBFS_PATH "/%03d/%03d", busnum, devnum);
+	if ((fd = open(path, O_RDWR)) < 0)
+		return -1;
+	
+	/* usbfs hands out the descriptors on read() */
+	if (read(fd, &desc, USB_DT_DEVICE_SIZE) != USB_DT_DEVICE_SIZE ||
+		desc.bDescriptorType != USB_DT_DEVICE ||
+		__le16_to_cpu(desc.idVendor) != vid ||
+		__le16_to_cpu(desc.idProduct) != pid) {
+		close(fd);
+		errno = ENXIO;
+		return -1;
+	}
+	
+	return fd;
+}
+
 int claim_interface(int fd, int ifnum)
 {
 	return ioctl(fd, USBDEVFS_CLAIMINTERFACE, &ifnum);
@@ -182,3 +248,124 @@ int ctrl_transfer_unbounded(int fd, int length)
 	free(buffer); // XXX buffer does not get freed under error conditions
 	return 0;
 }
+
+int usb_pipe_init(struct usb_pipe *pipe, int fd, unsigned int ep, int depth, unsigned int len, unsigned int timeout)
+{
+	memset(pipe, 0, sizeof(*pipe));
+	if (depth < 1 || depth > USB_PIPE_MAX_DEPTH) {
+		errno = EINVAL;
+		return -1;
+	}
+	
+	pipe->fd = fd;
+	pipe->ep = USB_DIR_OUT | ep;
+	pipe->len = len;
+	pipe->timeout = timeout;
+	pipe->depth = depth;
+	for (int i = 0; i < depth; i++) {
+		pipe->urbs[i] = calloc(1, sizeof(struct usbdevfs_urb));
+		pipe->buffers[i] = malloc(len);
+		if (pipe->urbs[i] == NULL || pipe->buffers[i] == NULL) {
+			usb_pipe_free(pipe);
+			return -1;
+		}
+	}
+	return 0;
+}
+
+/* Waits for the oldest URB in flight */
+static int usb_pipe_reap(struct usb_pipe *pipe)
+{
+	int tail = (pipe->head - pipe->inflight + pipe->depth) % pipe->depth;
+	struct usbdevfs_urb *urb;
+	struct pollfd pfd = { .fd = pipe->fd, .events = POLLOUT };
+	int ready;
+	
+	while (ioctl(pipe->fd, USBDEVFS_REAPURBNDELAY, &urb) < 0) {
+		if (errno != EAGAIN)
+			return -1;
+		/* usbfs signals POLLOUT when a completed URB can be reaped */
+		ready = poll(&pfd, 1, pipe->timeout);
+		if (ready == 0) {
+			errno = ETIMEDOUT;
+			return -1;
+		}
+		if (ready < 0 && errno != EINTR)
+			return -1;
+	}
+	
+	pipe->inflight--;
+	if (urb != pipe->urbs[tail]) { /* same endpoint, so always in order */
+		errno = EPROTO;
+		return -1;
+	}
+	if (urb->status != 0) {
+		errno = -urb->status;
+		return -1;
+	}
+	if (urb->actual_length != urb->buffer_length) {
+		errno = EIO;
+		return -1;
+	}
+	return 0;
+}
+
+void *usb_pipe_buffer(struct usb_pipe *pipe)
+{
+	if (pipe->inflight == pipe->depth && usb_pipe_reap(pipe) < 0)
+		return NULL;
+	return pipe->buffers[pipe->head];
+}
+
+int usb_pipe_submit(struct usb_pipe *pipe, unsigned int len)
+{
+	struct usbdevfs_urb *urb = pipe->urbs[pipe->head];
+	
+	if (pipe->inflight == pipe->depth || len > pipe->len) {
+		errno = EINVAL;
+		return -1;
+	}
+	
+	memset(urb, 0, sizeof(*urb));
+	urb->type = USBDEVFS_URB_TYPE_BULK;
+	urb->endpoint = pipe->ep;
+	urb->buffer = pipe->buffers[pipe->head];
+	urb->buffer_length = len;
+	
+	if (ioctl(pipe->fd, USBDEVFS_SUBMITURB, urb) < 0)
+		return -1;
+	
+	pipe->inflight++;
+	pipe->head = (pipe->head + 1) % pipe->depth;
+	return 0;
+}
+
+int usb_pipe_drain(struct usb_pipe *pipe)
+{
+	while (pipe->inflight > 0)
+		if (usb_pipe_reap(pipe) < 0)
+			return -1;
+	return 0;
+}
+
+void usb_pipe_free(struct usb_pipe *pipe)
+{
+	struct usbdevfs_urb *urb;
+	int saved_errno = errno;
+	
+	/* The kernel still owns the buffers of URBs in flight: cancel and reap */
+	for (int i = 0; i < pipe->inflight; i++) {
+		int slot = (pipe->head - pipe->inflight + i + pipe->depth) % pipe->depth;
+		ioctl(pipe->fd, USBDEVFS_DISCARDURB, pipe->urbs[slot]);
+	}
+	while (pipe->inflight > 0 && ioctl(pipe->fd, USBDEVFS_REAPURB, &urb) == 0)
+		pipe->inflight--;
+	
+	for (int i = 0; i < pipe->depth; i++) {
+		free(pipe->buffers[i]);
+		free(pipe->urbs[i]);
+		pipe->buffers[i] = NULL;
+		pipe->urbs[i] = NULL;
+	}
+	errno = saved_errno;
+}
@@ -2,10 +2,18 @@
 #define USB_H
 
 #include <stdint.h>
+#include <linux/usbdevice_fs.h>
 
 /* Returns the fd of the USB device with the corresponding vid/pid */
 int get_device(int vid, int pid);
 
+/* Same, but only looks at the device on the given sysfs port (e.g. "1-2.3") */
+int get_device_at_port(const char *port, int vid, int pid);
+
+/* Same, but opens /dev/bus/usb/BUS/DEV directly, skipping the sysfs walk.
+ * The device descriptor is checked, so a stale address fails with ENXIO. */
+int get_device_at_address(int busnum, int devnum, int vid, int pid);
+
 int claim_interface(int fd, int ifnum);
 
 int ep_read(int fd,
@@ -22,4 +30,29 @@ int ep_write(int fd,
 
 int ctrl_transfer_unbounded(int fd, int length);
 
+/* Pipelined bulk OUT transfers: up to `depth` URBs in flight, each with its
+ * own buffer of `len` bytes. Fill the buffer from usb_pipe_buffer(), then
+ * usb_pipe_submit() it; URBs complete in order and are reaped as slots are
+ * reused. A URB that does not complete within `timeout` ms fails with
+ * ETIMEDOUT. usb_pipe_free() discards anything still in flight. */
+#define USB_PIPE_MAX_DEPTH 16
+
+struct usb_pipe {
+	int fd;
+	unsigned int ep;
+	unsigned int len;
+	unsigned int timeout;
+	int depth;
+	int head; /* next slot to submit */
+	int inflight;
+	void *buffers[USB_PIPE_MAX_DEPTH];
+	struct usbdevfs_urb *urbs[USB_PIPE_MAX_DEPTH];
+};
+
+int usb_pipe_init(struct usb_pipe *pipe, int fd, unsigned int ep, int depth, unsigned int len, unsigned int timeout);
+void *usb_pipe_buffer(struct usb_pipe *pipe);
+int usb_pipe_submit(struct usb_pipe *pipe, unsigned int len);
+int usb_pipe_drain(struct usb_pipe *pipe);
+void usb_pipe_free(struct usb_pipe *pipe);
+
 #endif /* USB_H */
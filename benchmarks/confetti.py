@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Reports ms per frame for the confetti animation: the original per-piece
+# dict/QRectF loop versus the array-backed ConfettiSystem, each stepping and
+# painting into an offscreen image the size of the main window.
+#
+#   python benchmarks/confetti.py [--frames 600] [--pieces 150]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QRectF, Qt
+from PyQt6.QtGui import QColor, QGuiApplication, QImage, QPainter
+
+from fuseeflow.confetti import STEP, ConfettiSystem
+
+WIDTH, HEIGHT = 900, 600
+COLORS = [QColor(c) for c in ["#88C0D0", "#81A1C1", "#5E81AC", "#BF616A", "#D08770", "#EBCB8B", "#A3BE8C", "#B48EAD"]]
+
+
+def legacy(frames, pieces, image):
+    # The pre-vectorization ConfettiOverlay, minus the widget
+    items = [{
+        'rect': QRectF(random.uniform(0, WIDTH), random.uniform(-HEIGHT, 0), random.uniform(8, 12), random.uniform(10, 15)),
+        'vx': random.uniform(-2, 2), 'vy': random.uniform(3, 6), 'color': random.choice(COLORS)
+    } for _ in range(pieces)]
+    step = paint = 0.0
+    for _ in range(frames):
+        began = time.perf_counter()
+        for piece in items:
+            piece['rect'].translate(piece['vx'], piece['vy'])
+            if piece['rect'].top() > HEIGHT: piece['rect'].moveBottom(0)
+        drawn = time.perf_counter()
+        image.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for piece in items:
+            painter.setBrush(piece['color']); painter.setPen(Qt.PenStyle.NoPen); painter.drawRect(piece['rect'])
+        painter.end()
+        step += drawn - began; paint += time.perf_counter() - drawn
+    return step, paint
+
+
+def vectorized(frames, pieces, image, antialiasing=True):
+    system = ConfettiSystem(COLORS, seed=0)
+    system.spawn(WIDTH, HEIGHT, pieces)
+    step = paint = 0.0
+    for _ in range(frames):
+        began = time.perf_counter()
+        system.advance(STEP)
+        drawn = time.perf_counter()
+        image.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        rects = system.rects.tolist()
+        for color, start, end in system.batches:
+            painter.setBrush(COLORS[color]); painter.drawRects([QRectF(*rect) for rect in rects[start:end]])
+        painter.end()
+        step += drawn - began; paint += time.perf_counter() - drawn
+    return step, paint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confetti animation cost in ms per frame.")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--pieces", type=int, default=150)
+    args = parser.parse_args()
+
+    app = QGuiApplication(sys.argv)
+    image = QImage(WIDTH, HEIGHT, QImage.Format.Format_ARGB32_Premultiplied)
+    runs = [
+        ("legacy", lambda: legacy(args.frames, args.pieces, image)),
+        ("vectorized", lambda: vectorized(args.frames, args.pieces, image)),
+        ("vectorized, low-cost", lambda: vectorized(args.frames, max(1, args.pieces // 3), image, antialiasing=False)),
+    ]
+    print(f"{args.frames} frames, {args.pieces} pieces, {WIDTH}x{HEIGHT}")
+    print(f"{'':22} {'step ms':>9} {'paint ms':>9} {'frame ms':>9}")
+    for name, run in runs:
+        step, paint = run()
+        print(f"{name:22} {step * 1000 / args.frames:9.3f} {paint * 1000 / args.frames:9.3f} {(step + paint) * 1000 / args.frames:9.3f}")
+    del app
+
+
+if __name__ == "__main__":
+    main()
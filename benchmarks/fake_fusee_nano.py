@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Drop-in stand-in for the fusee-nano binary: same arguments, same output
+# lines, no USB. Behaviour comes from the environment:
+#   FAKE_FUSEE_LATENCY       seconds from start to stack smash (default 0.3)
+#   FAKE_FUSEE_JITTER        +/- fraction of the latency, uniformly (default 0.2)
+#   FAKE_FUSEE_FAILURE_RATE  probability of failing after the device ID (default 0)
+#   FAKE_FUSEE_SEED          optional seed, mixed with the port
+import os
+import random
+import sys
+import time
+
+
+def main(argv):
+    args = argv[1:]
+    port = device_id = None
+    args = [arg for arg in args if arg != "-S"]
+    while len(args) >= 2 and args[0] in ("-p", "-d", "-i"):
+        if args[0] in ("-p", "-d"): port = args[1]
+        else: device_id = args[1]
+        args = args[2:]
+    if len(args) != 1:
+        print(f"USAGE: {argv[0]} [-p port | -d bus:dev] [-i device_id] [-S] payload.bin"); return 255
+    payload = args[0]
+
+    latency = float(os.environ.get("FAKE_FUSEE_LATENCY", "0.3"))
+    jitter = float(os.environ.get("FAKE_FUSEE_JITTER", "0.2"))
+    failure_rate = float(os.environ.get("FAKE_FUSEE_FAILURE_RATE", "0"))
+    seed = os.environ.get("FAKE_FUSEE_SEED")
+    rng = random.Random(f"{seed}:{port}") if seed is not None else random.Random()
+    total = max(0.0, latency * (1 + rng.uniform(-jitter, jitter)))
+
+    try: size = min(os.path.getsize(payload), 0x30298 - 0x102a8)
+    except OSError as e:
+        print(f"[-] Failed to open payload: {e}", file=sys.stderr); return 255
+
+    # Roughly the shape of a real run: open + ID read, transfer, smash
+    time.sleep(total * 0.15)
+    print(f"[*] device id: {device_id or format(rng.getrandbits(128), '032x')}", flush=True)
+    if rng.random() < failure_rate:
+        print("[-] Failed to send payload (simulated)", file=sys.stderr); return 1
+    print(f"[*] Read {size} bytes from {payload}", flush=True)
+    chunks = -(-(size + 0x102a8) // 0x1000) | 1 # an odd count, as in fusee-nano
+    for chunk in range(1, chunks + 1):
+        time.sleep(total * 0.75 / chunks)
+        print(f"[*] Progress: 0x{chunk * 0x1000:x}/0x{chunks * 0x1000:x} bytes", flush=True)
+    print(f"[+] Sent 0x{chunks * 0x1000:x} bytes", flush=True)
+    print(f"[*] Transfer took {total * 750:.1f} ms (pipelined)", flush=True)
+    time.sleep(total * 0.10)
+    print("[+] Smashed the stack: -110", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Idle footprint of the GUI: CPU wakeups (context switches over all threads)
+# per minute, CPU time per minute and RSS, first with the window up and then
+# in background mode, plus how long it takes to bring the window back. Runs
+# offscreen against the virtual bus, so detection is in poll mode here; with
+# sysfs hotplug the UsbWorker does not wake up at all while nothing happens.
+#
+#   python benchmarks/idle.py [--seconds 20] [--json]
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+
+BUS = sim.VirtualBus()
+sim.install(BUS)
+
+
+def wakeups():
+    total = 0
+    for path in glob.glob("/proc/self/task/*/status"):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches")): total += int(line.split()[1])
+        except OSError: pass # the thread just exited
+    return total
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    return None
+
+
+class Sample:
+    def __init__(self):
+        self.at, self.wakeups, self.cpu = time.monotonic(), wakeups(), time.process_time()
+
+    def report(self, start):
+        minutes = (self.at - start.at) / 60
+        return {"wakeups_per_min": round((self.wakeups - start.wakeups) / minutes), "cpu_ms_per_min": round((self.cpu - start.cpu) * 1000 / minutes, 1), "rss_mb": round(rss_mb(), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure FuseeFlow's idle footprint with the window up and in the background.")
+    parser.add_argument("--seconds", type=float, default=20.0, help="measurement time per mode (default: 20)")
+    parser.add_argument("--settle", type=float, default=3.0, help="seconds to let each mode settle first")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    from fuseeflow.constants import PAYLOADS_DIR
+    sim.write_payload(PAYLOADS_DIR)
+    import main as gui
+
+    app = QApplication([sys.argv[0]])
+    window = gui.SwitchInjectorApp()
+    window.show()
+    report, marks = {}, {}
+
+    def measure(name, then):
+        def begin():
+            marks[name] = Sample()
+            QTimer.singleShot(int(args.seconds * 1000), end)
+        def end():
+            report[name] = Sample().report(marks[name])
+            then()
+        QTimer.singleShot(int(args.settle * 1000), begin)
+
+    def to_background():
+        # What the tray does; offscreen there is no tray to hide into
+        window.enter_background(); window.hide()
+        measure("background", restore)
+
+    def restore():
+        began = time.perf_counter()
+        window.leave_background()
+        app.processEvents()
+        report["restore_ms"] = round((time.perf_counter() - began) * 1000, 1)
+        window.close(); app.quit()
+
+    measure("window", to_background)
+    app.exec()
+
+    report = {"detection": window.usb_thread.detector.mode if window.usb_thread.detector else None, **report}
+    if args.json: print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            if isinstance(value, dict): print(f"{key:12} " + "  ".join(f"{k}={v}" for k, v in value.items()))
+            else: print(f"{key:12} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
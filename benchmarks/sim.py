@@ -0,0 +1,148 @@
+# Stand-ins for the benchmarks: a virtual USB bus that plugs and unplugs
+# 0955:7321 consoles on a schedule, exposed to FuseeFlow through a fake
+# `usb.core` module, and the path of a fake fusee-nano executable.
+#
+# install() must run before fuseeflow is imported: it points the XDG
+# directories at a throwaway home and hides sysfs, so detection falls back
+# to polling usb.core.find -- which is ours. The readiness probe's device ID
+# read is answered by the bus too, `ready_time` seconds after each plug.
+import atexit
+import errno
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKE_FUSEE_NANO = os.path.join(BENCH_DIR, "fake_fusee_nano.py")
+RCM_VENDOR_ID = 0x0955
+RCM_PRODUCT_ID = 0x7321
+
+
+class VirtualBus:
+    def __init__(self, busnum=1, ready_time=0.15, jitter=0.5):
+        self.busnum = busnum
+        self.ready_time, self.jitter = ready_time, jitter
+        self.ready_at = {} # port -> when it starts answering
+        self.lock = threading.Lock()
+        self.attached = {} # port -> (device, plugged_at)
+        self.next_devnum = 2
+        self.plugs = [] # (port, plugged_at) for every plug event
+
+    def plug(self, index):
+        with self.lock:
+            device = SimpleNamespace(bus=self.busnum, address=self.next_devnum, port_numbers=[index + 1])
+            self.next_devnum = self.next_devnum % 127 + 2
+            port = f"{self.busnum}-{index + 1}"
+            now = time.monotonic()
+            self.attached[port] = (device, now)
+            self.ready_at[port] = now + max(0.0, self.ready_time * (1 + random.uniform(-self.jitter, self.jitter)))
+            self.plugs.append((port, now))
+            return port
+
+    def unplug(self, port):
+        with self.lock: self.attached.pop(port, None)
+
+    def plugged_at(self, port):
+        with self.lock:
+            entry = self.attached.get(port)
+            return entry[1] if entry else None
+
+    def read_device_id(self, device, timeout=None):
+        # Same contract as fuseeflow.readiness.read_device_id: the usbfs node
+        # is "missing" until the console is ready
+        with self.lock:
+            attached = self.attached.get(device.port)
+            ready_at = self.ready_at.get(device.port)
+        if not attached: raise OSError(errno.ENODEV, os.strerror(errno.ENODEV))
+        if time.monotonic() < ready_at: raise OSError(errno.ENOENT, os.strerror(errno.ENOENT))
+        return f"{random.getrandbits(128):032x}"
+
+    def find(self, find_all=False, idVendor=None, idProduct=None, **_):
+        # Same contract as usb.core.find for the arguments FuseeFlow uses
+        if (idVendor, idProduct) != (RCM_VENDOR_ID, RCM_PRODUCT_ID): return [] if find_all else None
+        with self.lock: devices = [device for device, _ in self.attached.values()]
+        return devices if find_all else (devices[0] if devices else None)
+
+
+def install(bus):
+    home = tempfile.mkdtemp(prefix="fuseeflow-bench-")
+    atexit.register(shutil.rmtree, home, True)
+    os.environ["XDG_CONFIG_HOME"] = os.path.join(home, "config")
+    os.environ["XDG_DATA_HOME"] = os.path.join(home, "data")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    usb = types.ModuleType("usb")
+    core = types.ModuleType("usb.core")
+    core.find = bus.find
+    core.NoBackendError = type("NoBackendError", (ValueError,), {})
+    usb.core = core
+    sys.modules["usb"] = usb
+    sys.modules["usb.core"] = core
+
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    from fuseeflow import hotplug, rcm, readiness
+    hotplug.SYSFS_DEVICE_PATH = os.path.join(home, "no-sysfs")
+    rcm.USBFS_PATH = os.path.join(home, "usbfs")
+    os.makedirs(rcm.USBFS_PATH)
+    readiness.read_device_id = bus.read_device_id
+    return home
+
+
+def write_payload(payloads_dir, name="bench.bin", size=0x10000):
+    os.makedirs(payloads_dir, exist_ok=True)
+    path = os.path.join(payloads_dir, name)
+    with open(path, "wb") as f: f.write(os.urandom(size))
+    return path
+
+
+def fake_backend_env(latency, jitter, failure_rate, seed=None):
+    # fake_fusee_nano.py reads its behaviour from the environment
+    os.environ["FAKE_FUSEE_LATENCY"] = str(latency)
+    os.environ["FAKE_FUSEE_JITTER"] = str(jitter)
+    os.environ["FAKE_FUSEE_FAILURE_RATE"] = str(failure_rate)
+    if seed is not None: os.environ["FAKE_FUSEE_SEED"] = str(seed)
+
+
+class Lifecycle:
+    # Plugs every virtual port `cycles` times. A console is unplugged once
+    # its injection has finished (or after `dwell` seconds), then plugged back
+    # in after `gap` seconds, like an operator working a rack of stations.
+    def __init__(self, bus, devices, cycles, dwell, gap, stagger):
+        self.bus = bus
+        self.devices, self.cycles, self.dwell, self.gap, self.stagger = devices, cycles, dwell, gap, stagger
+        self.done = {}
+        self.stop = threading.Event()
+        self.threads = []
+
+    def finished(self, port):
+        event = self.done.get(port)
+        if event: event.set()
+
+    def _run(self, index):
+        time.sleep(index * self.stagger)
+        for _ in range(self.cycles):
+            if self.stop.is_set(): return
+            port = f"{self.bus.busnum}-{index + 1}"
+            self.done[port] = threading.Event()
+            self.bus.plug(index)
+            self.done[port].wait(self.dwell)
+            self.bus.unplug(port)
+            if self.stop.wait(self.gap): return
+
+    def start(self):
+        for index in range(self.devices):
+            thread = threading.Thread(target=self._run, args=(index,), daemon=True)
+            thread.start(); self.threads.append(thread)
+
+    def join(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self.threads)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# End-to-end benchmark of detection and injection against simulated consoles.
+# Runs either the headless injector or the real SwitchInjectorApp (offscreen)
+# with a virtual USB bus and the fake fusee-nano, so it needs no hardware.
+#
+#   python benchmarks/stations.py --mode headless --devices 16 --cycles 5
+#   python benchmarks/stations.py --mode gui --devices 8 --json
+#   python benchmarks/stations.py --budget plug_to_done_p95=2500   # exit 1 when over
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sim
+
+BUS = sim.VirtualBus()
+sim.install(BUS)
+
+from fuseeflow.telemetry import percentile
+
+
+class Metrics:
+    def __init__(self, bus, lifecycle):
+        self.bus = bus
+        self.lifecycle = lifecycle
+        self.lock = threading.Lock()
+        self.samples = {"detect": [], "plug_to_start": [], "detect_to_start": [], "plug_to_done": []}
+        self.detected_at = {}
+        self.ok = self.failed = 0
+        self.stalls = []
+        self.started = time.monotonic()
+        self.ended = None
+
+    def _since_plug(self, port, key, now):
+        plugged = self.bus.plugged_at(port)
+        if plugged is not None: self.samples[key].append((now - plugged) * 1000)
+
+    def attached(self, port):
+        now = time.monotonic()
+        with self.lock:
+            self.detected_at[port] = now
+            self._since_plug(port, "detect", now)
+
+    def started_injection(self, port):
+        now = time.monotonic()
+        with self.lock:
+            self._since_plug(port, "plug_to_start", now)
+            if port in self.detected_at: self.samples["detect_to_start"].append((now - self.detected_at[port]) * 1000)
+
+    def finished(self, port, ok):
+        now = time.monotonic()
+        with self.lock:
+            self._since_plug(port, "plug_to_done", now)
+            if ok: self.ok += 1
+            else: self.failed += 1
+        self.lifecycle.finished(port)
+
+    def report(self):
+        elapsed = (self.ended or time.monotonic()) - self.started
+        result = {"elapsed_s": round(elapsed, 2), "plugs": len(self.bus.plugs), "succeeded": self.ok, "failed": self.failed,
+                  "injections_per_min": round(self.ok * 60 / elapsed, 1) if elapsed else 0.0}
+        for key, values in self.samples.items():
+            ordered = sorted(values)
+            for p in (50, 95):
+                value = percentile(ordered, p)
+                result[f"{key}_p{p}"] = round(value, 1) if value is not None else None
+            result[f"{key}_max"] = round(ordered[-1], 1) if ordered else None
+        if self.stalls is not None:
+            result["loop_stalls"] = len(self.stalls)
+            result["loop_stall_max"] = round(max(self.stalls), 1) if self.stalls else 0.0
+        return result
+
+
+def run_headless(args, lifecycle, payload):
+    from fuseeflow.cli import HeadlessInjector
+    from fuseeflow.injection import InjectionScheduler, create_backend
+
+    metrics = Metrics(BUS, lifecycle)
+    metrics.stalls = None # there is no event loop to stall
+
+    class CaptureLog:
+        def emit(self, event, **fields):
+            port = fields.get("port")
+            if event == "device_attached": metrics.attached(port)
+            elif event == "inject_started": metrics.started_injection(port)
+            elif event == "inject_result": metrics.finished(port, fields["ok"])
+
+    scheduler = InjectionScheduler(create_backend("fusee-nano", sim.FAKE_FUSEE_NANO), max_workers=args.jobs, timeout=30)
+    injector = HeadlessInjector(payload, scheduler, CaptureLog())
+    worker = threading.Thread(target=injector.run_watch, daemon=True)
+    worker.start()
+    lifecycle.start()
+    lifecycle.join(args.timeout)
+    metrics.ended = time.monotonic()
+    injector.stop_event.set(); worker.join(10)
+    injector.close()
+    return metrics
+
+
+def run_gui(args, lifecycle, payload):
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    from fuseeflow.config import write_config, load_config
+    from fuseeflow.constants import CONFIG_FILE
+
+    config = load_config(CONFIG_FILE)
+    config.update(last_payload=os.path.basename(payload), auto_inject=True, backend="fusee-nano", max_parallel_injections=args.jobs)
+    write_config(CONFIG_FILE, config)
+
+    import main as gui
+    app = QApplication([sys.argv[0]])
+    window = gui.SwitchInjectorApp()
+    window.fusee_nano_path = sim.FAKE_FUSEE_NANO
+    window.scheduler.backend.binary = sim.FAKE_FUSEE_NANO
+    window.show()
+
+    metrics = Metrics(BUS, lifecycle)
+    window.usb_thread.device_changed.connect(lambda action, device: metrics.attached(device.port) if action == "add" else None)
+    window.injection_worker.job_started.connect(lambda device: metrics.started_injection(device.port) if device else None)
+    window.injection_worker.job_finished.connect(lambda device, payload, result: metrics.finished(device.port, result.ok) if device else None)
+
+    # Event-loop stall detector: a 5 ms timer that notes every late tick
+    last = [time.monotonic()]
+    def tick():
+        now = time.monotonic()
+        gap = (now - last[0]) * 1000
+        if gap > args.stall_ms: metrics.stalls.append(gap)
+        last[0] = now
+    ticker = QTimer(); ticker.timeout.connect(tick); ticker.start(5)
+
+    deadline = time.monotonic() + args.timeout
+    def check_done():
+        if (lifecycle.threads and all(not thread.is_alive() for thread in lifecycle.threads)) or time.monotonic() > deadline:
+            metrics.ended = time.monotonic()
+            ticker.stop(); window.close(); app.quit()
+    poller = QTimer(); poller.timeout.connect(check_done); poller.start(100)
+    # Start plugging once the window is up and the first library scan is done
+    QTimer.singleShot(500, lambda: (lifecycle.start(), setattr(metrics, "started", time.monotonic())))
+    app.exec()
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FuseeFlow against simulated RCM consoles.")
+    parser.add_argument("--mode", choices=["headless", "gui"], default="headless")
+    parser.add_argument("--devices", type=int, default=8, help="virtual consoles (default: 8)")
+    parser.add_argument("--cycles", type=int, default=3, help="plug cycles per console (default: 3)")
+    parser.add_argument("--stagger", type=float, default=0.05, help="seconds between the first plug of each console")
+    parser.add_argument("--gap", type=float, default=0.2, help="seconds a console stays unplugged between cycles")
+    parser.add_argument("--dwell", type=float, default=10.0, help="max seconds a console stays plugged in")
+    parser.add_argument("--jobs", type=int, default=8, help="parallel injections")
+    parser.add_argument("--ready-time", type=float, default=0.15, help="seconds until a plugged console answers its device ID read")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake fusee-nano run time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="fake fusee-nano latency jitter (fraction)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fake fusee-nano failure probability")
+    parser.add_argument("--stall-ms", type=float, default=50.0, help="GUI event-loop gap counted as a stall")
+    parser.add_argument("--timeout", type=float, default=300.0, help="give up after this many seconds")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--budget", action="append", default=[], metavar="METRIC=VALUE",
+                        help="fail (exit 1) if METRIC exceeds VALUE; injections_per_min is a minimum instead")
+    args = parser.parse_args()
+
+    from fuseeflow.constants import PAYLOADS_DIR
+    BUS.ready_time = args.ready_time
+    payload = sim.write_payload(PAYLOADS_DIR)
+    sim.fake_backend_env(args.latency, args.jitter, args.failure_rate)
+    lifecycle = sim.Lifecycle(BUS, args.devices, args.cycles, args.dwell, args.gap, args.stagger)
+    metrics = (run_gui if args.mode == "gui" else run_headless)(args, lifecycle, payload)
+    report = {"mode": args.mode, "devices": args.devices, "cycles": args.cycles, **metrics.report()}
+
+    if args.json: print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items(): print(f"{key:24} {value}")
+
+    over = []
+    for budget in args.budget:
+        key, _, limit = budget.partition("=")
+        value = report.get(key)
+        if value is None: over.append(f"{key}: no data"); continue
+        if (value < float(limit)) if key == "injections_per_min" else (value > float(limit)): over.append(f"{key}: {value} (budget {limit})")
+    for line in over: print(f"OVER BUDGET {line}", file=sys.stderr)
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,12 +17,17 @@ echo "Setting up AppDir..."
 
 # Copy source
 cp main.py $APP_DIR/usr/bin/main.py
+cp -r fuseeflow $APP_DIR/usr/bin/fuseeflow
+mkdir -p $APP_DIR/usr/bin/backend/fusee-nano/files
+cp backend/fusee-nano/files/intermezzo.bin $APP_DIR/usr/bin/backend/fusee-nano/files/
 cp config.json $APP_DIR/usr/bin/ 2>/dev/null || true
 cp *.svg *.png $APP_DIR/usr/bin/
 
-# Copy binary dependencies
-cp fusee-nano $APP_DIR/usr/bin/
-chmod +x $APP_DIR/usr/bin/fusee-nano
+# Build and bundle the in-tree fusee-nano: the frontend passes it -p/-d/-i,
+# which upstream builds do not take
+make -C backend/fusee-nano
+cp backend/fusee-nano/fusee-nano $APP_DIR/usr/bin/backend/fusee-nano/
+chmod +x $APP_DIR/usr/bin/backend/fusee-nano/fusee-nano
 
 # Manually bundle libusb for pyusb (since fusee-nano might be static or pyusb loads it via ctypes)
 echo "Bundling libusb..."
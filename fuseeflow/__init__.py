@@ -0,0 +1 @@
+# FuseeFlow core: everything in here must stay importable without PyQt6.
@@ -0,0 +1,202 @@
+import hmac
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ----------------- Local event API -----------------
+# Optional HTTP server for station dashboards, off unless `api_port` is set.
+#   GET  /events   Server-Sent Events, one "event: <name>" + JSON "data:" each
+#   GET  /state    JSON snapshot of the attached consoles and the payload
+#   POST /inject   {"port": "1-2"}, or {} for every attached console
+#   POST /payload  {"name": "hekate.bin"}
+# Commands are handed to the app and answered 202; what they lead to arrives
+# on /events like everything else. With `api_token` set, every request needs
+# "Authorization: Bearer <token>" (or ?token= for EventSource clients).
+# Web pages the operator happens to open can reach 127.0.0.1 too, so POSTs
+# must be application/json (a cross-site page cannot send that without a
+# CORS preflight, which is never granted) and requests from a browser page,
+# which carry an Origin header, are refused unless they present the token.
+# A Host header other than the loopback names (or the configured api_host)
+# with our port is refused too: that is a DNS-rebinding page.
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+HEARTBEAT = 15.0
+CLIENT_QUEUE = 512 # events buffered per client before it is dropped as too slow
+MAX_BODY = 64 * 1024
+
+
+def describe_devices(registry):
+    # /state's view of a devices.DeviceRegistry
+    devices = []
+    for entry in registry.entries():
+        device = {"port": entry.port, "state": entry.state, "device_id": entry.device_id}
+        if entry.result is not None: device.update(ok=entry.result.ok, elapsed=round(entry.result.elapsed, 4))
+        devices.append(device)
+    return devices
+
+
+class _Client:
+    def __init__(self):
+        self.queue = queue.Queue(CLIENT_QUEUE)
+        self.closed = False
+
+
+class EventHub:
+    # Same emit() signature as cli.EventLog. emit never blocks: each client has
+    # its own bounded queue and the HTTP threads do the writing.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._seq = 0
+
+    def emit(self, event, **fields):
+        with self._lock:
+            if not self._clients: return
+            self._seq += 1
+            message = (self._seq, event, {"ts": round(time.time(), 3), **fields})
+            clients = list(self._clients)
+        for client in clients:
+            try: client.queue.put_nowait(message)
+            except queue.Full: self._drop(client)
+
+    def subscribe(self):
+        client = _Client()
+        with self._lock: self._clients.add(client)
+        return client
+
+    def _drop(self, client):
+        with self._lock: self._clients.discard(client)
+        client.closed = True
+
+    def unsubscribe(self, client):
+        self._drop(client)
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients); self._clients.clear()
+        for client in clients:
+            client.closed = True
+            try: client.queue.put_nowait(None)
+            except queue.Full: pass
+
+    def __len__(self):
+        return len(self._clients)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FuseeFlow"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _refuse(self):
+        # Sends the error and returns True if the request may not go on
+        if self.headers.get("Host", "").lower() not in self.server.api.allowed_hosts():
+            self._send_json(403, {"error": "unexpected Host header"}); return True
+        token = self.server.api.token
+        if not token:
+            if "Origin" not in self.headers: return False
+            self._send_json(403, {"error": "requests from web pages need api_token"}); return True
+        given = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        given = given or parse_qs(urlparse(self.path).query).get("token", [""])[0]
+        if hmac.compare_digest(given.encode(), token.encode()): return False
+        self._send_json(401, {"error": "unauthorized"}); return True
+
+    def _send_json(self, code, body):
+        # After an error, any body left unread must not be taken for the next request
+        if code >= 400: self.close_connection = True
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self._refuse(): return
+        path = urlparse(self.path).path
+        if path == "/events": self._stream()
+        elif path == "/state": self._send_json(200, self.server.api.state())
+        else: self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self._refuse(): return
+        if self.headers.get_content_type() != "application/json": return self._send_json(415, {"error": "expected Content-Type: application/json"})
+        path = urlparse(self.path).path
+        command = {"/inject": "inject", "/payload": "select_payload"}.get(path)
+        handler = self.server.api.commands.get(command)
+        if handler is None: return self._send_json(404, {"error": "not found"})
+        length = self.headers.get("Content-Length", "").strip()
+        if not length.isdigit(): return self._send_json(400, {"error": "missing or invalid Content-Length"})
+        length = int(length)
+        if length > MAX_BODY: return self._send_json(413, {"error": "body too large"})
+        try: args = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError: return self._send_json(400, {"error": "invalid JSON"})
+        if not isinstance(args, dict): return self._send_json(400, {"error": "expected a JSON object"})
+        error = handler(args)
+        if error: self._send_json(400, {"error": error})
+        else: self._send_json(202, {"accepted": command})
+
+    def _stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        hub = self.server.api.hub
+        client = hub.subscribe()
+        try:
+            self.wfile.write(b"retry: 2000\n\n"); self.wfile.flush()
+            while not client.closed:
+                try: batch = [client.queue.get(timeout=HEARTBEAT)]
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n"); self.wfile.flush(); continue
+                # Whatever else is already queued goes out in the same write
+                while len(batch) < 64:
+                    try: batch.append(client.queue.get_nowait())
+                    except queue.Empty: break
+                chunks = [f"id: {m[0]}\nevent: {m[1]}\ndata: {json.dumps(m[2])}\n\n" for m in batch if m is not None]
+                if chunks: self.wfile.write("".join(chunks).encode()); self.wfile.flush()
+                if None in batch: break
+        except OSError: pass # the dashboard went away
+        finally:
+            hub.unsubscribe(client)
+
+
+class ApiServer:
+    # state() and commands[name](args) are called from the HTTP threads;
+    # a command returns an error message, or None once it has been accepted.
+    def __init__(self, hub, state, commands, host="127.0.0.1", port=0, token=None):
+        self.hub = hub
+        self.state = state
+        self.commands = commands
+        self.host, self.port = host, port
+        self.token = token or None
+        self._httpd = None
+
+    def allowed_hosts(self):
+        # Host header values a request may carry
+        hosts = list(LOOPBACK_HOSTS)
+        if self.host not in WILDCARD_HOSTS: hosts.append(f"[{self.host}]" if ":" in self.host else self.host)
+        return {f"{host.lower()}:{self.port}" for host in hosts}
+
+    def start(self):
+        # Returns the bound port (port=0 picks a free one)
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.api = self
+        threading.Thread(target=self._httpd.serve_forever, name="api", daemon=True).start()
+        self.port = self._httpd.server_address[1]
+        return self.port
+
+    def stop(self):
+        if self._httpd is None: return
+        self.hub.close()
+        self._httpd.shutdown(); self._httpd.server_close()
+        self._httpd = None
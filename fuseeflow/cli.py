@@ -0,0 +1,284 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from fuseeflow import devices as device_states
+from fuseeflow import injection
+from fuseeflow.api import ApiServer, EventHub, describe_devices
+from fuseeflow.config import load_config
+from fuseeflow.consoles import ConsoleRegistry
+from fuseeflow.constants import INTERMEZZO_PATH, PACKET_CACHE_DIR, RCM_PRODUCT_ID, RCM_VENDOR_ID, ensure_fusee_nano
+from fuseeflow.devices import DeviceRegistry
+from fuseeflow.hotplug import RcmDetector
+from fuseeflow.injection import BACKEND_NAMES, InjectionJob, InjectionScheduler, create_backend
+from fuseeflow.library import get_index, list_payloads, resolve_payload
+from fuseeflow.packets import PacketCache
+from fuseeflow.readiness import ReadinessProbe
+from fuseeflow.telemetry import TelemetryStore, build_record, detect_to_boot, format_summary
+
+# ----------------- Headless mode -----------------
+# `main.py --headless ...` lands here before PyQt6 is ever imported. It shares
+# config, payload library, detection and injection with the GUI.
+
+
+class EventLog:
+    # One JSON object per line on stdout, or "[EVENT] key=value" with --log-format text
+    # Every event is also pushed to the local API's subscribers, if any
+    def __init__(self, fmt="json", stream=None, hub=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.hub = hub
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        if self.hub: self.hub.emit(event, **fields)
+        if self.fmt == "json":
+            line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields})
+        else:
+            line = f"[{event.upper()}] " + " ".join(f"{key}={value}" for key, value in fields.items())
+        with self.lock:
+            self.stream.write(line + "\n"); self.stream.flush()
+
+
+class HeadlessInjector:
+    def __init__(self, payload, scheduler, log, readiness=None):
+        self.payload = payload
+        self.scheduler = scheduler
+        self.log = log
+        self.readiness = readiness or ReadinessProbe()
+        self.devices = DeviceRegistry()
+        self.detector = RcmDetector(RCM_VENDOR_ID, RCM_PRODUCT_ID)
+        self.telemetry = TelemetryStore()
+        self.consoles = ConsoleRegistry()
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock() # the counters are bumped from scheduler and probe threads
+        self.succeeded = 0
+        self.failed = 0
+
+    def inject(self, device, ready=None):
+        # Resolved per injection, so a freshly downloaded Hekate is picked up.
+        # A console the registry routes elsewhere gets its own payload. Without
+        # a probe result, the ID the probe or an earlier attempt read is
+        # reused: the bootrom sends it only once.
+        known = self.devices.get(device.port)
+        device_id = ready.device_id if ready and ready.device_id else known.device_id if known else None
+        routed = self.consoles.route(device_id)
+        payload = resolve_payload(routed) if routed else None
+        if routed and not payload: self.log.emit("warning", message=f"Routed payload '{routed}' not found in library, using default", port=device.port)
+        payload = payload or resolve_payload(self.payload)
+        if not payload:
+            self.log.emit("error", message=f"Payload '{self.payload}' not found in library", port=device.port)
+            with self.lock: self.failed += 1
+            return False
+        if self.scheduler.busy(device): return False
+        entry = self.devices.set_state(device.port, device_states.QUEUED)
+        self.log.emit("inject_queued", port=device.port, payload=os.path.basename(payload))
+        job = InjectionJob(device, payload, detected_at=entry.attached_at if entry else None,
+                           device_id=device_id, ready_at=ready.ready_at if ready else None)
+        return self.scheduler.submit(job, on_start=self.on_start, on_done=self.on_done, on_progress=self.on_progress)
+
+    def api_state(self):
+        with self.lock: succeeded, failed = self.succeeded, self.failed
+        return {"mode": "headless", "payload": os.path.basename(self.payload), "devices": describe_devices(self.devices),
+                "succeeded": succeeded, "failed": failed}
+
+    def api_inject(self, args):
+        port = args.get("port")
+        entries = [self.devices.get(port)] if port else self.devices.entries()
+        if not all(entries): return f"No console on port {port}"
+        if not entries: return "No console attached"
+        for entry in entries: self.inject(entry.device)
+
+    def api_select(self, args):
+        name = args.get("name")
+        path = resolve_payload(name, library_only=True) if isinstance(name, str) else None
+        if not path: return f"Payload '{name}' not found in library"
+        self.payload = name if name.lower() == "hekate" else path # "hekate" keeps following new builds
+        self.log.emit("payload_selected", payload=name)
+
+    def on_ready(self, device, ready):
+        entry = self.devices.get(device.port)
+        if not entry: return # unplugged while probing
+        self.devices.identify(device.port, ready.device_id)
+        if ready.device_id: self.consoles.seen(ready.device_id)
+        fields = {"port": device.port, "ready": ready.ready, "attempts": ready.attempts}
+        if ready.device_id: fields["device_id"] = ready.device_id
+        if ready.ready: fields["ready_ms"] = round((ready.ready_at - entry.attached_at) * 1000, 1)
+        elif ready.error: fields["error"] = ready.error
+        self.log.emit("device_ready", **fields)
+        self.inject(entry.device, ready)
+
+    def on_start(self, device):
+        self.devices.set_state(device.port, device_states.INJECTING)
+        self.log.emit("inject_started", port=device.port)
+
+    def on_progress(self, device, phase, done, total):
+        if phase == injection.PHASE_SENT and done < total: return # one event per chunk is too chatty
+        self.log.emit("inject_phase", port=device.port, phase=phase, **({"bytes": done} if phase == injection.PHASE_SENT else {}))
+
+    def on_done(self, device, payload, result):
+        self.devices.set_state(device.port, device_states.DONE if result.ok else device_states.FAILED, result)
+        self.devices.identify(device.port, result.device_id)
+        with self.lock:
+            if result.ok: self.succeeded += 1
+            else: self.failed += 1
+        fields = {"port": device.port, "payload": os.path.basename(payload), "ok": result.ok, "returncode": result.returncode, "elapsed": round(result.elapsed, 4)}
+        if result.device_id: fields["device_id"] = result.device_id
+        if result.phases: fields["phases"] = {phase: round(seconds, 4) for phase, seconds in result.phases.items()}
+        latency = detect_to_boot(result)
+        if latency is not None: fields["detect_to_boot_ms"] = round(latency, 1)
+        self.telemetry.append(build_record(device, payload, result, self.scheduler.backend.name))
+        if result.device_id: self.consoles.record(result.device_id, payload, result.ok)
+        if not result.ok: fields["error"] = result.stderr.strip()
+        self.log.emit("inject_result", **fields)
+
+    def handle_changes(self, changes):
+        # New consoles are injected from on_ready, once the probe says they answer
+        for action, device in changes:
+            if action == "add":
+                entry = self.devices.attach(device)
+                self.log.emit("device_attached", port=device.port, bus=device.busnum, dev=device.devnum)
+                self.readiness.submit(device, self.on_ready, entry.attached_at)
+            else:
+                self.devices.detach(device.port)
+                self.readiness.cancel(device)
+                self.scheduler.cancel(device, "Device detached")
+                self.log.emit("device_detached", port=device.port)
+
+    def run_once(self, wait):
+        # Injects every console attached now (waiting up to `wait` seconds for
+        # the first one), then returns once all injections have finished.
+        self.handle_changes(self.detector.refresh())
+        deadline = time.monotonic() + wait
+        while not self.devices and not self.stop_event.is_set() and time.monotonic() < deadline:
+            self.handle_changes(self.detector.wait(min(1.0, max(0.0, deadline - time.monotonic()))))
+        if not self.devices:
+            self.log.emit("error", message="No RCM device found")
+            return 2
+        self.readiness.shutdown(wait=True) # every probe has handed its console to the scheduler
+        self.scheduler.shutdown(wait=True, cancel=False)
+        return 0 if self.failed == 0 else 1
+
+    def run_watch(self):
+        # Long-running daemon: inject each console as it is plugged in
+        self.handle_changes(self.detector.refresh())
+        while not self.stop_event.is_set():
+            self.handle_changes(self.detector.wait(1.0))
+        self.readiness.shutdown()
+        self.scheduler.shutdown(wait=True)
+        return 0
+
+    def close(self):
+        self.readiness.shutdown()
+        self.detector.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py --headless", description="Inject payloads without the GUI.")
+    parser.add_argument("--headless", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("-p", "--payload", help="payload file, library name, or 'hekate' for the newest Hekate (default: from config)")
+    parser.add_argument("-w", "--watch", action="store_true", help="keep running and inject every console that gets plugged in")
+    parser.add_argument("--wait", type=float, default=0, metavar="SECONDS", help="without --watch: how long to wait for a console (default: 0)")
+    parser.add_argument("--backend", choices=BACKEND_NAMES, help="injection backend (default: from config)")
+    parser.add_argument("-j", "--jobs", type=int, metavar="N", help="parallel injections (default: from config)")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS", help="per-injection timeout (default: from config)")
+    parser.add_argument("--log-format", choices=["json", "text"], default="json", help="log output format (default: json)")
+    parser.add_argument("--list-payloads", action="store_true", help="print the payload library and exit")
+    parser.add_argument("--consoles", action="store_true", help="print the console registry (device IDs, routed payloads, counts) and exit")
+    parser.add_argument("--route", action="append", default=[], metavar="DEVICE_ID=PAYLOAD",
+                        help="always inject PAYLOAD (a library name) on that console; an empty PAYLOAD clears it. Exits after saving")
+    parser.add_argument("--api-port", type=int, metavar="PORT",
+                        help="serve the local event API (SSE on /events) on 127.0.0.1:PORT; 0 disables it (default: from config)")
+    parser.add_argument("--sync", action="store_true", help="update every payload listed in the payload manifest and exit")
+    parser.add_argument("--stats", action="store_true", help="print latency percentiles and failures from the injection history and exit")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = load_config()
+    log = EventLog(args.log_format)
+
+    if args.list_payloads:
+        for name in list_payloads(): print(name)
+        return 0
+
+    if args.route:
+        consoles = ConsoleRegistry()
+        for route in args.route:
+            device_id, _, name = route.partition("=")
+            device_id = device_id.strip().lower()
+            if len(device_id) != 32 or any(c not in "0123456789abcdef" for c in device_id):
+                log.emit("error", message=f"Invalid device ID '{device_id}'"); return 2
+            if name and not resolve_payload(name):
+                log.emit("error", message=f"Payload '{name}' not found in library"); return 2
+            consoles.set_payload(device_id, name or None)
+            log.emit("console_routed", device_id=device_id, payload=name or None)
+        return 0
+
+    if args.consoles:
+        for device_id, entry in ConsoleRegistry().consoles():
+            if args.log_format == "json": log.emit("console", device_id=device_id, **entry)
+            else: print(f"{device_id}  {entry['payload'] or '-':<24} {entry['injections']:>5} injections, {entry['failures']} failed, last seen {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_seen']))}")
+        return 0
+
+    if args.sync:
+        from fuseeflow.manifest import ManifestSync, SyncError
+        try: results = ManifestSync(library=get_index()).run()
+        except SyncError as e:
+            log.emit("error", message=str(e)); return 2
+        for result in results: log.emit("sync_result", **{key: value for key, value in result._asdict().items() if value is not None})
+        return 1 if any(result.status == "error" for result in results) else 0
+
+    if args.stats:
+        summary = TelemetryStore().summary()
+        if args.log_format == "json": log.emit("stats", **summary)
+        else: print(format_summary(summary))
+        return 0
+
+    payload = args.payload or ("hekate" if config.get("simple_mode") else config.get("last_payload")) or "hekate"
+    if not resolve_payload(payload) and not args.watch:
+        log.emit("error", message=f"Payload '{payload}' not found in library")
+        return 2
+
+    backend_name = args.backend or config.get("backend", "fusee-nano")
+    if backend_name == "native":
+        backend = create_backend(backend_name, packet_cache=PacketCache(PACKET_CACHE_DIR, INTERMEZZO_PATH))
+    else:
+        backend = create_backend(backend_name, ensure_fusee_nano(log=lambda message: log.emit("build", message=message)))
+    scheduler = InjectionScheduler(
+        backend,
+        max_workers=max(1, args.jobs or int(config.get("max_parallel_injections", 8))),
+        timeout=args.timeout or float(config.get("injection_timeout", 30)),
+    )
+
+    injector = HeadlessInjector(payload, scheduler, log)
+    api = None
+    api_port = config.get("api_port", 0) if args.api_port is None else args.api_port
+    if api_port:
+        log.hub = EventHub()
+        api = ApiServer(log.hub, injector.api_state, {"inject": injector.api_inject, "select_payload": injector.api_select},
+                        host=config.get("api_host", "127.0.0.1"), port=api_port, token=config.get("api_token"))
+        try: log.emit("api_listening", host=api.host, port=api.start())
+        except OSError as e:
+            log.emit("error", message=f"Local API could not listen on port {api_port}: {e}"); api = None
+    signal.signal(signal.SIGTERM, lambda *_: injector.stop_event.set())
+    log.emit("ready", mode="watch" if args.watch else "once", backend=backend_name, payload=payload, detection=injector.detector.mode)
+    try:
+        return injector.run_watch() if args.watch else injector.run_once(args.wait)
+    except KeyboardInterrupt:
+        injector.stop_event.set()
+        scheduler.shutdown(wait=True)
+        return 0
+    except (ImportError, OSError, ValueError) as e: # no pyusb / no libusb backend
+        scheduler.shutdown()
+        log.emit("error", message=f"USB detection failed: {e}")
+        return 2
+    finally:
+        injector.close()
+        log.emit("stopped", succeeded=injector.succeeded, failed=injector.failed)
+        if api: api.stop()
@@ -0,0 +1,55 @@
+import numpy as np
+
+# ----------------- Confetti particles -----------------
+# Array-backed simulation for the GUI's ConfettiOverlay. Particles are stored
+# sorted by color so the painter can draw each color as one contiguous batch.
+# Motion uses a fixed time step: a late frame runs a few extra steps (capped)
+# instead of making the confetti speed up or stall with the frame rate.
+
+STEP = 1 / 60
+MAX_STEPS = 4 # a longer hitch is dropped rather than simulated
+SPEED = 60 # the original animation moved 1x its velocity per 16 ms tick
+
+
+class ConfettiSystem:
+    def __init__(self, colors, count=150, seed=None):
+        self.colors = colors
+        self.count = count
+        self.rng = np.random.default_rng(seed)
+        self.rects = np.zeros((0, 4)) # x, y, w, h
+        self.velocity = np.zeros((0, 2))
+        self.batches = [] # (color index, start, end) into rects
+        self.height = 0
+        self.accumulator = 0.0
+
+    def spawn(self, width, height, count=None):
+        n = self.count if count is None else count
+        rng = self.rng
+        color = np.sort(rng.integers(0, len(self.colors), n))
+        self.rects = np.column_stack([
+            rng.uniform(0, width, n), rng.uniform(-height, 0, n), rng.uniform(8, 12, n), rng.uniform(10, 15, n),
+        ])
+        self.velocity = np.column_stack([rng.uniform(-2, 2, n), rng.uniform(3, 6, n)]) * SPEED
+        bounds = np.flatnonzero(np.diff(color)) + 1
+        starts, ends = np.r_[0, bounds], np.r_[bounds, n]
+        self.batches = [(int(color[start]), int(start), int(end)) for start, end in zip(starts, ends) if end > start]
+        self.height = height
+        self.accumulator = 0.0
+
+    def advance(self, elapsed):
+        # -> number of fixed steps taken for `elapsed` seconds of wall time
+        self.accumulator = min(self.accumulator + elapsed, MAX_STEPS * STEP)
+        steps = int(self.accumulator / STEP)
+        if steps:
+            self.accumulator -= steps * STEP
+            self.rects[:, :2] += self.velocity * (STEP * steps)
+            # Pieces that fall off the bottom re-enter just above the top
+            fallen = self.rects[:, 1] > self.height
+            self.rects[fallen, 1] = -self.rects[fallen, 3]
+        return steps
+
+    def resize(self, height):
+        self.height = height
+
+    def clear(self):
+        self.spawn(0, 0, 0)
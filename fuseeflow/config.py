@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import threading
+import time
+
+from fuseeflow.constants import CONFIG_FILE
+
+# Bump when a key is renamed or its meaning changes, and teach migrate_config
+CONFIG_SCHEMA_VERSION = 1
+
+DEFAULT_CONFIG = {
+    "schema_version": CONFIG_SCHEMA_VERSION,
+    "last_payload": "", "dark_mode": True, "auto_inject": False, "favorites": [], "simple_mode": False,
+    "max_parallel_injections": 8, "backend": "fusee-nano", "injection_timeout": 30,
+    "show_log": False, "launch_in_terminal": False, "close_to_tray": False,
+    "api_port": 0, "api_host": "127.0.0.1", "api_token": "", # local event API, off while api_port is 0
+}
+
+
+def migrate_config(data):
+    # Files written before the schema was versioned are version 0 and need no changes
+    data["schema_version"] = CONFIG_SCHEMA_VERSION
+    return data
+
+
+def load_config(path=CONFIG_FILE, quarantine=True):
+    # quarantine=False only reads, for a peek before the real ConfigStore loads
+    config = dict(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                config.update(migrate_config(json.load(f)))
+        except Exception as e:
+            if not quarantine: return config
+            print(f"Config load error: {e}", file=sys.stderr)
+            # Keep the unreadable file around instead of overwriting it on the next save
+            try: os.replace(path, path + ".corrupt")
+            except OSError: pass
+    return config
+
+
+def write_config(path, config):
+    # temp file + fsync + rename: a crash leaves either the old or the new file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(config, f)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try: os.fsync(dir_fd)
+        finally: os.close(dir_fd)
+    except OSError: pass
+
+
+# ----------------- Config store -----------------
+class ConfigStore:
+    # Changes are merged in memory and written by a background thread once
+    # they have been quiet for `delay` seconds. Updates that change nothing
+    # never reach the disk.
+    def __init__(self, path=CONFIG_FILE, delay=0.5):
+        self.path = path
+        self.delay = delay
+        self._data = load_config(path)
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._changed_at = None
+        self._closed = False
+        self._thread = None
+
+    @property
+    def schema_version(self):
+        return self._data["schema_version"]
+
+    def get(self, key, default=None):
+        with self._cond: return self._data.get(key, default)
+
+    def __getitem__(self, key):
+        with self._cond: return self._data[key]
+
+    def snapshot(self):
+        with self._cond: return dict(self._data)
+
+    def update(self, changes=None, **fields):
+        fields.update(changes or {})
+        with self._cond:
+            changed = {key: value for key, value in fields.items() if key not in self._data or self._data[key] != value}
+            if not changed or self._closed: return False
+            self._data.update(changed)
+            self._changed_at = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="config-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return True
+
+    def _take(self):
+        # Caller holds the lock; returns the data to write, or None
+        if self._changed_at is None: return None
+        self._changed_at = None
+        return dict(self._data)
+
+    def _write(self, data):
+        with self._write_lock:
+            try: write_config(self.path, data)
+            except OSError as e: print(f"Config save error: {e}", file=sys.stderr)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._changed_at is None and not self._closed: self._cond.wait()
+                if self._closed: return
+                remaining = self._changed_at + self.delay - time.monotonic()
+                if remaining > 0: self._cond.wait(remaining); continue
+                data = self._take()
+            self._write(data)
+
+    def flush(self):
+        with self._cond: data = self._take()
+        if data is not None: self._write(data)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None: self._thread.join()
+        self.flush()
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import threading
+import time
+
+from fuseeflow.constants import CONSOLES_FILE
+
+# ----------------- Console registry -----------------
+# Every console that has been identified or injected, keyed by its 16-byte
+# RCM device ID (hex), with an optional preferred payload. Auto-inject asks route() for the
+# payload as soon as the readiness probe has read the ID. Entries look like
+#   {"payload": "hekate.bin" | None, "first_seen": ts,
+#    "last_seen": ts, "last_payload": "...", "injections": n, "failures": n}
+# and the file is rewritten (temp file + rename) whenever one changes.
+
+
+class ConsoleRegistry:
+    def __init__(self, path=CONSOLES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._consoles = None
+
+    def _load(self):
+        if self._consoles is not None: return
+        try:
+            with open(self.path, "r") as f: data = json.load(f)
+            self._consoles = data["consoles"] if data.get("version") == 1 and isinstance(data.get("consoles"), dict) else {}
+        except (OSError, ValueError, KeyError, AttributeError): self._consoles = {}
+
+    def _save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f: json.dump({"version": 1, "consoles": self._consoles}, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e: print(f"Console registry write error: {e}", file=sys.stderr)
+
+    def _entry(self, device_id):
+        # Caller holds the lock
+        entry = self._consoles.get(device_id)
+        if entry is None:
+            now = round(time.time(), 3)
+            entry = self._consoles[device_id] = {"payload": None, "first_seen": now, "last_seen": now,
+                                                 "last_payload": None, "injections": 0, "failures": 0}
+        return entry
+
+    def get(self, device_id):
+        with self._lock:
+            self._load()
+            entry = self._consoles.get(device_id)
+            return dict(entry) if entry else None
+
+    def route(self, device_id):
+        # The console's preferred payload (a library name), or None
+        if not device_id: return None
+        with self._lock:
+            self._load()
+            entry = self._consoles.get(device_id)
+            return entry["payload"] if entry else None
+
+    def set_payload(self, device_id, payload):
+        # payload=None clears the routing
+        with self._lock:
+            self._load()
+            entry = self._entry(device_id)
+            entry["payload"] = os.path.basename(payload) if payload else None
+            self._save()
+
+    def seen(self, device_id):
+        # The readiness probe read the ID; no injection (yet)
+        with self._lock:
+            self._load()
+            self._entry(device_id)["last_seen"] = round(time.time(), 3)
+            self._save()
+
+    def record(self, device_id, payload, ok):
+        with self._lock:
+            self._load()
+            entry = self._entry(device_id)
+            entry["last_seen"] = round(time.time(), 3)
+            entry["last_payload"] = os.path.basename(payload)
+            entry["injections"] += 1
+            if not ok: entry["failures"] += 1
+            self._save()
+
+    def consoles(self):
+        # [(device_id, entry)], most recently seen first
+        with self._lock:
+            self._load()
+            return sorted(((device_id, dict(entry)) for device_id, entry in self._consoles.items()), key=lambda item: -item[1]["last_seen"])
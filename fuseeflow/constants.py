@@ -0,0 +1,101 @@
+import os
+import shutil
+import subprocess
+
+# ----------------- Constants -----------------
+# Determine paths based on standard Linux XDG directories for user data
+# This ensures it works in read-only environments like AppImages
+HOME = os.path.expanduser("~")
+XDG_CONFIG_HOME = os.environ.get("XDG_CONFIG_HOME", os.path.join(HOME, ".config"))
+XDG_DATA_HOME = os.environ.get("XDG_DATA_HOME", os.path.join(HOME, ".local", "share"))
+
+APP_NAME = "FuseeFlow"
+CONFIG_DIR = os.path.join(XDG_CONFIG_HOME, APP_NAME)
+DATA_DIR = os.path.join(XDG_DATA_HOME, APP_NAME)
+
+# Per-login files (the single-instance socket); DATA_DIR stands in without XDG_RUNTIME_DIR
+RUNTIME_DIR = os.path.join(os.environ["XDG_RUNTIME_DIR"], APP_NAME) if os.environ.get("XDG_RUNTIME_DIR") else DATA_DIR
+
+# Ensure directories exist
+os.makedirs(CONFIG_DIR, exist_ok=True)
+os.makedirs(DATA_DIR, exist_ok=True)
+os.makedirs(RUNTIME_DIR, mode=0o700, exist_ok=True)
+
+# Directory holding main.py and the bundled assets (the AppImage's usr/bin)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RCM_VENDOR_ID = 0x0955
+RCM_PRODUCT_ID = 0x7321
+
+FUSEE_SOURCE_DIR = os.path.join(BASE_DIR, "backend", "fusee-nano")
+LOCAL_BINARY = os.path.join(FUSEE_SOURCE_DIR, "fusee-nano")
+INTERMEZZO_PATH = os.path.join(FUSEE_SOURCE_DIR, "files", "intermezzo.bin")
+
+CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+PAYLOADS_DIR = os.path.join(DATA_DIR, "payloads")
+PACKET_CACHE_DIR = os.path.join(DATA_DIR, "packets")
+PAYLOAD_INDEX_FILE = os.path.join(DATA_DIR, "payload_index.json")
+MANIFEST_FILE = os.path.join(CONFIG_DIR, "payloads.json")
+MANIFEST_CACHE = os.path.join(DATA_DIR, "manifest_cache.json")
+TELEMETRY_FILE = os.path.join(DATA_DIR, "telemetry.jsonl")
+READINESS_FILE = os.path.join(DATA_DIR, "readiness.json")
+LOG_FILE = os.path.join(DATA_DIR, "fuseeflow.log")
+CONSOLES_FILE = os.path.join(DATA_DIR, "consoles.json")
+INSTANCE_LOCK = os.path.join(RUNTIME_DIR, "instance.lock")
+INSTANCE_SOCKET = os.path.join(RUNTIME_DIR, "instance.sock")
+
+# Settle time between a console showing up and auto-injecting it, for when
+# it cannot be probed (see fuseeflow.readiness); also caps the tuned delay
+AUTO_INJECT_DELAY_MS = 500
+
+
+# ----------------- fusee-nano -----------------
+def fusee_nano_targets(binary):
+    # Upstream fusee-nano only takes a payload and injects whichever console
+    # it finds first; the frontend always passes the in-tree build's -p/-d/-i
+    try: usage = subprocess.run([binary], capture_output=True, text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError): return False
+    return "-d bus:dev" in usage and "-i device_id" in usage
+
+
+def locate_fusee_nano():
+    # Priority:
+    # 1. Local backend source build (backend/fusee-nano/fusee-nano), also what the AppImage bundles
+    # 2. System PATH, but only a build of this tree (e.g. its `make install`)
+    # Otherwise the local path, for ensure_fusee_nano to build
+    if os.path.exists(LOCAL_BINARY): return LOCAL_BINARY
+    system = shutil.which("fusee-nano")
+    return system if system and fusee_nano_targets(system) else LOCAL_BINARY
+
+
+def fusee_nano_outdated():
+    # A local build older than its sources predates options the frontend
+    # passes (-d, -i), so it is rebuilt like a missing one
+    try: built = os.path.getmtime(LOCAL_BINARY)
+    except OSError: return False
+    src = os.path.join(FUSEE_SOURCE_DIR, "src")
+    try: return any(os.path.getmtime(os.path.join(src, name)) > built for name in os.listdir(src))
+    except OSError: return False
+
+
+def ensure_fusee_nano(log=print):
+    # Builds the bundled backend if no binary is available (or the local one
+    # is outdated), then locates it. Only a source checkout has a Makefile: the
+    # AppImage ships backend/fusee-nano with just the binary and intermezzo, on
+    # a read-only mount.
+    missing = not os.path.exists(LOCAL_BINARY)
+    if not os.path.exists(os.path.join(FUSEE_SOURCE_DIR, "Makefile")):
+        path = locate_fusee_nano()
+        if not os.path.exists(path): log("[ERROR] fusee-nano binary not found, and there is no source to build it from.")
+        return path
+    if missing or fusee_nano_outdated():
+        log("[INFO] fusee-nano binary not found. Attempting to build from source..." if missing else "[INFO] fusee-nano binary is outdated. Rebuilding...")
+        try:
+            # Check if make and gcc are available
+            if shutil.which("make") and shutil.which("gcc"):
+                subprocess.run(["make"], cwd=FUSEE_SOURCE_DIR, check=True, stdout=subprocess.DEVNULL if log is not print else None)
+                log("[SUCCESS] fusee-nano built successfully.")
+            else:
+                log("[ERROR] 'make' or 'gcc' not found. Cannot build fusee-nano.")
+        except Exception as e:
+            log(f"[ERROR] Build failed: {e}")
+    return locate_fusee_nano()
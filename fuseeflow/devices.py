@@ -0,0 +1,68 @@
+import threading
+import time
+
+# ----------------- Attached device registry -----------------
+# One entry per RCM console, keyed by its USB port path so that every console
+# on a hub keeps its own state and last result.
+
+DETECTED = "detected"
+QUEUED = "queued"
+INJECTING = "injecting"
+DONE = "done"
+FAILED = "failed"
+
+
+class DeviceEntry:
+    def __init__(self, device):
+        self.device = device
+        self.state = DETECTED
+        self.result = None
+        self.device_id = None # RCM device ID, once the probe or an injection has read it
+        self.attached_at = time.monotonic()
+
+    @property
+    def port(self):
+        return self.device.port
+
+
+class DeviceRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def attach(self, device):
+        with self._lock:
+            entry = self._entries[device.port] = DeviceEntry(device)
+            return entry
+
+    def detach(self, port):
+        with self._lock:
+            return self._entries.pop(port, None)
+
+    def get(self, port):
+        with self._lock:
+            return self._entries.get(port)
+
+    def set_state(self, port, state, result=None):
+        with self._lock:
+            entry = self._entries.get(port)
+            if entry:
+                entry.state = state
+                if result is not None: entry.result = result
+            return entry
+
+    def identify(self, port, device_id):
+        with self._lock:
+            entry = self._entries.get(port)
+            if entry and device_id: entry.device_id = device_id
+            return entry
+
+    def entries(self):
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda e: e.port)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, port):
+        return port in self._entries
@@ -0,0 +1,166 @@
+import os
+import select
+import socket
+from collections import namedtuple
+
+# ----------------- RCM device detection -----------------
+# On Linux we listen to kernel uevents over netlink and only walk sysfs once at
+# startup (or after the socket overflowed). Without netlink we fall back to
+# polling sysfs, and without sysfs (Windows, macOS) to polling libusb via pyusb.
+
+SYSFS_DEVICE_PATH = "/sys/bus/usb/devices"
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+UEVENT_BUFFER_SIZE = 1024 * 1024
+
+# port is the sysfs device name ("1-2.3"); it is stable for as long as the
+# console stays plugged into the same hub port.
+RcmDevice = namedtuple("RcmDevice", ["port", "busnum", "devnum"])
+
+
+def _read_sysfs_attr(port, attr):
+    try:
+        with open(os.path.join(SYSFS_DEVICE_PATH, port, attr), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def scan_sysfs(vid, pid):
+    devices = {}
+    for port in os.listdir(SYSFS_DEVICE_PATH):
+        # Interfaces ("1-2:1.0") and root hubs ("usb1") are never the console
+        if ":" in port or port.startswith("usb"): continue
+        try:
+            if int(_read_sysfs_attr(port, "idVendor") or "0", 16) != vid: continue
+            if int(_read_sysfs_attr(port, "idProduct") or "0", 16) != pid: continue
+            devices[port] = RcmDevice(port, int(_read_sysfs_attr(port, "busnum")), int(_read_sysfs_attr(port, "devnum")))
+        except (TypeError, ValueError):
+            continue # device vanished while we were reading it
+    return devices
+
+
+def scan_pyusb(vid, pid):
+    import usb.core
+    devices = {}
+    for dev in usb.core.find(find_all=True, idVendor=vid, idProduct=pid):
+        ports = getattr(dev, "port_numbers", None)
+        port = f"{dev.bus}-{'.'.join(str(p) for p in ports)}" if ports else f"{dev.bus}-{dev.address}"
+        devices[port] = RcmDevice(port, dev.bus, dev.address)
+    return devices
+
+
+def parse_uevent(data):
+    # "ACTION@DEVPATH\0KEY=VALUE\0KEY=VALUE\0..."
+    fields = data.split(b"\0")
+    if not fields or b"@" not in fields[0]: return None
+    event = {}
+    for field in fields[1:]:
+        key, sep, value = field.partition(b"=")
+        if sep: event[key.decode("ascii", "replace")] = value.decode("utf-8", "replace")
+    return event
+
+
+class UeventMonitor:
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_KOBJECT_UEVENT)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UEVENT_BUFFER_SIZE)
+            self.sock.bind((0, UEVENT_KERNEL_GROUP))
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_events(self):
+        # Drain everything queued. Returns None if the kernel dropped events
+        # because we were too slow; the caller must then rescan.
+        events = []
+        while True:
+            try:
+                data = self.sock.recv(UEVENT_BUFFER_SIZE)
+            except BlockingIOError:
+                return events
+            except OSError:
+                return None # ENOBUFS
+            event = parse_uevent(data)
+            if event: events.append(event)
+
+    def close(self):
+        self.sock.close()
+
+
+class RcmDetector:
+    def __init__(self, vid, pid):
+        self.vid, self.pid = vid, pid
+        self.devices = {}
+        self.monitor = None
+        self._product = f"{vid:x}/{pid:x}/"
+        self.use_sysfs = os.path.isdir(SYSFS_DEVICE_PATH)
+        # interrupt() writes here to end a wait() early, so callers can block
+        # for long stretches and still stop promptly
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False); os.set_blocking(self._wakeup_w, False)
+        if self.use_sysfs:
+            try: self.monitor = UeventMonitor()
+            except (OSError, AttributeError): self.monitor = None # no netlink (non-Linux, sandbox)
+
+    @property
+    def mode(self):
+        return "hotplug" if self.monitor else "poll"
+
+    def scan(self):
+        return scan_sysfs(self.vid, self.pid) if self.use_sysfs else scan_pyusb(self.vid, self.pid)
+
+    def refresh(self):
+        # Full rescan; returns [(action, RcmDevice)] for anything that changed
+        current = self.scan()
+        changes = [("remove", dev) for port, dev in self.devices.items() if port not in current]
+        changes += [("add", dev) for port, dev in current.items() if self.devices.get(port) != dev]
+        self.devices = current
+        return changes
+
+    def interrupt(self):
+        try: os.write(self._wakeup_w, b"x")
+        except (BlockingIOError, OSError): pass # already pending, or closed
+
+    def _interrupted(self, readable):
+        if self._wakeup_r not in readable: return False
+        try:
+            while os.read(self._wakeup_r, 64): pass
+        except (BlockingIOError, OSError): pass
+        return True
+
+    def wait(self, timeout):
+        # Returns [] straight away after interrupt()
+        if not self.monitor:
+            readable, _, _ = select.select([self._wakeup_r], [], [], timeout)
+            return [] if self._interrupted(readable) else self.refresh()
+
+        readable, _, _ = select.select([self.monitor, self._wakeup_r], [], [], timeout)
+        if self._interrupted(readable) or self.monitor not in readable: return []
+        events = self.monitor.read_events()
+        if events is None: return self.refresh()
+
+        changes = []
+        for event in events:
+            if event.get("SUBSYSTEM") != "usb" or event.get("DEVTYPE") != "usb_device": continue
+            port = os.path.basename(event.get("DEVPATH", ""))
+            action = event.get("ACTION")
+            if action == "remove" and port in self.devices:
+                changes.append(("remove", self.devices.pop(port)))
+            elif action == "add" and event.get("PRODUCT", "").startswith(self._product):
+                try: dev = RcmDevice(port, int(event["BUSNUM"]), int(event["DEVNUM"]))
+                except (KeyError, ValueError): continue
+                self.devices[port] = dev
+                changes.append(("add", dev))
+        return changes
+
+    def close(self):
+        if self.monitor: self.monitor.close(); self.monitor = None
+        if self._wakeup_r >= 0:
+            os.close(self._wakeup_r); os.close(self._wakeup_w)
+            self._wakeup_r = self._wakeup_w = -1
@@ -0,0 +1,245 @@
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from fuseeflow import rcm
+from fuseeflow.constants import INTERMEZZO_PATH, RCM_PRODUCT_ID, RCM_VENDOR_ID, locate_fusee_nano
+from fuseeflow.hotplug import scan_sysfs
+
+# ----------------- Injection jobs -----------------
+# marks: monotonic timestamps of the job's milestones, see InjectionJob.mark
+InjectionResult = namedtuple("InjectionResult", ["ok", "returncode", "stdout", "stderr", "elapsed", "phases", "device_id", "marks"], defaults=(None, None, None))
+
+# Progress phases, reported as progress(phase, done, total)
+PHASE_OPENED = "opened"
+PHASE_DEVICE_ID = "device_id"
+PHASE_SENT = "sent"
+PHASE_SMASHED = "smashed"
+
+
+class InjectionCancelled(Exception):
+    pass
+
+
+class InjectionJob:
+    # device_id is set when a readiness probe already read it off the
+    # console; the bootrom sends it only once, so the backend must not re-read
+    def __init__(self, device, payload, timeout=None, detected_at=None, device_id=None, ready_at=None):
+        self.device = device
+        self.payload = payload
+        self.timeout = timeout
+        self.device_id = device_id
+        self.reason = None
+        self.marks = {"triggered": time.monotonic()}
+        if detected_at is not None: self.marks["detected"] = detected_at
+        if ready_at is not None: self.marks["ready"] = ready_at
+        self._cancelled = threading.Event()
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        return self.device.port if self.device else None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self, reason="Cancelled"):
+        with self._lock:
+            if self._cancelled.is_set(): return
+            self.reason = reason
+            self._cancelled.set()
+            hooks = list(self._hooks)
+        for hook in hooks: hook()
+
+    def on_cancel(self, hook):
+        # hook runs once, immediately if the job was already cancelled
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._hooks.append(hook)
+                return
+        hook()
+
+    def mark(self, name):
+        # First occurrence wins, except "sent", which tracks the last chunk
+        if name == PHASE_SENT or name not in self.marks: self.marks[name] = time.monotonic()
+
+    def check(self):
+        if self._cancelled.is_set(): raise InjectionCancelled(self.reason)
+
+    def start_timer(self):
+        if not self.timeout: return None
+        timer = threading.Timer(self.timeout, self.cancel, args=(f"Timed out after {self.timeout:g}s",))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+
+# ----------------- Injection backends -----------------
+class SubprocessBackend:
+    name = "subprocess"
+    DEVICE_ID_RE = re.compile(r"\[\*\] device id: ([0-9a-fA-F]*)")
+    SENT_RE = re.compile(r"\[\+\] Sent 0x([0-9a-fA-F]+) bytes")
+    PROGRESS_RE = re.compile(r"\[\*\] Progress: 0x([0-9a-fA-F]+)/0x([0-9a-fA-F]+) bytes")
+    TRANSFER_RE = re.compile(r"\[\*\] Transfer took ([0-9.]+) ms")
+
+    def __init__(self, binary):
+        self.binary = binary
+
+    def _report(self, line, progress):
+        # search, not match: fusee-nano's truncation warning has no newline
+        if line.startswith("[*] device id"):
+            progress(PHASE_OPENED); progress(PHASE_DEVICE_ID)
+        elif line.startswith("[*] Progress"):
+            # One line per chunk; the final "[+] Sent" line reports completion
+            match = self.PROGRESS_RE.match(line)
+            if match:
+                done, total = int(match.group(1), 16), int(match.group(2), 16)
+                if done < total: progress(PHASE_SENT, done, total)
+        elif "[+] Sent" in line:
+            match = self.SENT_RE.search(line)
+            sent = int(match.group(1), 16) if match else 0
+            progress(PHASE_SENT, sent, sent)
+        elif "[+] Smashed" in line:
+            progress(PHASE_SMASHED)
+
+    def _kill(self, process):
+        try: os.killpg(process.pid, signal.SIGKILL)
+        except OSError: process.kill()
+
+    def inject(self, job, progress=None):
+        cmd = [self.binary]
+        # Hand over what detection found: with bus/dev fusee-nano opens the
+        # usbfs node directly instead of walking sysfs for a port
+        if job.device is not None and job.device.busnum is not None: cmd += ["-d", f"{job.device.busnum}:{job.device.devnum}"]
+        elif job.device is not None: cmd += ["-p", job.device.port]
+        if job.device_id: cmd += ["-i", job.device_id]
+        cmd.append(job.payload)
+        start = time.monotonic()
+        # Own process group, so a timeout also takes down any wrapper children
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True)
+        job.on_cancel(lambda: self._kill(process))
+        stdout = []
+        device_id = None
+        phases = {}
+        for line in process.stdout:
+            stdout.append(line)
+            if device_id is None and line.startswith("[*] device id"):
+                match = self.DEVICE_ID_RE.match(line)
+                device_id = match.group(1) if match else None
+            elif line.startswith("[*] Transfer took"):
+                match = self.TRANSFER_RE.match(line)
+                if match: phases["send"] = float(match.group(1)) / 1000
+            if progress: self._report(line, progress)
+        stderr = process.stderr.read()
+        process.wait()
+        if job.cancelled: stderr += f"[-] {job.reason}\n"
+        ok = process.returncode == 0 and not job.cancelled
+        return InjectionResult(ok, process.returncode, "".join(stdout), stderr, time.monotonic() - start, phases or None, device_id or None)
+
+
+class NativeBackend:
+    # Runs the exploit in-process over usbfs (Linux only), reusing the
+    # bus/device numbers detection already found instead of rescanning.
+    name = "native"
+
+    def __init__(self, intermezzo_path=INTERMEZZO_PATH, vid=RCM_VENDOR_ID, pid=RCM_PRODUCT_ID, packet_cache=None):
+        self.intermezzo_path = intermezzo_path
+        self.vid, self.pid = vid, pid
+        self.packet_cache = packet_cache
+
+    def build_packet(self, payload):
+        if self.packet_cache: return self.packet_cache.get(payload)
+        with open(self.intermezzo_path, "rb") as f: intermezzo = f.read()
+        with open(payload, "rb") as f: data = f.read()
+        return rcm.build_packet(data, intermezzo)
+
+    def inject(self, job, progress=None):
+        start = time.monotonic()
+        out = []
+        try:
+            device = job.device
+            if device is None:
+                found = sorted(scan_sysfs(self.vid, self.pid).values())
+                if not found: raise rcm.RcmError("No RCM device found")
+                device = found[-1]
+            mark = time.perf_counter()
+            packet, truncated = self.build_packet(job.payload)
+            build_time = time.perf_counter() - mark
+            if truncated: out.append("[*] Warning: payload may have been truncated. Continuing.")
+            known_id = bytes.fromhex(job.device_id) if job.device_id else None
+            device_id, phases = rcm.inject(device, packet, log=out.append, progress=progress, check=job.check, device_id=known_id)
+            phases = {"build": build_time, **phases}
+        except (OSError, rcm.RcmError, InjectionCancelled) as e:
+            return InjectionResult(False, 1, "\n".join(out), f"[-] {e}", time.monotonic() - start)
+        return InjectionResult(True, 0, "\n".join(out), "", time.monotonic() - start, phases, device_id)
+
+
+BACKEND_NAMES = ["fusee-nano", "native"]
+
+def create_backend(name, fusee_nano_path=None, packet_cache=None):
+    if name == "native": return NativeBackend(packet_cache=packet_cache)
+    return SubprocessBackend(fusee_nano_path or locate_fusee_nano())
+
+
+# ----------------- Scheduler -----------------
+class InjectionScheduler:
+    # Runs one injection per device at a time, up to max_workers devices in
+    # parallel. Callbacks are invoked from the worker threads.
+    def __init__(self, backend, max_workers=4, timeout=30.0):
+        self.backend = backend
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inject")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def busy(self, device):
+        with self._lock:
+            return (device.port if device else None) in self._in_flight
+
+    def submit(self, job, on_start=None, on_done=None, on_progress=None):
+        if job.timeout is None: job.timeout = self.timeout
+        with self._lock:
+            if job.key in self._in_flight: return False
+            self._in_flight[job.key] = job
+        self._pool.submit(self._run, job, on_start, on_done, on_progress)
+        return True
+
+    def cancel(self, device=None, reason="Cancelled"):
+        # Cancels the job for one device, or every job if device is None
+        with self._lock:
+            jobs = list(self._in_flight.values()) if device is None else [self._in_flight.get(device.port)]
+        for job in jobs:
+            if job: job.cancel(reason)
+
+    def _run(self, job, on_start, on_done, on_progress):
+        timer = None
+        try:
+            if job.cancelled:
+                result = InjectionResult(False, None, "", f"[-] {job.reason}", 0.0)
+            else:
+                if on_start: on_start(job.device)
+                timer = job.start_timer()
+                job.mark("started")
+                def progress(phase, done=0, total=0):
+                    if phase != PHASE_SENT or done >= total: job.mark(phase)
+                    if on_progress: on_progress(job.device, phase, done, total)
+                try: result = self.backend.inject(job, progress)
+                except Exception as e: result = InjectionResult(False, None, "", str(e), 0.0)
+        finally:
+            if timer: timer.cancel()
+            with self._lock: self._in_flight.pop(job.key, None)
+        job.mark("finished")
+        result = result._replace(marks=dict(job.marks))
+        if on_done: on_done(job.device, job.payload, result)
+
+    def shutdown(self, wait=False, cancel=True):
+        # cancel=False drains: queued and running jobs are left to finish
+        if cancel: self.cancel(reason="Shutting down")
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,125 @@
+import json
+import os
+import socket
+import threading
+import time
+
+from fuseeflow.constants import INSTANCE_LOCK, INSTANCE_SOCKET
+
+try:
+    import fcntl
+except ImportError: # Windows: no coordination, every launch is its own instance
+    fcntl = None
+
+# ----------------- Single instance -----------------
+# The first FuseeFlow of a login holds an flock on INSTANCE_LOCK and listens
+# on a Unix socket next to it. Later launches connect, hand over their
+# arguments as one JSON line ({"argv": [...], "cwd": "..."}) and exit once
+# the running instance answers "ok". Only one process ever polls USB, and
+# "open with" on a payload does not cold-start Qt. main.py tries forward()
+# before it imports anything heavy. Launches are answered from the moment
+# the lock is taken; what they forward waits until the window calls serve().
+
+ACK_TIMEOUT = 2.0 # the first instance may still be starting up; its backlog holds us
+RETRY_INTERVAL = 0.05
+MAX_MESSAGE = 64 * 1024
+
+
+def forward(argv, cwd=None, path=INSTANCE_SOCKET, wait=0.0):
+    # -> True once a running instance has taken the arguments. Keeps trying
+    # to connect for `wait` seconds (for a launch that lost the race to claim())
+    if fcntl is None: return False
+    deadline = time.monotonic() + wait
+    message = json.dumps({"argv": list(argv), "cwd": cwd or os.getcwd()}).encode() + b"\n"
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(ACK_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(message)
+            sock.shutdown(socket.SHUT_WR)
+            return sock.recv(16).startswith(b"ok")
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass # nobody listening (yet), or a socket left behind by a crash
+        except OSError:
+            return False
+        finally:
+            sock.close()
+        if time.monotonic() >= deadline: return False
+        time.sleep(RETRY_INTERVAL)
+
+
+class InstanceServer:
+    def __init__(self, lock_path=INSTANCE_LOCK, socket_path=INSTANCE_SOCKET):
+        self.lock_path = lock_path
+        self.socket_path = socket_path
+        self._lock_fd = None
+        self._sock = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._handler = None
+        self._pending = [] # messages that arrived before serve()
+
+    def claim(self):
+        # -> False if another instance holds the lock. The lock goes away
+        # with the process, so a crash never leaves us locked out.
+        if fcntl is None: return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+        try: fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd); return False
+        self._lock_fd = fd
+        try: os.unlink(self.socket_path) # stale, since we hold the lock
+        except FileNotFoundError: pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self._sock.listen(8)
+        threading.Thread(target=self._run, name="instance", daemon=True).start()
+        return True
+
+    def serve(self, handler):
+        # handler(message) is called from the accept thread, in arrival order,
+        # starting with anything queued so far
+        with self._lock:
+            self._handler = handler
+            pending, self._pending = self._pending, []
+            for message in pending: handler(message)
+
+    def _deliver(self, message):
+        with self._lock:
+            if self._handler is None: self._pending.append(message)
+            else: self._handler(message)
+
+    def _run(self):
+        while not self._closed:
+            try: conn, _ = self._sock.accept()
+            except OSError: return # closed
+            with conn:
+                try:
+                    conn.settimeout(1.0)
+                    data = b""
+                    while len(data) < MAX_MESSAGE:
+                        chunk = conn.recv(4096)
+                        if not chunk: break
+                        data += chunk
+                    message = json.loads(data)
+                    if not isinstance(message.get("argv"), list) or not all(isinstance(arg, str) for arg in message["argv"]): raise ValueError("bad argv")
+                    if not isinstance(message.get("cwd"), str): raise ValueError("bad cwd")
+                    conn.sendall(b"ok\n")
+                except (OSError, ValueError, AttributeError):
+                    try: conn.sendall(b"error\n")
+                    except OSError: pass
+                    continue
+            self._deliver(message)
+
+    def close(self):
+        self._closed = True
+        if self._sock is not None:
+            try: self._sock.shutdown(socket.SHUT_RDWR) # wakes the accept()
+            except OSError: pass
+            self._sock.close(); self._sock = None
+            try: os.unlink(self.socket_path)
+            except OSError: pass
+        if self._lock_fd is not None:
+            os.close(self._lock_fd); self._lock_fd = None
@@ -0,0 +1,271 @@
+import ctypes
+import hashlib
+import json
+import os
+import re
+import select
+import struct
+import sys
+import threading
+
+from fuseeflow.constants import DATA_DIR, PAYLOAD_INDEX_FILE, PAYLOADS_DIR
+from fuseeflow.rcm import MAX_PAYLOAD_LENGTH
+
+# ----------------- Payload library -----------------
+# The library is backed by a JSON index in DATA_DIR holding size, mtime,
+# SHA-256, detected type/version and the truncation flag of every payload.
+# Files are only hashed when their size or mtime changed, and on Linux an
+# inotify watch keeps the index current without ever listing the directory
+# again. The newest Hekate is tracked as entries change, so looking it up is
+# a dict access.
+
+INDEX_VERSION = 1
+READ_BLOCK = 1024 * 1024
+VERSION_RE = re.compile(r"(\d+(?:\.\d+)+)")
+# Filename prefix first, then a marker string inside the binary
+PAYLOAD_TYPES = [
+    ("hekate", (b"hekate", b"CTCaer")),
+    ("lockpick", (b"Lockpick",)),
+    ("tegraexplorer", (b"TegraExplorer",)),
+    ("fusee", (b"fusee",)),
+]
+
+
+def classify_payload(name, head=b""):
+    # -> (type, version). version is a dotted string taken from the filename
+    lower = name.lower()
+    kind = next((kind for kind, _ in PAYLOAD_TYPES if lower.startswith(kind)), None)
+    if kind is None: kind = next((kind for kind, markers in PAYLOAD_TYPES if any(m in head for m in markers)), "unknown")
+    match = VERSION_RE.search(name)
+    return kind, match.group(1) if match else None
+
+
+def version_key(version):
+    return tuple(int(part) for part in version.split(".")) if version else ()
+
+
+def fingerprint_payload(path, name):
+    # Hashes the file and sniffs its type from the first block in one read
+    digest, head = hashlib.sha256(), None
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            if head is None: head = block
+            digest.update(block)
+    st = os.stat(path)
+    kind, version = classify_payload(name, head or b"")
+    return {
+        "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest.hexdigest(),
+        "type": kind, "version": version, "truncated": st.st_size > MAX_PAYLOAD_LENGTH,
+    }
+
+
+# ----------------- inotify -----------------
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+# The watch itself is gone; the directory has to be rescanned and rewatched
+WATCH_LOST = IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT = struct.Struct("iIII")
+
+
+class DirectoryWatcher:
+    # Non-blocking inotify watch on one directory; raises OSError where unsupported
+    def __init__(self, path):
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"): raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            err = ctypes.get_errno(); os.close(self.fd)
+            raise OSError(err, f"Cannot watch {path}")
+
+    def fileno(self):
+        return self.fd
+
+    def read_events(self):
+        # -> [(mask, name)]; empty when nothing is pending
+        try: data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError: return []
+        events, offset = [], 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((mask, name))
+        return events
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(readable)
+
+    def close(self):
+        if self.fd >= 0: os.close(self.fd); self.fd = -1
+
+
+# ----------------- Index -----------------
+class PayloadIndex:
+    def __init__(self, payloads_dir=PAYLOADS_DIR, index_file=PAYLOAD_INDEX_FILE):
+        self.payloads_dir = payloads_dir
+        self.index_file = index_file
+        self.watcher = None
+        self._lock = threading.RLock()
+        self._entries = None # name -> fingerprint
+        self._latest_hekate = None
+        self._scanned = False
+
+    def load(self):
+        # Reads the stored index without touching the payloads themselves
+        with self._lock:
+            if self._entries is not None: return
+            self._entries = {}
+            try:
+                with open(self.index_file, "r") as f: data = json.load(f)
+                if data.get("version") == INDEX_VERSION and data.get("dir") == self.payloads_dir:
+                    self._entries = data["entries"]
+            except (OSError, ValueError, KeyError): pass
+            self._recompute_latest()
+
+    def _save(self):
+        tmp = self.index_file + ".tmp"
+        try:
+            with open(tmp, "w") as f: json.dump({"version": INDEX_VERSION, "dir": self.payloads_dir, "entries": self._entries}, f)
+            os.replace(tmp, self.index_file)
+        except OSError as e: print(f"Payload index save error: {e}", file=sys.stderr)
+
+    def _recompute_latest(self):
+        hekates = [(version_key(e["version"]), e["mtime_ns"], name) for name, e in self._entries.items() if e["type"] == "hekate"]
+        self._latest_hekate = max(hekates)[2] if hekates else None
+
+    def _is_newer_hekate(self, name):
+        if self._latest_hekate is None: return True
+        entry, best = self._entries[name], self._entries[self._latest_hekate]
+        return (version_key(entry["version"]), entry["mtime_ns"], name) > (version_key(best["version"]), best["mtime_ns"], self._latest_hekate)
+
+    def _update(self, name):
+        # Re-stats one file -> "add" / "change" / "remove" / None. Hashing runs
+        # outside the lock so readers never wait on a large rescan.
+        if not name.endswith(".bin"): return None
+        path = os.path.join(self.payloads_dir, name)
+        with self._lock: old = self._entries.get(name)
+        try:
+            st = os.stat(path)
+            if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns: return None
+            entry = fingerprint_payload(path, name)
+        except OSError:
+            entry = None
+        with self._lock:
+            if entry is None:
+                if self._entries.pop(name, None) is None: return None
+                if name == self._latest_hekate: self._recompute_latest()
+                return "remove"
+            old = self._entries.get(name)
+            if old == entry: return None # another thread got here first
+            self._entries[name] = entry
+            if name == self._latest_hekate: self._recompute_latest()
+            elif entry["type"] == "hekate" and self._is_newer_hekate(name): self._latest_hekate = name
+            return "change" if old else "add"
+
+    def _apply(self, names):
+        changes = [(action, name) for name in names for action in [self._update(name)] if action]
+        if changes:
+            with self._lock: self._save()
+        return changes
+
+    def refresh(self):
+        # Full reconcile against the directory -> [(action, name)]
+        self.load()
+        os.makedirs(self.payloads_dir, exist_ok=True)
+        present = {f for f in os.listdir(self.payloads_dir) if f.endswith(".bin")}
+        with self._lock:
+            names = sorted(present | set(self._entries))
+            self._scanned = True
+        return self._apply(names)
+
+    def watch(self):
+        # Starts the inotify watch; False means sync() keeps doing full rescans
+        with self._lock:
+            if self.watcher is not None: return True
+            os.makedirs(self.payloads_dir, exist_ok=True)
+            try: self.watcher = DirectoryWatcher(self.payloads_dir)
+            except OSError: return False
+            self._scanned = False # anything that happened before the watch existed
+            return True
+
+    def sync(self):
+        # Brings the index up to date as cheaply as possible -> [(action, name)]
+        with self._lock:
+            if self.watcher is None or not self._scanned: events = None
+            else:
+                events = self.watcher.read_events()
+                if any(mask & WATCH_LOST for mask, _ in events):
+                    self.watcher.close(); self.watcher = None
+                    self.watch(); events = None
+        if events is None: return self.refresh()
+        return self._apply(dict.fromkeys(name for _, name in events))
+
+    def names(self):
+        with self._lock:
+            self.load()
+            return sorted(self._entries)
+
+    def get(self, name):
+        with self._lock:
+            self.load()
+            entry = self._entries.get(name)
+            return dict(entry) if entry else None
+
+    def latest_hekate(self):
+        with self._lock:
+            self.load()
+            return os.path.join(self.payloads_dir, self._latest_hekate) if self._latest_hekate else None
+
+    def close(self):
+        with self._lock:
+            if self.watcher is not None: self.watcher.close(); self.watcher = None
+
+
+_indexes = {}
+
+
+def get_index(payloads_dir=PAYLOADS_DIR):
+    # One shared index per directory, watched where inotify is available
+    if payloads_dir not in _indexes:
+        index_file = PAYLOAD_INDEX_FILE if payloads_dir == PAYLOADS_DIR else os.path.join(DATA_DIR, f"payload_index-{hashlib.sha1(os.fsencode(payloads_dir)).hexdigest()[:12]}.json")
+        _indexes[payloads_dir] = PayloadIndex(payloads_dir, index_file)
+        _indexes[payloads_dir].watch()
+    return _indexes[payloads_dir]
+
+
+def list_payloads(payloads_dir=PAYLOADS_DIR):
+    index = get_index(payloads_dir)
+    index.sync()
+    return index.names()
+
+
+def find_latest_hekate(payloads_dir=PAYLOADS_DIR):
+    index = get_index(payloads_dir)
+    index.sync()
+    return index.latest_hekate()
+
+
+def resolve_payload(name, payloads_dir=PAYLOADS_DIR, library_only=False):
+    # "hekate" means the newest Hekate build; otherwise a path or a library name.
+    # library_only refuses paths, for names that come from the local API.
+    if not name: return None
+    if name.lower() == "hekate": return find_latest_hekate(payloads_dir)
+    if library_only:
+        if os.path.basename(name) != name or name.startswith("."): return None
+    elif os.path.isfile(name): return os.path.abspath(name)
+    path = os.path.join(payloads_dir, name)
+    if os.path.isfile(path): return path
+    if os.path.isfile(path + ".bin"): return path + ".bin"
+    return None
@@ -0,0 +1,117 @@
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+from fuseeflow.constants import LOG_FILE
+
+# ----------------- Application log -----------------
+# Messages go to a fixed-size ring buffer (which the GUI's log view pulls
+# from in batches), to stdout, and to a rotating file in DATA_DIR written by a
+# background thread. Logging never blocks on the disk and is safe from any
+# thread.
+
+LogRecord = namedtuple("LogRecord", ["seq", "ts", "level", "message"])
+
+BUFFER_LINES = 2000
+FILE_MAX_BYTES = 1 << 20
+FILE_BACKUPS = 3
+
+
+def format_record(record):
+    return f"{time.strftime('%H:%M:%S', time.localtime(record.ts))} [{record.level.upper()}] {record.message}"
+
+
+class LogBuffer:
+    def __init__(self, capacity=BUFFER_LINES):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=capacity)
+        self._seq = 0
+
+    def append(self, level, message):
+        with self._lock:
+            self._seq += 1
+            record = LogRecord(self._seq, time.time(), level, message)
+            self._records.append(record)
+            return record
+
+    def since(self, seq):
+        # Records newer than `seq`; older ones may already have been dropped
+        with self._lock:
+            missing = self._seq - seq
+            if missing <= 0: return []
+            return list(self._records)[-missing:]
+
+    def __len__(self):
+        return len(self._records)
+
+
+class LogFileSink:
+    # Append-only, flushed once per batch; rotates to .1 .. .N past max_bytes
+    def __init__(self, path=LOG_FILE, max_bytes=FILE_MAX_BYTES, backups=FILE_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        if not self._closed: self._queue.put(record)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"): os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups: os.replace(self.path, f"{self.path}.1")
+        else: os.remove(self.path)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while True:
+                try: batch.append(self._queue.get_nowait())
+                except queue.Empty: break
+            stop = None in batch
+            lines = "".join(format_record(record) + "\n" for record in batch if record is not None)
+            if not lines: continue
+            try:
+                with open(self.path, "a") as f: f.write(lines)
+                if os.path.getsize(self.path) > self.max_bytes: self._rotate()
+            except OSError as e: print(f"Log file error: {e}", file=sys.stderr)
+
+    def close(self):
+        if self._closed: return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(5)
+
+
+class Logger:
+    def __init__(self, buffer=None, sink=None, stream=None):
+        self.buffer = buffer or LogBuffer()
+        self.sink = sink
+        self.stream = stream
+
+    def log(self, message, level="info"):
+        record = self.buffer.append(level, message)
+        if self.stream: print(f"[{level.upper()}] {message}", file=self.stream)
+        if self.sink: self.sink.write(record)
+        return record
+
+    def close(self):
+        if self.sink: self.sink.close()
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+def get_logger():
+    # The application's shared logger; the file sink starts on first use
+    global _logger
+    with _logger_lock:
+        if _logger is None: _logger = Logger(sink=LogFileSink(), stream=sys.stdout)
+        return _logger
@@ -0,0 +1,323 @@
+import fnmatch
+import http.client
+import json
+import os
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import quote, urljoin, urlsplit
+
+from fuseeflow.constants import MANIFEST_CACHE, MANIFEST_FILE, PAYLOADS_DIR
+from fuseeflow.library import VERSION_RE, version_key
+from fuseeflow.packets import sha256_file
+
+# ----------------- Payload manifest -----------------
+# CONFIG_DIR/payloads.json lists the payloads a station keeps current:
+#   {"version": 1, "parallel": 4, "github_api": "https://api.github.com",
+#    "sources": [
+#      {"name": "hekate", "type": "github", "repo": "CTCaer/hekate", "asset": "hekate_ctcaer_*.bin", "keep": 2},
+#      {"name": "lockpick", "type": "github", "repo": "...", "asset": "Lockpick_RCM.bin", "pin": "v1.9.12"},
+#      {"name": "ours", "type": "url", "url": "http://mirror.lan/ours.bin", "sha256": "..."}]}
+# "github" sources read a release (the latest, or the tag in "pin") from
+# `github_api`, which may be a local mirror serving the same JSON. "url"
+# sources are plain files. "keep" prunes older versions matching "asset".
+#
+# ManifestSync checks every source at once on a bounded pool. Requests go
+# over keep-alive connections shared by the workers and are conditional
+# (ETag / Last-Modified kept in DATA_DIR), so an unchanged source costs one
+# 304. Downloads are staged as hidden ".part" files in the library and only
+# renamed into place together at the end, followed by one index refresh.
+#
+# "Get Hekate" is a sync of the manifest's Hekate source alone (or of the
+# default one, if the manifest has none), so Hekate has one cache, one
+# download path and one "keep" policy.
+
+MANIFEST_VERSION = 1
+DEFAULT_PARALLEL = 4
+GITHUB_API = "https://api.github.com"
+HEKATE_REPO = "CTCaer/hekate"
+HEKATE_SOURCE = {"name": "hekate", "type": "github", "repo": HEKATE_REPO, "asset": "hekate_ctcaer_*.bin", "keep": 2}
+DEFAULT_MANIFEST = {
+    "version": MANIFEST_VERSION, "parallel": DEFAULT_PARALLEL, "github_api": GITHUB_API, "sources": [HEKATE_SOURCE],
+}
+SOURCE_TYPES = ("github", "url")
+PART_SUFFIX = ".part"
+READ_BLOCK = 64 * 1024
+TIMEOUT = 30
+MAX_REDIRECTS = 5
+MAX_IDLE = 4 # idle connections kept per host
+USER_AGENT = "FuseeFlow"
+
+# status is "downloaded", "current" or "error"; file is the library name
+SyncResult = namedtuple("SyncResult", ["source", "status", "file", "message"])
+
+
+class SyncError(Exception):
+    pass
+
+
+def load_manifest(path=MANIFEST_FILE):
+    # Writes the default manifest on first use; raises SyncError if it is unusable
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f: json.dump(DEFAULT_MANIFEST, f, indent=2)
+        os.replace(tmp, path)
+    try:
+        with open(path, "r") as f: manifest = json.load(f)
+    except (OSError, ValueError) as e: raise SyncError(f"Cannot read {path}: {e}")
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION: raise SyncError(f"{path}: expected a version {MANIFEST_VERSION} manifest")
+    names = set()
+    for source in manifest.get("sources", []):
+        name = source.get("name")
+        if not name or name in names: raise SyncError(f"{path}: every source needs a unique name")
+        names.add(name)
+        if source.get("type") not in SOURCE_TYPES: raise SyncError(f"{path}: source '{name}' has unknown type {source.get('type')!r}")
+        required = ("repo", "asset") if source["type"] == "github" else ("url",)
+        missing = [key for key in required if not source.get(key)]
+        if missing: raise SyncError(f"{path}: source '{name}' is missing {', '.join(missing)}")
+    return manifest
+
+
+def hekate_source(manifest):
+    # The source "Get Hekate" syncs
+    for source in manifest.get("sources", []):
+        if source["type"] == "github" and source["repo"].lower() == HEKATE_REPO.lower(): return source
+    return HEKATE_SOURCE
+
+
+def is_current(path, size=None, sha256=None):
+    # A size match alone would keep a damaged file of the right size forever;
+    # payloads are small enough to rehash (about a millisecond for Hekate)
+    try:
+        if size is not None and os.path.getsize(path) != size: return False
+        return not sha256 or sha256_file(path) == sha256.lower()
+    except OSError: return False
+
+
+class ConnectionPool:
+    # Idle keep-alive connections per (scheme, host, port), shared by threads
+    def __init__(self, max_idle=MAX_IDLE, timeout=TIMEOUT):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = {}
+        self.opened = 0 # connections created, for the curious
+
+    def _take(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle: return idle.pop(), True
+            self.opened += 1
+        scheme, host, port = key
+        connection = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return connection(host, port, timeout=self.timeout), False
+
+    def _release(self, key, conn, response):
+        # Only a fully read response leaves the connection reusable
+        if response.will_close or not response.isclosed(): conn.close(); return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle: idle.append(conn); return
+        conn.close()
+
+    def _send(self, key, target, headers):
+        conn, reused = self._take(key)
+        try:
+            conn.request("GET", target, headers={"User-Agent": USER_AGENT, **headers})
+            return conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused: raise
+            return self._send(key, target, headers) # the server had dropped the idle connection
+        except BaseException:
+            conn.close(); raise
+
+    @contextmanager
+    def get(self, url, headers=None):
+        # Yields the response once redirects are followed; read it to the end
+        # to hand the connection back to the pool
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https"): raise SyncError(f"Unsupported URL: {url}")
+            key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+            target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            try: conn, response = self._send(key, target, headers or {})
+            except (OSError, http.client.HTTPException) as e: raise SyncError(f"{parts.hostname}: {e}")
+            location = response.getheader("Location")
+            if response.status in (301, 302, 303, 307, 308) and location:
+                response.read(); self._release(key, conn, response)
+                url = urljoin(url, location); continue
+            try: yield response
+            finally: self._release(key, conn, response)
+            return
+        raise SyncError(f"Too many redirects for {url}")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns: conn.close()
+
+
+class ManifestSync:
+    def __init__(self, manifest=None, payloads_dir=PAYLOADS_DIR, cache_file=MANIFEST_CACHE, library=None, pool=None):
+        self.manifest = manifest if manifest is not None else load_manifest()
+        self.payloads_dir = payloads_dir
+        self.cache_file = cache_file
+        self.library = library
+        self.pool = pool or ConnectionPool()
+        self._lock = threading.Lock()
+        self._progress = {} # source -> [done, total or None]
+        self._report = None
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, "r") as f: return json.load(f)
+        except (OSError, ValueError): return {}
+
+    def _save_cache(self, cache):
+        tmp = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f: json.dump(cache, f)
+            os.replace(tmp, self.cache_file)
+        except OSError as e: print(f"Manifest cache write error: {e}", file=sys.stderr)
+
+    def _update_progress(self, name, done, total):
+        with self._lock:
+            self._progress[name] = [done, total]
+            done = sum(entry[0] for entry in self._progress.values())
+            total = sum(entry[1] or entry[0] for entry in self._progress.values())
+        if self._report: self._report(done, total or None)
+
+    def _conditional(self, cached):
+        headers = {}
+        if cached.get("etag"): headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"): headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def _release(self, source, cached):
+        # -> (asset dict, cache entry); one 304 when the release is unchanged
+        api = source.get("api") or self.manifest.get("github_api") or GITHUB_API
+        url = f"{api.rstrip('/')}/repos/{source['repo']}/releases/" + (f"tags/{quote(source['pin'])}" if source.get("pin") else "latest")
+        headers = {"Accept": "application/vnd.github+json"}
+        if cached.get("asset") and cached.get("url") == url: headers.update(self._conditional(cached))
+        with self.pool.get(url, headers) as response:
+            body = response.read()
+            if response.status == 304: return cached["asset"], cached
+            if response.status != 200: raise SyncError(f"Release lookup failed: HTTP {response.status}")
+            etag, last_modified = response.getheader("ETag"), response.getheader("Last-Modified")
+        try: assets = json.loads(body).get("assets", [])
+        except (ValueError, AttributeError): raise SyncError("Release lookup returned invalid JSON")
+        for asset in assets:
+            if fnmatch.fnmatch(asset.get("name", ""), source["asset"]):
+                digest = asset.get("digest") or ""
+                found = {"name": os.path.basename(asset["name"]), "url": asset["browser_download_url"], "size": asset.get("size"),
+                         "sha256": digest[len("sha256:"):] if digest.startswith("sha256:") else None}
+                return found, {"url": url, "etag": etag, "last_modified": last_modified, "asset": found}
+        raise SyncError(f"No asset matching '{source['asset']}' in {'release ' + source['pin'] if source.get('pin') else 'the latest release'}")
+
+    def _fetch(self, name, url, part, headers, offset=0):
+        # Streams into `part` -> (status, response headers); resumes at offset on a 206
+        with self.pool.get(url, headers) as response:
+            if response.status == 304 or (response.status == 416 and offset):
+                response.read(); return response.status, response
+            if response.status not in (200, 206): response.read(); raise SyncError(f"Download failed: HTTP {response.status}")
+            if response.status != 206: offset = 0 # the server ignored the Range header
+            length = response.getheader("Content-Length")
+            total = offset + int(length) if length else None
+            done = offset
+            with open(part, "ab" if offset else "wb") as f:
+                for block in iter(lambda: response.read(READ_BLOCK), b""):
+                    f.write(block); done += len(block)
+                    self._update_progress(name, done, total)
+            return response.status, response
+
+    def _verify(self, part, size, sha256):
+        if size is not None and os.path.getsize(part) != size:
+            raise SyncError(f"Downloaded size {os.path.getsize(part)} does not match the expected {size} bytes")
+        if sha256 and sha256_file(part) != sha256.lower():
+            raise SyncError("Downloaded file failed the SHA-256 check")
+
+    def _part(self, filename):
+        return os.path.join(self.payloads_dir, "." + filename + PART_SUFFIX)
+
+    def check(self, source, cache):
+        # Runs on the pool -> (SyncResult, staged part or None, new cache entry)
+        name = source["name"]
+        cached = cache.get(name) or {}
+        try:
+            if source["type"] == "github":
+                asset, entry = self._release(source, cached)
+                if is_current(os.path.join(self.payloads_dir, asset["name"]), asset["size"], asset["sha256"]):
+                    return SyncResult(name, "current", asset["name"], None), None, entry
+                part = self._part(asset["name"])
+                offset = os.path.getsize(part) if os.path.exists(part) else 0
+                if asset["size"] is not None and offset > asset["size"]: offset = 0
+                self._update_progress(name, offset, asset["size"])
+                status, _ = self._fetch(name, asset["url"], part, {"Range": f"bytes={offset}-"} if offset else {}, offset)
+                try: self._verify(part, asset["size"], asset["sha256"])
+                except SyncError:
+                    os.remove(part) # a corrupt part would poison every later resume
+                    raise
+                return SyncResult(name, "downloaded", asset["name"], None), part, entry
+            filename = source.get("file") or os.path.basename(urlsplit(source["url"]).path)
+            if not filename: raise SyncError(f"Cannot tell a file name from {source['url']}; set \"file\"")
+            final = os.path.join(self.payloads_dir, filename)
+            headers = self._conditional(cached) if os.path.exists(final) and cached.get("url") == source["url"] else {}
+            part = self._part(filename)
+            self._update_progress(name, 0, None)
+            status, response = self._fetch(name, source["url"], part, headers)
+            if status == 304: return SyncResult(name, "current", filename, None), None, cached
+            self._verify(part, None, source.get("sha256"))
+            entry = {"url": source["url"], "etag": response.getheader("ETag"), "last_modified": response.getheader("Last-Modified")}
+            if os.path.exists(final) and is_current(final, os.path.getsize(part), sha256_file(part)):
+                os.remove(part); return SyncResult(name, "current", filename, None), None, entry
+            return SyncResult(name, "downloaded", filename, None), part, entry
+        except (SyncError, OSError) as e:
+            return SyncResult(name, "error", None, str(e)), None, cached or None
+
+    def prune(self, source, keep_file):
+        # Keeps the newest `keep` + 1 files matching the source's asset pattern
+        if source.get("keep") is None or source["type"] != "github": return []
+        matches = [f for f in os.listdir(self.payloads_dir) if fnmatch.fnmatch(f, source["asset"])]
+        version = lambda f: version_key(VERSION_RE.search(f).group(1)) if VERSION_RE.search(f) else ()
+        matches.sort(key=lambda f: (version(f), f), reverse=True)
+        removed = [f for f in matches[int(source["keep"]) + 1:] if f != keep_file]
+        for f in removed: os.remove(os.path.join(self.payloads_dir, f))
+        return removed
+
+    def run(self, progress=None, only=None):
+        # -> [SyncResult] in manifest order. progress(done, total or None) is
+        # the sum over every download and is called from the pool's threads.
+        return self._sync([s for s in self.manifest.get("sources", []) if only is None or s["name"] in only], progress)
+
+    def update_hekate(self, progress=None):
+        # -> SyncResult for "Get Hekate"
+        return self._sync([hekate_source(self.manifest)], progress)[0]
+
+    def _sync(self, sources, progress):
+        self._report, self._progress = progress, {}
+        if not sources: return []
+        os.makedirs(self.payloads_dir, exist_ok=True)
+        cache = self._load_cache()
+        workers = max(1, min(len(sources), int(self.manifest.get("parallel", DEFAULT_PARALLEL))))
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync") as pool:
+                outcomes = list(pool.map(lambda source: self.check(source, cache), sources))
+        finally:
+            self.pool.close()
+        # Everything lands in the library at once
+        results = []
+        for source, (result, part, entry) in zip(sources, outcomes):
+            if part:
+                try:
+                    os.replace(part, os.path.join(self.payloads_dir, result.file))
+                    self.prune(source, result.file)
+                except OSError as e: result = SyncResult(source["name"], "error", None, str(e))
+            if entry: cache[source["name"]] = entry
+            results.append(result)
+        self._save_cache(cache)
+        if self.library is not None and any(r.status == "downloaded" for r in results): self.library.sync()
+        return results
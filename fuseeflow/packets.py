@@ -0,0 +1,112 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+from fuseeflow import rcm
+
+# ----------------- Exploit packet cache -----------------
+# Packets are content-addressed by the payload's SHA-256 plus the intermezzo
+# digest, written once and then served memory-mapped so the send loop reads
+# straight from the page cache. A small stat index (size + mtime) avoids
+# rehashing payloads that have not changed.
+
+PACKET_SUFFIX = ".pkt"
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""): digest.update(block)
+    return digest.hexdigest()
+
+
+class PacketCache:
+    def __init__(self, cache_dir, intermezzo_path, max_entries=64):
+        self.cache_dir = cache_dir
+        self.intermezzo_path = intermezzo_path
+        self.max_entries = max_entries
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self._index = None
+        self._intermezzo = None
+        self._maps = {} # packet file name -> mmap
+
+    def _load(self):
+        if self._index is not None: return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            with open(self.index_file, "r") as f: self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+        with open(self.intermezzo_path, "rb") as f: self._intermezzo = f.read()
+        self._intermezzo_digest = hashlib.sha256(self._intermezzo).hexdigest()[:16]
+
+    def _save_index(self):
+        tmp = self.index_file + ".tmp"
+        with open(tmp, "w") as f: json.dump(self._index, f)
+        os.replace(tmp, self.index_file)
+
+    def _digest(self, payload_path):
+        # Reuses the stored hash as long as size and mtime are unchanged
+        st = os.stat(payload_path)
+        entry = self._index.get(payload_path)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"], st.st_size
+        digest = sha256_file(payload_path)
+        self._index[payload_path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        if entry and entry["sha256"] != digest: self._invalidate(entry["sha256"]) # payload changed on disk
+        self._save_index()
+        return digest, st.st_size
+
+    def _invalidate(self, digest):
+        # Only remove the old packet if no other library file has that content
+        if any(e["sha256"] == digest for e in self._index.values()): return
+        name = self._packet_name(digest)
+        self._drop(name)
+        try: os.remove(os.path.join(self.cache_dir, name))
+        except OSError: pass
+
+    def _packet_name(self, digest):
+        return f"{digest}-{self._intermezzo_digest}{PACKET_SUFFIX}"
+
+    def _drop(self, name):
+        # An injection may still be sending from the mapping; it is unmapped
+        # once the last reference goes away.
+        self._maps.pop(name, None)
+
+    def _build(self, payload_path, packet_path):
+        with open(payload_path, "rb") as f: packet, _ = rcm.build_packet(f.read(), self._intermezzo)
+        tmp = f"{packet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f: f.write(packet)
+        os.replace(tmp, packet_path)
+        self._prune()
+
+    def _prune(self):
+        packets = [os.path.join(self.cache_dir, n) for n in os.listdir(self.cache_dir) if n.endswith(PACKET_SUFFIX)]
+        if len(packets) <= self.max_entries: return
+        packets.sort(key=lambda p: os.stat(p).st_mtime)
+        for path in packets[:len(packets) - self.max_entries]:
+            self._drop(os.path.basename(path))
+            try: os.remove(path)
+            except OSError: pass
+
+    def get(self, payload_path):
+        # Returns (packet buffer, truncated). The buffer is a private
+        # copy-on-write mapping so it can be handed to ioctls as-is.
+        payload_path = os.path.abspath(payload_path)
+        with self._lock:
+            self._load()
+            digest, size = self._digest(payload_path)
+            name = self._packet_name(digest)
+            mapping = self._maps.get(name)
+            if mapping is None:
+                packet_path = os.path.join(self.cache_dir, name)
+                if not os.path.exists(packet_path): self._build(payload_path, packet_path)
+                with open(packet_path, "rb") as f: mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                self._maps[name] = mapping
+            return mapping, size > rcm.MAX_PAYLOAD_LENGTH
+
+    def close(self):
+        with self._lock: self._maps.clear()
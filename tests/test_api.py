@@ -0,0 +1,135 @@
+import http.client
+import io
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import unittest
+
+# fuseeflow resolves its XDG directories at import time
+HOME = tempfile.mkdtemp(prefix="fuseeflow-test-")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(HOME, "config")
+os.environ["XDG_DATA_HOME"] = os.path.join(HOME, "data")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuseeflow.api import MAX_BODY, ApiServer, EventHub
+from fuseeflow.cli import EventLog, HeadlessInjector
+from fuseeflow.constants import PAYLOADS_DIR
+from fuseeflow.injection import InjectionScheduler, SubprocessBackend
+
+TOKEN = "s3cret"
+
+
+class ApiTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.makedirs(PAYLOADS_DIR, exist_ok=True)
+        with open(os.path.join(PAYLOADS_DIR, "test.bin"), "wb") as f: f.write(b"\0" * 1024)
+        with open(os.path.join(HOME, "outside.bin"), "wb") as f: f.write(b"\0" * 1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(HOME, True)
+
+    def setUp(self):
+        self.scheduler = InjectionScheduler(SubprocessBackend("false"), max_workers=1)
+        self.injector = HeadlessInjector("test.bin", self.scheduler, EventLog(stream=io.StringIO()))
+        self.hub = EventHub()
+        self.api = None
+
+    def tearDown(self):
+        if self.api: self.api.stop()
+        self.injector.close(); self.scheduler.shutdown()
+
+    def start(self, token=None):
+        self.api = ApiServer(self.hub, self.injector.api_state, {"inject": self.injector.api_inject, "select_payload": self.injector.api_select}, token=token)
+        return self.api.start()
+
+    def request(self, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.api.port, timeout=5)
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body).encode(); headers.setdefault("Content-Type", "application/json")
+        conn.request(method, path, body, headers)
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+        return response.status, json.loads(data) if data else None
+
+    def raw(self, request):
+        # For requests http.client will not send: a bad Host, no Content-Length
+        with socket.create_connection(("127.0.0.1", self.api.port), timeout=5) as sock:
+            sock.sendall(request.replace("PORT", str(self.api.port)).encode())
+            return int(sock.makefile("rb").readline().split()[1])
+
+    def test_event_stream(self):
+        self.start()
+        conn = http.client.HTTPConnection("127.0.0.1", self.api.port, timeout=5)
+        conn.request("GET", "/events")
+        response = conn.getresponse()
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+        self.assertEqual(response.fp.readline(), b"retry: 2000\n")
+        response.fp.readline()
+        self.hub.emit("inject_result", port="1-1", ok=True)
+        lines = [response.fp.readline() for _ in range(3)]
+        self.assertEqual(lines[:2], [b"id: 1\n", b"event: inject_result\n"])
+        data = json.loads(lines[2].removeprefix(b"data: "))
+        self.assertEqual((data["port"], data["ok"]), ("1-1", True))
+        conn.close()
+
+    def test_state(self):
+        self.start()
+        status, state = self.request("GET", "/state")
+        self.assertEqual((status, state["mode"], state["payload"]), (200, "headless", "test.bin"))
+
+    def test_token(self):
+        self.start(TOKEN)
+        self.assertEqual(self.request("GET", "/state")[0], 401)
+        self.assertEqual(self.request("GET", "/state", headers={"Authorization": "Bearer nope"})[0], 401)
+        self.assertEqual(self.request("GET", "/state", headers={"Authorization": f"Bearer {TOKEN}"})[0], 200)
+        self.assertEqual(self.request("GET", f"/state?token={TOKEN}")[0], 200)
+
+    def test_web_pages_need_the_token(self):
+        self.start()
+        self.assertEqual(self.request("GET", "/state", headers={"Origin": "https://example.com"})[0], 403)
+        self.api.stop()
+        self.start(TOKEN)
+        self.assertEqual(self.request("GET", "/state", headers={"Origin": "https://example.com", "Authorization": f"Bearer {TOKEN}"})[0], 200)
+
+    def test_host_allowlist(self):
+        self.start()
+        get = "GET /state HTTP/1.1\r\nHost: {}\r\nConnection: close\r\n\r\n"
+        for host in ("127.0.0.1:PORT", "localhost:PORT", "[::1]:PORT"):
+            self.assertEqual(self.raw(get.format(host)), 200, host)
+        for host in ("attacker.example:PORT", "127.0.0.1:1", "localhost"):
+            self.assertEqual(self.raw(get.format(host)), 403, host)
+        self.assertEqual(self.raw("GET /state HTTP/1.0\r\n\r\n"), 403)
+
+    def test_posts_must_be_json(self):
+        self.start()
+        status, _ = self.request("POST", "/payload", {"name": "test.bin"}, headers={"Content-Type": "text/plain"})
+        self.assertEqual(status, 415)
+
+    def test_content_length(self):
+        self.start()
+        body = '{"name": "test.bin"}'
+        post = "POST /payload HTTP/1.1\r\nHost: 127.0.0.1:PORT\r\nContent-Type: application/json\r\n{}\r\n"
+        self.assertEqual(self.raw(post.format("") + body), 400)
+        self.assertEqual(self.raw(post.format("Content-Length: abc\r\n") + body), 400)
+        self.assertEqual(self.raw(post.format("Content-Length: -1\r\n") + body), 400)
+        self.assertEqual(self.raw(post.format(f"Content-Length: {MAX_BODY + 1}\r\n") + body), 413)
+        self.assertEqual(self.raw(post.format(f"Content-Length: {len(body)}\r\n") + body), 202)
+
+    def test_payload_stays_inside_the_library(self):
+        self.start()
+        for name in (os.path.join(HOME, "outside.bin"), "../outside.bin", "/etc/passwd", 7):
+            self.assertEqual(self.request("POST", "/payload", {"name": name})[0], 400, name)
+        self.assertEqual(self.injector.payload, "test.bin")
+        self.assertEqual(self.request("POST", "/payload", {"name": "test.bin"}), (202, {"accepted": "select_payload"}))
+        self.assertEqual(self.injector.payload, os.path.join(PAYLOADS_DIR, "test.bin"))
+
+
+if __name__ == "__main__":
+    unittest.main()
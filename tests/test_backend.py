@@ -0,0 +1,41 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# fuseeflow resolves its XDG directories at import time
+HOME = tempfile.mkdtemp(prefix="fuseeflow-test-")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(HOME, "config")
+os.environ["XDG_DATA_HOME"] = os.path.join(HOME, "data")
+os.environ["FAKE_FUSEE_LATENCY"] = "0.05"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuseeflow.hotplug import RcmDevice
+from fuseeflow.injection import PHASE_SENT, PHASE_SMASHED, InjectionJob, SubprocessBackend
+
+FAKE_FUSEE_NANO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_fusee_nano.py")
+
+
+class SubprocessProgressTest(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(HOME, True)
+
+    def test_progress_follows_each_chunk(self):
+        payload = os.path.join(HOME, "test.bin")
+        with open(payload, "wb") as f: f.write(b"\0" * 0x8000)
+        events = []
+        result = SubprocessBackend(FAKE_FUSEE_NANO).inject(InjectionJob(RcmDevice("1-1", None, None), payload), lambda phase, done=0, total=0: events.append((phase, done, total)))
+        self.assertTrue(result.ok, result.stderr)
+        sent = [(done, total) for phase, done, total in events if phase == PHASE_SENT]
+        total = sent[-1][1]
+        self.assertEqual(sent[-1], (total, total))
+        self.assertEqual(len(sent), total // 0x1000) # one per chunk, the last from "[+] Sent"
+        self.assertEqual([done for done, _ in sent], sorted(done for done, _ in sent))
+        self.assertTrue(all(chunk_total == total for _, chunk_total in sent))
+        self.assertEqual(events[-1][0], PHASE_SMASHED)
+
+
+if __name__ == "__main__":
+    unittest.main()
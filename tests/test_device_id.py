@@ -0,0 +1,80 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# fuseeflow resolves its XDG directories at import time
+HOME = tempfile.mkdtemp(prefix="fuseeflow-test-")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(HOME, "config")
+os.environ["XDG_DATA_HOME"] = os.path.join(HOME, "data")
+os.environ["FAKE_FUSEE_LATENCY"] = "0.01"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuseeflow.cli import EventLog, HeadlessInjector
+from fuseeflow.constants import PAYLOADS_DIR
+from fuseeflow.hotplug import RcmDevice
+from fuseeflow.injection import InjectionScheduler, SubprocessBackend
+from fuseeflow.readiness import ProbeResult
+
+FAKE_FUSEE_NANO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_fusee_nano.py")
+DEVICE_ID = "0123456789abcdef0123456789abcdef"
+
+
+class RecordingInjector(HeadlessInjector):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.results = []
+        self.done = threading.Event()
+
+    def on_done(self, device, payload, result):
+        super().on_done(device, payload, result)
+        self.results.append(result); self.done.set()
+
+    def wait_result(self):
+        if not self.done.wait(10): raise AssertionError("injection did not finish")
+        self.done.clear()
+        return self.results[-1]
+
+
+class DeviceIdTest(unittest.TestCase):
+    # The bootrom sends its 16-byte ID once. fake_fusee_nano echoes the ID it
+    # was given with -i and makes one up otherwise.
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(HOME, True)
+
+    def setUp(self):
+        os.makedirs(PAYLOADS_DIR, exist_ok=True)
+        with open(os.path.join(PAYLOADS_DIR, "test.bin"), "wb") as f: f.write(b"\0" * 1024)
+        self.scheduler = InjectionScheduler(SubprocessBackend(FAKE_FUSEE_NANO), max_workers=1)
+        self.stream = io.StringIO()
+        self.injector = RecordingInjector("test.bin", self.scheduler, EventLog(stream=self.stream))
+        self.device = RcmDevice("1-1", 1, 2)
+        self.injector.devices.attach(self.device)
+
+    def tearDown(self):
+        self.scheduler.shutdown(wait=True)
+        self.injector.readiness.shutdown(wait=True)
+
+    def test_probed_id_is_passed_on(self):
+        self.injector.on_ready(self.device, ProbeResult(True, DEVICE_ID, time.monotonic(), 1, None))
+        self.assertEqual(self.injector.wait_result().device_id, DEVICE_ID)
+
+    def test_second_inject_reuses_probed_id(self):
+        # e.g. auto-inject stopped at a missing payload, then the operator injects
+        self.injector.devices.identify(self.device.port, DEVICE_ID)
+        self.assertTrue(self.injector.inject(self.device))
+        self.assertEqual(self.injector.wait_result().device_id, DEVICE_ID)
+        self.injector.inject(self.device)
+        self.assertEqual(self.injector.wait_result().device_id, DEVICE_ID)
+        results = [json.loads(line) for line in self.stream.getvalue().splitlines() if '"inject_result"' in line]
+        self.assertEqual([result["device_id"] for result in results], [DEVICE_ID, DEVICE_ID])
+
+
+if __name__ == "__main__":
+    unittest.main()
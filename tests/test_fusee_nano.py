@@ -0,0 +1,66 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# fuseeflow resolves its XDG directories at import time
+HOME = tempfile.mkdtemp(prefix="fuseeflow-test-")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(HOME, "config")
+os.environ["XDG_DATA_HOME"] = os.path.join(HOME, "data")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuseeflow import constants
+from fuseeflow.constants import ensure_fusee_nano, fusee_nano_targets, locate_fusee_nano
+
+FAKE_FUSEE_NANO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_fusee_nano.py")
+
+
+class LocateTest(unittest.TestCase):
+    # Which fusee-nano the frontend runs when the in-tree build is missing
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(HOME, True)
+
+    def setUp(self):
+        self.bin = tempfile.mkdtemp(dir=HOME)
+        self.local = os.path.join(self.bin, "missing", "fusee-nano")
+        patch = mock.patch.object(constants, "LOCAL_BINARY", self.local)
+        patch.start(); self.addCleanup(patch.stop)
+
+    def on_path(self, usage):
+        path = os.path.join(self.bin, "fusee-nano")
+        with open(path, "w") as f: f.write(f"#!/bin/sh\necho 'USAGE: $0 {usage}'\nexit 255\n")
+        os.chmod(path, 0o755)
+        return path
+
+    def test_upstream_build_is_not_used(self):
+        self.on_path("path/to/payload.bin")
+        with mock.patch.dict(os.environ, {"PATH": self.bin}):
+            self.assertEqual(locate_fusee_nano(), self.local)
+
+    def test_build_of_this_tree_on_path_is_used(self):
+        path = self.on_path("[-p port | -d bus:dev] [-i device_id] [-S] payload.bin")
+        with mock.patch.dict(os.environ, {"PATH": self.bin}):
+            self.assertEqual(locate_fusee_nano(), path)
+
+    def test_targets(self):
+        self.assertTrue(fusee_nano_targets(FAKE_FUSEE_NANO))
+        self.assertFalse(fusee_nano_targets(self.local))
+
+    def test_no_build_without_a_makefile(self):
+        # The AppImage layout: backend/fusee-nano/files, read-only, no sources
+        source = os.path.dirname(self.local)
+        os.makedirs(os.path.join(source, "files"))
+        messages = []
+        with mock.patch.object(constants, "FUSEE_SOURCE_DIR", source), mock.patch.object(constants.subprocess, "run") as run, \
+                mock.patch.dict(os.environ, {"PATH": self.bin}):
+            self.assertEqual(ensure_fusee_nano(log=messages.append), self.local)
+        run.assert_not_called()
+        self.assertEqual(len(messages), 1)
+        self.assertTrue(messages[0].startswith("[ERROR]"))
+
+
+if __name__ == "__main__":
+    unittest.main()
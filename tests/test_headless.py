@@ -0,0 +1,76 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# fuseeflow resolves its XDG directories at import time
+HOME = tempfile.mkdtemp(prefix="fuseeflow-test-")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(HOME, "config")
+os.environ["XDG_DATA_HOME"] = os.path.join(HOME, "data")
+os.environ["FAKE_FUSEE_LATENCY"] = "0.3"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuseeflow.cli import EventLog, HeadlessInjector
+from fuseeflow.constants import PAYLOADS_DIR
+from fuseeflow.hotplug import RcmDevice
+from fuseeflow.injection import InjectionScheduler, SubprocessBackend
+
+FAKE_FUSEE_NANO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fake_fusee_nano.py")
+
+
+class FakeDetector:
+    # The consoles are there from the start; nothing changes afterwards
+    mode = "poll"
+
+    def __init__(self, devices):
+        self.changes = [("add", device) for device in devices]
+
+    def refresh(self):
+        changes, self.changes = self.changes, []
+        return changes
+
+    def wait(self, timeout):
+        return self.refresh()
+
+    def close(self):
+        pass
+
+
+class RunOnceTest(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(HOME, True)
+
+    def setUp(self):
+        os.makedirs(PAYLOADS_DIR, exist_ok=True)
+        with open(os.path.join(PAYLOADS_DIR, "test.bin"), "wb") as f: f.write(b"\0" * 1024)
+        self.scheduler = InjectionScheduler(SubprocessBackend(FAKE_FUSEE_NANO), max_workers=2)
+        self.stream = io.StringIO()
+        self.injector = HeadlessInjector("test.bin", self.scheduler, EventLog(stream=self.stream))
+
+    def tearDown(self):
+        self.injector.close()
+
+    def events(self, name):
+        return [event for event in map(json.loads, self.stream.getvalue().splitlines()) if event["event"] == name]
+
+    def test_one_shot_waits_for_every_injection(self):
+        # No usbfs address, so the probe falls back to the fixed delay and the
+        # injections are still running when run_once starts shutting down
+        self.injector.detector = FakeDetector([RcmDevice("1-1", None, None), RcmDevice("1-2", None, None)])
+        self.assertEqual(self.injector.run_once(wait=1), 0)
+        results = self.events("inject_result")
+        self.assertEqual(sorted(result["port"] for result in results), ["1-1", "1-2"])
+        self.assertTrue(all(result["ok"] and result["returncode"] == 0 for result in results), results)
+        self.assertEqual((self.injector.succeeded, self.injector.failed), (2, 0))
+
+    def test_one_shot_without_a_console(self):
+        self.injector.detector = FakeDetector([])
+        self.assertEqual(self.injector.run_once(wait=0), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
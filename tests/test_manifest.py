@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# fuseeflow resolves its XDG directories at import time
+HOME = tempfile.mkdtemp(prefix="fuseeflow-test-")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(HOME, "config")
+os.environ["XDG_DATA_HOME"] = os.path.join(HOME, "data")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuseeflow.manifest import DEFAULT_MANIFEST, HEKATE_SOURCE, PART_SUFFIX, ManifestSync, SyncError, load_manifest
+
+
+class Mirror(BaseHTTPRequestHandler):
+    # GitHub stand-in: release JSON with an ETag, assets with Range support
+    protocol_version = "HTTP/1.1"
+    files = {} # path -> bytes
+    log = []   # (path, headers)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.log.append((self.path, dict(self.headers)))
+        body = self.files.get(self.path)
+        if body is None:
+            self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers(); return
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304); self.send_header("ETag", etag); self.end_headers(); return
+        start = 0
+        if self.headers.get("Range", "").startswith("bytes="):
+            start = int(self.headers["Range"][6:].rstrip("-"))
+            if start >= len(body):
+                self.send_response(416); self.send_header("Content-Length", "0"); self.end_headers(); return
+        self.send_response(206 if start else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+
+class MirrorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Mirror)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown(); cls.server.server_close()
+        shutil.rmtree(HOME, True)
+
+    def setUp(self):
+        Mirror.files.clear(); Mirror.log.clear()
+        self.dir = tempfile.mkdtemp(dir=HOME)
+        self.payloads = os.path.join(self.dir, "payloads")
+
+    def release(self, repo, name, data, digest=None):
+        Mirror.files[f"/dl/{name}"] = data
+        asset = {"name": name, "browser_download_url": f"{self.base}/dl/{name}", "size": len(data),
+                 "digest": "sha256:" + (digest or hashlib.sha256(data).hexdigest())}
+        Mirror.files[f"/repos/{repo}/releases/latest"] = json.dumps({"assets": [asset]}).encode()
+
+    def sync(self, sources=(HEKATE_SOURCE,)):
+        manifest = {"version": 1, "github_api": self.base, "sources": list(sources)}
+        return ManifestSync(manifest, self.payloads, os.path.join(self.dir, "cache.json"))
+
+    def test_unchanged_release_costs_one_304(self):
+        self.release("CTCaer/hekate", "hekate_ctcaer_6.0.0.bin", os.urandom(5000))
+        self.assertEqual(self.sync().update_hekate().status, "downloaded")
+        Mirror.log.clear()
+        result = self.sync().update_hekate()
+        self.assertEqual((result.status, result.file), ("current", "hekate_ctcaer_6.0.0.bin"))
+        self.assertEqual([path for path, _ in Mirror.log], ["/repos/CTCaer/hekate/releases/latest"])
+        self.assertIn("If-None-Match", Mirror.log[0][1])
+
+    def test_resume_from_part_file(self):
+        data = os.urandom(8000)
+        self.release("CTCaer/hekate", "hekate_ctcaer_6.0.0.bin", data)
+        os.makedirs(self.payloads)
+        with open(os.path.join(self.payloads, ".hekate_ctcaer_6.0.0.bin" + PART_SUFFIX), "wb") as f: f.write(data[:3000])
+        self.assertEqual(self.sync().update_hekate().status, "downloaded")
+        ranges = [headers.get("Range") for path, headers in Mirror.log if path.startswith("/dl/")]
+        self.assertEqual(ranges, ["bytes=3000-"])
+        with open(os.path.join(self.payloads, "hekate_ctcaer_6.0.0.bin"), "rb") as f: self.assertEqual(f.read(), data)
+
+    def test_digest_mismatch_keeps_nothing(self):
+        self.release("CTCaer/hekate", "hekate_ctcaer_6.0.0.bin", os.urandom(5000), digest="0" * 64)
+        result = self.sync().update_hekate()
+        self.assertEqual(result.status, "error")
+        self.assertIn("SHA-256", result.message)
+        self.assertEqual(os.listdir(self.payloads), []) # neither the file nor a poisoned .part
+
+    def test_damaged_file_of_the_right_size_is_fetched_again(self):
+        data = os.urandom(5000)
+        self.release("CTCaer/hekate", "hekate_ctcaer_6.0.0.bin", data)
+        self.sync().update_hekate()
+        path = os.path.join(self.payloads, "hekate_ctcaer_6.0.0.bin")
+        with open(path, "wb") as f: f.write(b"\0" * len(data))
+        self.assertEqual(self.sync().update_hekate().status, "downloaded")
+        with open(path, "rb") as f: self.assertEqual(f.read(), data)
+
+    def test_keep_prunes_older_versions(self):
+        for version in ("6.0.0", "6.1.0", "6.2.0", "6.3.0"):
+            self.release("CTCaer/hekate", f"hekate_ctcaer_{version}.bin", os.urandom(1000))
+            self.sync([dict(HEKATE_SOURCE, keep=1)]).update_hekate()
+        self.assertEqual(sorted(os.listdir(self.payloads)), ["hekate_ctcaer_6.2.0.bin", "hekate_ctcaer_6.3.0.bin"])
+
+    def test_url_source_unchanged_costs_one_304(self):
+        data = os.urandom(2000)
+        Mirror.files["/files/tool.bin"] = data
+        source = {"name": "tool", "type": "url", "url": f"{self.base}/files/tool.bin", "sha256": hashlib.sha256(data).hexdigest()}
+        self.assertEqual([r.status for r in self.sync([source]).run()], ["downloaded"])
+        Mirror.log.clear()
+        self.assertEqual([(r.status, r.file) for r in self.sync([source]).run()], [("current", "tool.bin")])
+        self.assertEqual(len(Mirror.log), 1)
+        self.assertIn("If-None-Match", Mirror.log[0][1])
+
+    def test_run_resumes_and_prunes_every_source(self):
+        os.makedirs(self.payloads)
+        for version in ("1.0.0", "1.1.0"):
+            with open(os.path.join(self.payloads, f"tegra_{version}.bin"), "wb") as f: f.write(b"old")
+        tegra, hekate = os.urandom(6000), os.urandom(6000)
+        self.release("example/tegra", "tegra_1.2.0.bin", tegra)
+        self.release("CTCaer/hekate", "hekate_ctcaer_6.0.0.bin", hekate)
+        with open(os.path.join(self.payloads, ".tegra_1.2.0.bin" + PART_SUFFIX), "wb") as f: f.write(tegra[:2500])
+        sources = [{"name": "tegra", "type": "github", "repo": "example/tegra", "asset": "tegra_*.bin", "keep": 1}, HEKATE_SOURCE]
+        results = self.sync(sources).run()
+        self.assertEqual([(r.source, r.status) for r in results], [("tegra", "downloaded"), ("hekate", "downloaded")])
+        self.assertEqual(sorted(os.listdir(self.payloads)), ["hekate_ctcaer_6.0.0.bin", "tegra_1.1.0.bin", "tegra_1.2.0.bin"])
+        ranges = {path: headers.get("Range") for path, headers in Mirror.log if path.startswith("/dl/")}
+        self.assertEqual(ranges, {"/dl/tegra_1.2.0.bin": "bytes=2500-", "/dl/hekate_ctcaer_6.0.0.bin": None})
+        with open(os.path.join(self.payloads, "tegra_1.2.0.bin"), "rb") as f: self.assertEqual(f.read(), tegra)
+
+    def test_update_hekate_uses_the_manifest_source(self):
+        for version in ("6.0.0", "6.1.0"):
+            self.release("CTCaer/hekate", f"hekate_ctcaer_{version}.bin", os.urandom(1000))
+            self.sync([{"name": "bootloader", "type": "github", "repo": "CTCaer/hekate", "asset": "hekate_ctcaer_*.bin", "keep": 0}]).update_hekate()
+        self.assertEqual(os.listdir(self.payloads), ["hekate_ctcaer_6.1.0.bin"])
+
+    def test_load_manifest(self):
+        path = os.path.join(self.dir, "payloads.json")
+        self.assertEqual(load_manifest(path), DEFAULT_MANIFEST) # written on first use
+        with open(path, "w") as f: json.dump({"version": 1, "sources": [{"name": "x", "type": "ftp"}]}, f)
+        self.assertRaises(SyncError, load_manifest, path)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
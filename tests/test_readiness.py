@@ -0,0 +1,124 @@
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# fuseeflow resolves its XDG directories at import time
+HOME = tempfile.mkdtemp(prefix="fuseeflow-test-")
+os.environ["XDG_CONFIG_HOME"] = os.path.join(HOME, "config")
+os.environ["XDG_DATA_HOME"] = os.path.join(HOME, "data")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuseeflow import readiness
+from fuseeflow.hotplug import RcmDevice
+from fuseeflow.readiness import ReadinessHistory, ReadinessProbe
+
+DEVICE_ID = "0123456789abcdef0123456789abcdef"
+
+
+class FakeClock:
+    # Stands in for both time.monotonic and the probe's cancel event: waiting
+    # just moves the clock, and every wait is recorded
+    def __init__(self):
+        self.now = 100.0
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+    def is_set(self):
+        return False
+
+    def wait(self, seconds):
+        self.waits.append(round(seconds, 6)); self.now += seconds
+
+
+class SimDevice:
+    # read_device_id replacement: fails with `errors` in turn, then answers
+    def __init__(self, clock, errors):
+        self.clock = clock
+        self.errors = list(errors)
+        self.reads = []
+
+    def __call__(self, device):
+        self.reads.append(self.clock.now)
+        if self.errors:
+            error = self.errors.pop(0)
+            raise OSError(error, os.strerror(error))
+        return DEVICE_ID
+
+
+class ReadinessTest(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(HOME, True)
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(dir=HOME)
+        self.clock = FakeClock()
+        self.history = ReadinessHistory(os.path.join(self.dir, "readiness.json"))
+        self.probe = ReadinessProbe(self.history, max_workers=1)
+        self.device = RcmDevice("1-1", 1, 2)
+        for patch in (mock.patch.object(readiness, "time", self.clock), mock.patch.object(readiness, "probe_supported", lambda: True)):
+            patch.start(); self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.probe.shutdown(wait=True)
+
+    def run_probe(self, errors):
+        sim = SimDevice(self.clock, errors)
+        with mock.patch.object(readiness, "read_device_id", sim):
+            return self.probe.probe(self.device, self.clock.now, self.clock), sim
+
+    def test_backoff_doubles_until_the_console_answers(self):
+        result, sim = self.run_probe([errno.ENOENT, errno.EACCES, errno.ETIMEDOUT, errno.EPIPE])
+        self.assertTrue(result.ready)
+        self.assertEqual(result.device_id, DEVICE_ID)
+        self.assertEqual(result.attempts, 5)
+        self.assertEqual(self.clock.waits, [readiness.DEFAULT_INITIAL_DELAY, 0.02, 0.04, 0.08, 0.16])
+        self.assertEqual(self.history.samples(), [round((self.clock.now - 100.0) * 1000, 1)])
+
+    def test_backoff_is_capped_and_gives_up_at_the_timeout(self):
+        result, sim = self.run_probe([errno.ETIMEDOUT] * 100)
+        self.assertFalse(result.ready)
+        self.assertEqual(max(self.clock.waits[1:]), readiness.BACKOFF_MAX)
+        self.assertLessEqual(self.clock.now - 100.0, readiness.READY_TIMEOUT)
+        self.assertEqual(result.attempts, len(sim.reads))
+        self.assertEqual(self.history.samples(), [])
+
+    def test_gone_console_is_not_retried(self):
+        result, sim = self.run_probe([errno.ENODEV])
+        self.assertFalse(result.ready)
+        self.assertEqual(result.attempts, 1)
+
+    def test_initial_delay_follows_history(self):
+        self.assertEqual(self.history.initial_delay(), readiness.DEFAULT_INITIAL_DELAY)
+        for ms in (120, 80, 200, 90, 150, 100, 110, 95):
+            self.history.record(ms)
+        # p25 of 8 samples is the 2nd smallest
+        self.assertAlmostEqual(self.history.initial_delay(), 0.09)
+        result, sim = self.run_probe([])
+        self.assertEqual(result.attempts, 1)
+        self.assertEqual(self.clock.waits, [0.09])
+        self.assertEqual(sim.reads, [100.09])
+
+    def test_initial_delay_is_capped_and_history_persists(self):
+        for ms in (900, 800, 1000, 700, 950):
+            self.history.record(ms)
+        reloaded = ReadinessHistory(self.history.path)
+        self.assertEqual(len(reloaded.samples()), 5)
+        self.assertEqual(reloaded.initial_delay(), readiness.MAX_INITIAL_DELAY)
+
+    def test_initial_delay_counts_from_detection(self):
+        # Time already spent before the probe started is not waited again
+        sim = SimDevice(self.clock, [])
+        with mock.patch.object(readiness, "read_device_id", sim):
+            self.probe.probe(self.device, self.clock.now - 0.03, self.clock)
+        self.assertEqual(self.clock.waits, [round(readiness.DEFAULT_INITIAL_DELAY - 0.03, 6)])
+
+
+if __name__ == "__main__":
+    unittest.main()